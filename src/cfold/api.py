@@ -0,0 +1,102 @@
+"""In-process Python API: fold a root repeatedly with warm config, matcher and contents."""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+from cfold.core.models import Codebase, Instruction
+from cfold.core.serialize import dump_fold
+from cfold.utils.daemon import RootIndex, fold_entries
+from cfold.utils.manifest import build_manifest, save_manifest
+
+
+class Folder:
+    """Fold one root with one dialect, keeping its index warm between calls.
+
+    Unlike the CLI callbacks this neither prints, exits nor reads the current
+    directory: paths are relative to ``root`` and errors are raised.
+    """
+
+    def __init__(self, root, dialect: str = "default", workers: Optional[int] = None):
+        self.index = RootIndex(root)
+        self.root = self.index.root
+        self.dialect = dialect
+        self.workers = workers
+        self._watcher = self.index.open_watcher()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _sync(self):
+        """Apply filesystem changes seen since the last call to the index."""
+        changed = self._watcher.read(0)
+        if changed:
+            self.index.refresh(changed)
+
+    def config(self):
+        """Return the resolved (dialect, instructions, patterns), cached by .foldrc state."""
+        return self.index.config(self.dialect)
+
+    def fold(
+        self,
+        files: Iterable[str] = (),
+        prompt: Optional[str] = None,
+        bare: bool = False,
+        outline: bool = False,
+        manifest: bool = True,
+    ) -> Codebase:
+        """Fold files (or regions) relative to the root, or the whole dialect selection.
+
+        With manifest, the states of the folded files are saved under the root's
+        .cfold for unfold to check answers against.
+        """
+        with self.index.lock:
+            self._sync()
+        _, instructions, patterns = self.config()
+        entries = fold_entries(self.index, self.root, list(files), patterns, outline)
+        data = Codebase(
+            instructions=[] if bare else [i.model_copy() for i in instructions],
+            files=entries,
+        )
+        if manifest:
+            # States taken by the index's own reads are not hashed again
+            paths = [e.path for e in entries]
+            root = Path(self.root)
+            states = build_manifest(root, paths, known=self.index.states(paths))
+            save_manifest(root, states)
+        if prompt:
+            data.instructions.append(Instruction(type="user", content=prompt, name="prompt"))
+        return data
+
+    def fold_bytes(self, *args, compact: bool = False, **kwargs) -> bytes:
+        """Fold like fold() and return the fold file content as UTF-8 bytes."""
+        return dump_fold(self.fold(*args, **kwargs), compact)
+
+    def _run(self, func, *args, **kwargs):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.workers or min(4, os.cpu_count() or 1), thread_name_prefix="cfold"
+            )
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def afold(self, *args, **kwargs) -> Codebase:
+        """Async fold(), run on the folder's thread pool."""
+        return await self._run(self.fold, *args, **kwargs)
+
+    async def afold_bytes(self, *args, **kwargs) -> bytes:
+        """Async fold_bytes(), run on the folder's thread pool."""
+        return await self._run(self.fold_bytes, *args, **kwargs)
+
+    def close(self):
+        """Stop watching the root and shut down the thread pool."""
+        self._watcher.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -5,60 +5,87 @@ import os
 from pathlib import Path
 from rich.console import Console
 from cfold.core.models import Codebase, FileEntry
-from typing import List
+from cfold.cli.fold import write_fold
+from cfold.utils.manifest import build_manifest, save_manifest
+from cfold.utils.notebooks import fold_content
+from cfold.utils.daemon import request_daemon
+from typing import Callable, List, Tuple
 
 
-def add(files: List[str], foldfile: str = "codefold.json"):
-    """Add files to an existing cfold file."""
-    console = Console()
-    cwd = Path.cwd()
-
-    if not Path(foldfile).exists():
-        console.print(f"Error: {foldfile} does not exist.", style="red")
-        return
-
-    try:
-        with open(foldfile, "r", encoding="utf-8") as infile:
-            raw_data = json.load(infile)
-            data = Codebase.model_validate(raw_data)
-    except Exception as e:
-        console.print(f"Error loading {foldfile}: {e}", style="red")
-        return
+def read_text(path) -> str:
+    """Read a file to add as UTF-8 text."""
+    with open(path, "r", encoding="utf-8") as infile:
+        return infile.read()
 
-    existing_paths = {f.path for f in data.files}
 
+def add_to_codebase(
+    data: Codebase, files: List[str], cwd: Path, read: Callable[[Path], str] = read_text
+) -> Tuple[List[str], List[str]]:
+    """Add or refresh files in a codebase; return (added, skipped) paths."""
+    existing = {f.path: f for f in data.files}
     added_files = []
+    skipped = []
     for file_path in files:
-        abs_path = Path(file_path).absolute()
+        abs_path = Path(cwd, file_path)
         if not abs_path.is_file():
-            console.print(
-                f"Warning: {file_path} is not a file, skipping.", style="yellow"
-            )
+            skipped.append(file_path)
             continue
         rel_path = os.path.relpath(str(abs_path), str(cwd))
-        if rel_path in existing_paths:
+        content = fold_content(rel_path, read(abs_path))
+        if rel_path in existing:
             # Update existing
-            for f in data.files:
-                if f.path == rel_path:
-                    f.content = open(abs_path, "r", encoding="utf-8").read()
-                    break
+            existing[rel_path].content = content
         else:
             # Add new
-            data.files.append(
-                FileEntry(
-                    path=rel_path,
-                    content=open(abs_path, "r", encoding="utf-8").read(),
-                )
-            )
+            entry = FileEntry(path=rel_path, content=content)
+            data.files.append(entry)
+            existing[rel_path] = entry
             added_files.append(rel_path)
+    refreshed = [os.path.relpath(str(Path(cwd, f)), str(cwd)) for f in files]
+    states = build_manifest(cwd, [rel for rel in refreshed if rel in existing])
+    save_manifest(cwd, states)
+    if data.manifest is not None:
+        data.manifest.update(states)  # a fold written before manifests stayed local
+    return added_files, skipped
+
 
-    try:
-        with open(foldfile, "w", encoding="utf-8") as outfile:
-            json.dump(data.model_dump(), outfile, indent=2)
-    except IOError as e:
-        console.print(f"Error writing to {foldfile}: {e}", style="red")
+def add(files: List[str], foldfile: str = "codefold.json"):
+    """Add files to an existing cfold file."""
+    console = Console()
+    cwd = Path.cwd()
+
+    if not Path(foldfile).exists():
+        console.print(f"Error: {foldfile} does not exist.", style="red")
         return
 
+    served = request_daemon(
+        "add",
+        cwd=str(cwd),
+        foldfile=str(Path(foldfile).absolute()),
+        files=list(files),
+    )
+    if served is not None:
+        added_files, skipped = served["added"], served["skipped"]
+    else:
+        try:
+            with open(foldfile, "r", encoding="utf-8") as infile:
+                raw_data = json.load(infile)
+                data = Codebase.model_validate(raw_data)
+        except Exception as e:
+            console.print(f"Error loading {foldfile}: {e}", style="red")
+            return
+
+        added_files, skipped = add_to_codebase(data, files, cwd)
+
+        try:
+            write_fold(data, foldfile)
+        except IOError as e:
+            console.print(f"Error writing to {foldfile}: {e}", style="red")
+            return
+
+    for file_path in skipped:
+        console.print(f"Warning: {file_path} is not a file, skipping.", style="yellow")
+
     if added_files:
         console.print(
             f"Added files to [cyan]{foldfile}[/cyan]: {', '.join(added_files)}"
@@ -0,0 +1,67 @@
+"""Handle cat and extract commands: read single files out of a fold by offset."""
+
+import fnmatch
+import os
+import sys
+from typing import List
+from rich.console import Console
+from cfold.utils.foldindex import load_index, read_content
+from cfold.utils.notebooks import unfold_content
+from cfold.utils.plan import normalize_entry_path, resolves_inside
+
+
+def cat(foldfile: str, path: str):
+    """Print the content of one file in a fold file."""
+    console = Console()
+    try:
+        entries = [e for e in load_index(foldfile) if e["path"] == path]
+    except OSError as e:
+        console.print(f"Error loading {foldfile}: {e}", style="red")
+        sys.exit(1)
+    if not entries:
+        console.print(f"Error: {path} is not in {foldfile}.", style="red")
+        sys.exit(1)
+    for entry in entries:
+        sys.stdout.write(read_content(foldfile, entry))
+    sys.stdout.flush()
+
+
+def extract(foldfile: str, glob: List[str], output_dir: str = "."):
+    """Write the files of a fold file matching glob patterns into a directory."""
+    console = Console()
+    try:
+        index = load_index(foldfile)
+    except OSError as e:
+        console.print(f"Error loading {foldfile}: {e}", style="red")
+        sys.exit(1)
+    extracted = []
+    for entry in index:
+        if not any(fnmatch.fnmatchcase(entry["path"], g) for g in glob):
+            continue
+        rel = normalize_entry_path(entry["path"])
+        if rel is not None and not resolves_inside(output_dir, rel):
+            rel = None
+        reason = None
+        if rel is None:
+            reason = "outside output dir"
+        elif entry["region"]:
+            reason = "region entry"
+        elif entry["outline"]:
+            reason = "outline entry"
+        elif entry["transformed"]:
+            reason = "folded with lossy transforms"
+        if reason is not None:
+            console.print(f"Skipping {entry['path']}: {reason}", style="yellow")
+            continue
+        dst = os.path.join(output_dir, rel)
+        os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+        with open(dst, "w", encoding="utf-8") as outfile:
+            outfile.write(unfold_content(rel, read_content(foldfile, entry), None))
+        extracted.append(rel)
+    if extracted:
+        console.print(
+            f"Extracted {len(extracted)} file(s) from [cyan]{foldfile}[/cyan] "
+            f"into {output_dir}."
+        )
+    else:
+        console.print(f"No files in [cyan]{foldfile}[/cyan] match {', '.join(glob)}.")
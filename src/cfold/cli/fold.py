@@ -1,18 +1,56 @@
 """Handle folding command for cfold."""
 
 import os
-import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import pyperclip  # Added for clipboard functionality
-from cfold.utils.instructions import load_instructions, get_available_dialects
-import yaml  # Added for loading .foldrc
-from cfold.utils.foldignore import should_include_file
+from cfold.utils.instructions import (
+    load_instructions,
+    foldrc_setting,
+    get_available_dialects,
+    resolve_dialect,
+)
+from cfold.utils.foldignore import (
+    IGNORE_FILES,
+    IgnoreMatcher,
+    is_included,
+    should_walk_dir,
+    walk_dialects,
+    walk_dirs,
+    walk_files,
+    walk_order_key,
+    walk_relpaths,
+)
+from cfold.utils.watch import debounced_changes, open_watcher
+from cfold.utils.daemon import request_daemon
+from cfold.utils.regions import FileSpec, file_entry, parse_file_spec
+from cfold.utils.cache import ContentCache
+from cfold.utils.manifest import (
+    BASE_NAMESPACE,
+    build_manifest,
+    read_with_state,
+    save_manifest,
+)
+from cfold.utils.foldindex import scan_entries, write_index
+from cfold.utils.history import record_snapshot
+from cfold.utils.shards import write_sharded_fold
+from cfold.utils.churn import churn_order
+from cfold.utils.outline import outline_entries, outline_entry
+from cfold.utils.imports import reachable_modules
+from cfold.utils.relevance import rank_files
+from cfold.utils.symbols import find_symbols
+from cfold.utils.covdata import covered_lines, line_ranges
+from cfold.utils.transforms import transform_entries
+from cfold.utils.notebooks import fold_content
+from cfold.utils.tokens import estimate_tokens
 from rich.console import Console
 from rich.tree import Tree
 from cfold.utils.treeviz import get_folded_tree
-from cfold.core.models import Codebase, FileEntry, Instruction  # Added for Pydantic model
+from cfold.core.models import Codebase, FileEntry, FileState, Instruction  # Added for Pydantic model
+from cfold.core.serialize import dump_fold, single_line
 import sys
-from typing import List
+from typing import Callable, Dict, Iterable, List, Tuple
 
 
 def fold(
@@ -21,113 +59,223 @@ def fold(
     prompt: str = None,
     dialect: str = "default",
     bare: bool = False,
+    watch: bool = False,
+    outline: bool = False,
+    follow_imports: bool = False,
+    depth: int = None,
+    auto_select: int = None,
+    max_tokens: int = None,
+    symbol: str = None,
+    references: bool = False,
+    from_coverage: str = None,
+    context: str = None,
+    coverage_ranges: bool = False,
+    index: bool = False,
+    processes: int = None,
+    compact: bool = False,
+    cache_friendly: bool = False,
+    record: bool = False,
 ):
     """Fold files or directory into a single text file and visualize the structure."""
     bare = bool(bare)
+    outline = bool(outline)
     console = Console()
     cwd = Path.cwd()
-    # Check for local default dialect if 'default' is specified
-    if dialect == "default":
-        local_path = cwd / ".foldrc"
-        if local_path.exists():
-            with local_path.open("r", encoding="utf-8") as f:
-                local_config = yaml.safe_load(f) or {}
-            if "default_dialect" in local_config:
-                dialect = local_config["default_dialect"]
+    record = should_record(record, cwd)
 
-    try:
-        instructions, patterns = load_instructions(dialect)
-        if bare:
-            instructions = []
-    except ValueError:
-        available = get_available_dialects()
+    prompt_content = ""
+    if prompt and os.path.isfile(prompt):
+        with open(prompt, "r", encoding="utf-8") as prompt_infile:
+            prompt_content = prompt_infile.read()
+    elif prompt:
         console.print(
-            f"Invalid dialect specified. Available dialects: {', '.join(available)}",
-            style="red",
+            f"Warning: Prompt file '{prompt}' does not exist. Skipping.", style="yellow"
         )
-        sys.exit(1)
-    except Exception as e:
-        console.print(f"Error loading instructions: {str(e)}", style="red")
-        sys.exit(1)
+    check_file_specs(files, console)
 
-    included_patterns = patterns.get("included", [])  # Adjust if needed
-    excluded_patterns = patterns.get("excluded", [])
-    included_dirs = patterns.get("included_dirs", [])
-    exclude_files = patterns.get("exclude_files", [])
+    dialects = list(dict.fromkeys(d.strip() for d in dialect.split(",") if d.strip()))
+    if len(dialects) > 1:
+        if files or watch or symbol or auto_select or from_coverage or follow_imports:
+            console.print("Several dialects can only fold the whole tree.", style="red")
+            sys.exit(1)
+        if outline or processes or context:
+            console.print(
+                "--outline, --processes and --context do not apply to several dialects.",
+                style="red",
+            )
+            sys.exit(1)
+        fold_dialects(
+            cwd,
+            dialects,
+            output,
+            bare,
+            prompt_content,
+            index,
+            compact,
+            cache_friendly,
+            record,
+            console,
+        )
+        return
+    dialect = dialects[0] if dialects else "default"
+    output = output.replace("{dialect}", dialect)
 
-    if not files:
-        directory = cwd
-        files = []
-        for dirpath, _, filenames in os.walk(directory):
-            for filename in filenames:
-                filepath = Path(dirpath) / filename
-                rel_path = os.path.relpath(str(filepath), str(directory))
-                if (
-                    should_include_file(
-                        filepath,
-                        directory,
-                        included_patterns,
-                        excluded_patterns,
-                        included_dirs,
-                    )
-                    and rel_path not in exclude_files
-                ):
-                    files.append(filepath)
+    if symbol or auto_select or from_coverage:
+        _, _, patterns = load_dialect(dialect, cwd, console)
+    if from_coverage:
+        try:
+            files = list(files) + coverage_files(
+                cwd, patterns, from_coverage, context, coverage_ranges
+            )
+        except ValueError as e:
+            console.print(f"Error reading coverage data: {e}", style="red")
+            sys.exit(1)
+        if not files:
+            console.print("No covered files match the dialect patterns.")
+            return
+    if symbol:
+        names = [name.strip() for name in symbol.split(",") if name.strip()]
+        files = symbol_files(files, cwd, patterns, names, references, console)
+        if not files:
+            console.print("No files define the requested symbols.")
+            return
+    if auto_select:
+        if not prompt_content.strip():
+            console.print("--auto-select needs a --prompt file to rank by.", style="red")
+            sys.exit(1)
+        files = auto_select_files(
+            files,
+            cwd,
+            patterns,
+            prompt_content,
+            auto_select,
+            max_tokens,
+            skip=[os.path.relpath(os.path.abspath(prompt), str(cwd))],
+        )
+        if not files:
+            console.print("No files match the prompt.")
+            return
+    explicit = bool(files)
+    if follow_imports:
+        if not files:
+            console.print("--follow-imports needs one or more entry files.", style="red")
+            sys.exit(1)
+        files = follow_entry_imports(files, cwd, depth)
+    sharded = bool(processes and processes > 1)
+    if sharded and (files or watch or cache_friendly):
+        console.print(
+            "--processes only applies to whole-tree folds without --watch or "
+            "--cache-friendly; folding in one process.",
+            style="yellow",
+        )
+        sharded = False
+
+    served = None
+    states = {}  # manifest states taken while reading the files
+    if not watch and not sharded:
+        served = request_daemon(
+            "fold",
+            cwd=str(cwd),
+            files=list(files),
+            dialect=dialect,
+            bare=bare,
+            outline=outline,
+        )
+    if sharded:
+        instructions, folded, text = fold_sharded(
+            cwd, output, dialect, bare, prompt_content, processes, index, compact, console
+        )
+        entries = folded
+    elif served is not None:
+        instructions = [Instruction(**i) for i in served["instructions"]]
+        entries = [FileEntry(**f) for f in served["files"]]
+        states = {rel: FileState(**st) for rel, st in served.get("states", {}).items()}
     else:
-        files = [Path(f).absolute() for f in files if Path(f).is_file()]
-        files = [
-            f for f in files if os.path.relpath(str(f), str(cwd)) not in exclude_files
-        ]
+        dialect, instructions, patterns = load_dialect(dialect, cwd, console)
+        if bare:
+            instructions = []
 
-    if not files:
+        matcher = IgnoreMatcher(cwd)
+        if watch and any(parse_file_spec(f).is_region for f in files):
+            console.print(
+                "--watch does not support line or symbol regions.", style="red"
+            )
+            sys.exit(1)
+        outline = outline or patterns.get("outline", False)
+        if outline and not explicit:
+            console.print(
+                "Outline mode needs focus files (or --auto-select).", style="red"
+            )
+            sys.exit(1)
+        selected = select_files(files, cwd, patterns, matcher)
+        focus = {os.path.relpath(str(f), str(cwd)) for f, _ in selected}
+        if outline and explicit:
+            # Focus files come first, the rest of the tree follows as outlines
+            selected += [
+                (f, s)
+                for f, s in select_files([], cwd, patterns, matcher)
+                if os.path.relpath(str(f), str(cwd)) not in focus
+            ]
+        files = [filepath for filepath, _ in selected]
+        entries = []
+        base = ContentCache.for_root(cwd, BASE_NAMESPACE)
+        for filepath, spec in selected:
+            rel = os.path.relpath(str(filepath), str(cwd))
+            try:
+                content, states[rel] = read_with_state(filepath, base)
+                entries.append(file_entry(rel, content, spec))
+            except (SyntaxError, ValueError) as e:
+                console.print(f"Warning: {spec.path}: {e}. Skipping.", style="yellow")
+        if outline:
+            entries = outline_entries(entries, focus, cwd)
+        try:
+            entries = transform_entries(entries, patterns["transforms"], cwd)
+        except ValueError as e:
+            console.print(f"Error: {e}", style="red")
+            sys.exit(1)
+
+    if not entries:
         console.print("No valid files to fold.")
         return
 
-    data = Codebase(
-        instructions=instructions,
-        files=[
-            FileEntry(
-                path=os.path.relpath(str(filepath), str(cwd)),
-                content=open(filepath, "r", encoding="utf-8").read(),
-            )
-            for filepath in files
-        ],
-    )
-
-    prompt_content = ""
-    if prompt and os.path.isfile(prompt):
-        with open(prompt, "r", encoding="utf-8") as prompt_infile:
-            prompt_content = prompt_infile.read()
-    elif prompt:
-        console.print(
-            f"Warning: Prompt file '{prompt}' does not exist. Skipping.", style="yellow"
+    if sharded:
+        # The shards wrote the fold; only history needs it back as a model
+        data = Codebase.model_validate_json(text) if record else None
+    else:
+        data = Codebase(instructions=instructions, files=entries)
+        # The manifest stays local, unfold checks the answers against it
+        save_manifest(
+            cwd, build_manifest(cwd, [e.path for e in entries], known=states)
         )
 
-    if prompt_content:
-        data.instructions.append(
-            Instruction(type="user", content=prompt_content, name="prompt")
-        )
+        if prompt_content:
+            data.instructions.append(
+                Instruction(type="user", content=prompt_content, name="prompt")
+            )
+        if cache_friendly:
+            order = churn_order(cwd)
+            data.files.sort(key=lambda e: order(e.path))
+        instructions = data.instructions
+        folded = [e.path for e in data.files]
 
     try:
-        with open(output, "w", encoding="utf-8") as outfile:
-            json.dump(
-                data.model_dump(),
-                outfile,
-                indent=2,
-            )
-        # Copy content to clipboard after writing the file
-        pyperclip.copy(json.dumps(data.model_dump()))
+        if not sharded:
+            text = write_fold(data, output, index, compact, cache_friendly)
+        # Copy content to clipboard after writing the file, on one line
+        pyperclip.copy((text if compact else single_line(text)).decode("utf-8"))
     except IOError as e:
         console.print(f"Error writing to {output}: {e}", style="red")
         sys.exit(1)
+    if record:
+        record_fold(cwd, data, output, console)
 
-    file_tree = get_folded_tree(files, cwd)
+    file_tree = get_folded_tree([cwd / path for path in folded], cwd)
     if file_tree:
         console.print(file_tree)
 
     # Visualize instructions by type and name
     instr_tree = Tree("Instructions Added", guide_style="dim")
-    for instr in data.instructions:
+    for instr in instructions:
         label = f"[bold]{instr.type}[/bold]"
         if instr.name:
             label += f" ({instr.name})"
@@ -139,3 +287,474 @@ def fold(
     console.print(
         f"Codebase folded into [cyan]{output}[/cyan] and content [green]copied to clipboard[/green]."
     )
+
+    if watch:
+        tracked = (
+            [os.path.relpath(str(f), str(cwd)) for f in files]
+            if explicit and not outline
+            else None
+        )
+        scope = watch_scope(cwd, patterns, matcher, tracked)
+        cache = ContentCache.for_root(cwd, "outline") if outline else None
+
+        def make_entry(rel, content):
+            if outline and rel not in focus and rel.endswith(".py"):
+                return outline_entry(rel, content, cache)
+            entry = new_entry(rel, content)
+            return transform_entries([entry], patterns["transforms"], cwd, 1)[0]
+
+        watch_fold(
+            data,
+            output,
+            cwd,
+            scope,
+            matcher,
+            console,
+            make_entry,
+            index,
+            compact,
+            cache_friendly,
+        )
+
+
+def fold_dialects(
+    cwd: Path,
+    dialects: List[str],
+    output: str,
+    bare: bool,
+    prompt_content: str,
+    index: bool,
+    compact: bool,
+    cache_friendly: bool,
+    record: bool,
+    console: Console,
+):
+    """Fold the whole tree for several dialects in one walk, reading each file once."""
+    if "{dialect}" not in output:
+        console.print(
+            "Several dialects need '{dialect}' in --output, e.g. '{dialect}.json'.",
+            style="red",
+        )
+        sys.exit(1)
+    loaded = [load_dialect(d, cwd, console) for d in dialects]
+    outlined = [name for name, _, patterns in loaded if patterns.get("outline")]
+    if outlined:
+        console.print(
+            f"Outline dialects need focus files and cannot be folded with others: "
+            f"{', '.join(outlined)}.",
+            style="red",
+        )
+        sys.exit(1)
+    selected: List[List[FileEntry]] = [[] for _ in loaded]
+    base = ContentCache.for_root(cwd, BASE_NAMESPACE)
+    states = {}
+    for rel, folding in walk_dialects(cwd, [patterns for *_, patterns in loaded]):
+        try:
+            content, states[rel] = read_with_state(cwd / rel, base)
+            entry = file_entry(rel, content, FileSpec(rel))
+        except (SyntaxError, ValueError) as e:
+            console.print(f"Warning: {rel}: {e}. Skipping.", style="yellow")
+            continue
+        for i in folding:
+            selected[i].append(entry)
+    folded = {e.path for entries in selected for e in entries}
+    save_manifest(cwd, build_manifest(cwd, folded, known=states))
+
+    folds = []
+    for name, (_, instructions, patterns), entries in zip(dialects, loaded, selected):
+        if not entries:
+            console.print(f"No valid files to fold for dialect {name}.")
+            continue
+        try:
+            entries = transform_entries(entries, patterns["transforms"], cwd)
+        except ValueError as e:
+            console.print(f"Error: {e}", style="red")
+            sys.exit(1)
+        data = Codebase(instructions=[] if bare else list(instructions), files=entries)
+        if prompt_content:
+            data.instructions.append(
+                Instruction(type="user", content=prompt_content, name="prompt")
+            )
+        if cache_friendly:
+            order = churn_order(cwd)
+            data.files.sort(key=lambda e: order(e.path))
+        folds.append((name, output.replace("{dialect}", name), data))
+
+    def write(item):
+        _, path, data = item
+        write_fold(data, path, index, compact, cache_friendly)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(folds))) as pool:
+            list(pool.map(write, folds))
+    except IOError as e:
+        console.print(f"Error writing folds: {e}", style="red")
+        sys.exit(1)
+    for name, path, data in folds:
+        if record:
+            record_fold(cwd, data, path, console)
+        console.print(
+            f"Dialect [cyan]{name}[/cyan]: {len(data.files)} file(s) folded into "
+            f"[cyan]{path}[/cyan]."
+        )
+
+
+def should_record(record: bool, cwd: Path) -> bool:
+    """Record history with --record or record_history in .foldrc, unless CFOLD_NO_HISTORY."""
+    if os.environ.get("CFOLD_NO_HISTORY"):
+        return False
+    return bool(record or foldrc_setting("record_history", cwd, False))
+
+
+def record_fold(cwd: Path, data: Codebase, output: str, console: Console):
+    """Record a written fold in the project history."""
+    try:
+        record_snapshot(cwd, data, os.path.relpath(os.path.abspath(output), str(cwd)))
+    except (OSError, sqlite3.Error) as e:
+        console.print(f"Warning: fold not recorded in history: {e}", style="yellow")
+
+
+def fold_sharded(
+    cwd: Path,
+    output: str,
+    dialect: str,
+    bare: bool,
+    prompt_content: str,
+    processes: int,
+    index: bool,
+    compact: bool,
+    console: Console,
+) -> Tuple[List[Instruction], List[str], bytes]:
+    """Fold the whole tree on a process pool, one shard per top-level or included dir.
+
+    Returns the instructions, the folded paths in walk order and the fold file bytes.
+    """
+    _, instructions, patterns = load_dialect(dialect, cwd, console)
+    instructions = [] if bare else list(instructions)
+    if prompt_content:
+        instructions.append(Instruction(type="user", content=prompt_content, name="prompt"))
+    try:
+        result = write_sharded_fold(
+            cwd, patterns, instructions, output, processes, compact
+        )
+    except ValueError as e:
+        console.print(f"Error: {e}", style="red")
+        sys.exit(1)
+    except IOError as e:
+        console.print(f"Error writing to {output}: {e}", style="red")
+        sys.exit(1)
+    for warning in result.warnings:
+        console.print(f"Warning: {warning}. Skipping.", style="yellow")
+    if not result.states:
+        return instructions, [], b""
+    save_manifest(cwd, result.states)
+    if index:
+        write_index(output, scan_entries(result.fragment))
+    return instructions, list(result.states), result.fragment
+
+
+def load_dialect(dialect: str, cwd: Path, console: Console):
+    """Resolve and load a dialect to (name, instructions, patterns), exiting on errors."""
+    # Check for local default dialect if 'default' is specified
+    dialect = resolve_dialect(dialect, cwd)
+    try:
+        instructions, patterns = load_instructions(dialect)
+    except ValueError:
+        available = get_available_dialects()
+        console.print(
+            f"Invalid dialect specified. Available dialects: {', '.join(available)}",
+            style="red",
+        )
+        sys.exit(1)
+    except Exception as e:
+        console.print(f"Error loading instructions: {str(e)}", style="red")
+        sys.exit(1)
+    return dialect, instructions, patterns
+
+
+def check_file_specs(files: List[str], console: Console):
+    """Exit with an error if a file argument is not a file and not a valid region spec."""
+    for f in files:
+        if Path(f).is_file():
+            continue
+        try:
+            parse_file_spec(f)
+        except ValueError as e:
+            console.print(f"Error: {e}", style="red")
+            sys.exit(1)
+
+
+def select_files(
+    files: List[str], cwd: Path, patterns: Dict, matcher=None
+) -> List[Tuple[Path, FileSpec]]:
+    """Resolve explicit file specs, or walk cwd with the dialect patterns when none are given."""
+    exclude_files = patterns.get("exclude_files", [])
+    if not files:
+        return [
+            (filepath, FileSpec(str(filepath)))
+            for filepath in walk_files(
+                cwd,
+                patterns.get("included", []),
+                patterns.get("excluded", []),
+                patterns.get("included_dirs", []),
+                exclude_files,
+                matcher,
+            )
+        ]
+    specs = [FileSpec(f) if Path(f).is_file() else parse_file_spec(f) for f in files]
+    selected = [(Path(s.path).absolute(), s) for s in specs if Path(s.path).is_file()]
+    return [
+        (f, s)
+        for f, s in selected
+        if os.path.relpath(str(f), str(cwd)) not in exclude_files
+    ]
+
+
+def follow_entry_imports(files: List[str], cwd: Path, depth: int = None) -> List[str]:
+    """Append the in-tree modules imported (transitively, up to depth) by the given files."""
+    entries = []
+    for f in files:
+        spec = FileSpec(f) if Path(f).is_file() else parse_file_spec(f)
+        if Path(spec.path).is_file():
+            entries.append(os.path.relpath(str(Path(spec.path).absolute()), str(cwd)))
+    reached = reachable_modules(cwd, entries, depth, IgnoreMatcher(cwd))
+    return list(files) + reached[len(entries) :]
+
+
+def dialect_paths(cwd: Path, patterns: Dict) -> List[str]:
+    """Return the relative paths a dialect walk of cwd would fold."""
+    return list(
+        walk_relpaths(
+            cwd,
+            patterns.get("included", []),
+            patterns.get("excluded", []),
+            patterns.get("included_dirs", []),
+            patterns.get("exclude_files", []),
+        )
+    )
+
+
+def coverage_files(
+    cwd: Path,
+    patterns: Dict,
+    datafile: str,
+    context: str = None,
+    ranges: bool = False,
+) -> List[str]:
+    """Return file specs (whole files or hit line ranges) covered by a test context."""
+    matcher = IgnoreMatcher(cwd)
+    specs = []
+    for path, lines in covered_lines(datafile, context).items():
+        rel = os.path.relpath(path, str(cwd)).replace(os.sep, "/")
+        if rel.startswith("../") or not is_included(
+            rel,
+            cwd,
+            patterns.get("included", []),
+            patterns.get("excluded", []),
+            patterns.get("included_dirs", []),
+            patterns.get("exclude_files", []),
+            matcher,
+        ):
+            continue
+        if ranges:
+            specs += [f"{rel}:{start}-{end}" for start, end in line_ranges(lines)]
+        else:
+            specs.append(rel)
+    return sorted(specs, key=lambda spec: walk_order_key(parse_file_spec(spec).path))
+
+
+def symbol_files(
+    files: List[str],
+    cwd: Path,
+    patterns: Dict,
+    names: List[str],
+    references: bool = False,
+    console: Console = None,
+) -> List[str]:
+    """Append the files defining (and optionally referencing) the given symbol names."""
+    found = find_symbols(cwd, dialect_paths(cwd, patterns), names, references)
+    given = {os.path.relpath(os.path.abspath(f), str(cwd)) for f in files}
+    extra = []
+    for name, paths in found.items():
+        if not paths and console is not None:
+            console.print(f"Warning: Symbol '{name}' not found.", style="yellow")
+        extra += [p for p in paths if p not in given and p not in extra]
+    return list(files) + extra
+
+
+def auto_select_files(
+    files: List[str],
+    cwd: Path,
+    patterns: Dict,
+    query: str,
+    limit: int,
+    max_tokens: int = None,
+    skip: Iterable[str] = (),
+) -> List[str]:
+    """Append the files most relevant to a query, keeping the fold within a token budget."""
+    given = {
+        os.path.relpath(str(f), str(cwd))
+        for f, _ in (select_files(files, cwd, patterns) if files else [])
+    }
+    used = sum(estimate_tokens(read_file(cwd / rel)) for rel in given)
+    chosen = []
+    for rel, _, tokens in rank_files(cwd, dialect_paths(cwd, patterns), query):
+        if len(chosen) >= limit:
+            break
+        if rel in given or rel in skip or (max_tokens and used + tokens > max_tokens):
+            continue
+        chosen.append(rel)
+        used += tokens
+    return list(files) + chosen
+
+
+def read_file(filepath) -> str:
+    """Read a file to fold as UTF-8 text."""
+    with open(filepath, "r", encoding="utf-8") as infile:
+        return infile.read()
+
+
+def write_fold(
+    data: Codebase,
+    output: str,
+    index: bool = False,
+    compact: bool = False,
+    cache_friendly: bool = False,
+) -> bytes:
+    """Write a fold file atomically so readers never see a partial fold; return its bytes."""
+    tmp = f"{output}.tmp"
+    text = dump_fold(data, compact, cache_friendly)
+    with open(tmp, "wb") as outfile:
+        outfile.write(text)
+    os.replace(tmp, output)
+    if index:
+        write_index(output, scan_entries(text))
+    return text
+
+
+def new_entry(rel: str, content: str) -> FileEntry:
+    """Build a whole-file entry."""
+    return FileEntry(path=rel, content=fold_content(rel, content))
+
+
+def apply_changes(
+    entries: Dict[str, FileEntry],
+    changed: Iterable[str],
+    cwd: Path,
+    include: Callable[[str], bool],
+    make_entry: Callable[[str, str], FileEntry] = new_entry,
+) -> List[str]:
+    """Re-read changed, added or deleted paths into the entries; return touched paths."""
+    touched = []
+    for rel in sorted(changed):
+        rel = os.path.normpath(rel)
+        full = cwd / rel
+        if full.is_file() and include(rel.replace(os.sep, "/")):
+            try:
+                content = read_file(full)
+            except (OSError, UnicodeDecodeError):
+                continue
+            entry = make_entry(rel, content)
+            if entries.get(rel) != entry:
+                entries[rel] = entry
+                touched.append(rel)
+            continue
+        prefix = rel + os.sep
+        for path in [p for p in entries if p == rel or p.startswith(prefix)]:
+            del entries[path]
+            touched.append(path)
+    return touched
+
+
+def watch_scope(cwd: Path, patterns: Dict, matcher: IgnoreMatcher, tracked=None):
+    """Return (dirs, keep_dir, scan, include) describing what a fold watch covers."""
+    if tracked is not None:
+        tracked = set(tracked)
+        dirs = sorted({os.path.dirname(rel) for rel in tracked})
+        return (
+            dirs,
+            lambda rel: False,
+            lambda: tracked,
+            lambda rel: os.path.normpath(rel) in tracked,
+        )
+
+    included_patterns = patterns.get("included", [])
+    excluded_patterns = patterns.get("excluded", [])
+    included_dirs = patterns.get("included_dirs", [])
+    exclude_files = patterns.get("exclude_files", [])
+
+    def scan():
+        return (
+            os.path.relpath(str(f), str(cwd))
+            for f in walk_files(
+                cwd,
+                included_patterns,
+                excluded_patterns,
+                included_dirs,
+                exclude_files,
+                matcher,
+            )
+        )
+
+    def keep_dir(rel):
+        return should_walk_dir(rel, excluded_patterns, included_dirs, matcher)
+
+    def include(rel):
+        return is_included(
+            rel,
+            cwd,
+            included_patterns,
+            excluded_patterns,
+            included_dirs,
+            exclude_files,
+            matcher,
+        )
+
+    dirs = [
+        reldir
+        for reldir, _ in walk_dirs(cwd, excluded_patterns, included_dirs, matcher)
+    ]
+    return dirs, keep_dir, scan, include
+
+
+def watch_fold(
+    data,
+    output,
+    cwd,
+    scope,
+    matcher,
+    console,
+    make_entry=new_entry,
+    index=False,
+    compact=False,
+    cache_friendly=False,
+):
+    """Keep a fold file up to date by re-reading only the files that change."""
+    dirs, keep_dir, scan, include = scope
+    entries = {f.path: f for f in data.files}
+    watcher = open_watcher(cwd, dirs, keep_dir, scan)
+    kind = "inotify" if hasattr(watcher, "fd") else "polling"
+    console.print(f"[dim]Watching for changes ({kind}), press Ctrl+C to stop.[/dim]")
+    try:
+        for changed in debounced_changes(watcher):
+            if any(os.path.basename(rel) in IGNORE_FILES for rel in changed):
+                matcher.invalidate()
+                changed = set(changed) | set(entries) | set(scan())
+            touched = apply_changes(entries, changed, cwd, include, make_entry)
+            if not touched:
+                continue
+            order = churn_order(cwd) if cache_friendly else walk_order_key
+            data.files = [entries[p] for p in sorted(entries, key=order)]
+            save_manifest(cwd, build_manifest(cwd, [p for p in touched if p in entries]))
+            try:
+                write_fold(data, output, index, compact, cache_friendly)
+            except IOError as e:
+                console.print(f"Error writing to {output}: {e}", style="red")
+                continue
+            console.print(
+                f"Updated [cyan]{output}[/cyan]: {', '.join(touched)}", highlight=False
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
@@ -0,0 +1,75 @@
+"""Handle history commands: list, show and diff recorded folds."""
+
+import difflib
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from rich.console import Console
+from rich.table import Table
+from cfold.core.models import Codebase
+from cfold.core.serialize import dump_fold
+from cfold.utils.history import connect, list_snapshots, load_snapshot, storage_bytes
+
+
+def _load(conn: sqlite3.Connection, snapshot: int, console: Console) -> Codebase:
+    try:
+        return load_snapshot(conn, snapshot)
+    except KeyError as e:
+        console.print(f"Error: {e.args[0]}", style="red")
+        sys.exit(1)
+
+
+def history_list():
+    """List the folds recorded in the project history."""
+    console = Console()
+    conn = connect(Path.cwd())
+    snapshots = list_snapshots(conn)
+    if not snapshots:
+        console.print("No folds recorded yet.")
+        return
+    table = Table("id", "created", "output", "files", "bytes")
+    for snapshot, created, output, files, size in snapshots:
+        when = datetime.fromtimestamp(created).strftime("%Y-%m-%d %H:%M:%S")
+        table.add_row(str(snapshot), when, output, str(files), str(size))
+    console.print(table)
+    total = sum(size for *_, size in snapshots)
+    console.print(
+        f"[dim]{len(snapshots)} snapshot(s), {total} bytes of content stored in "
+        f"{storage_bytes(conn)} bytes[/dim]"
+    )
+
+
+def history_show(snapshot: int, output: str = None):
+    """Print (or write to a file) the fold recorded as a snapshot."""
+    console = Console()
+    data = _load(connect(Path.cwd()), snapshot, console)
+    text = dump_fold(data).decode("utf-8")
+    if output:
+        Path(output).write_text(text, encoding="utf-8")
+        console.print(f"Snapshot {snapshot} written to [cyan]{output}[/cyan].")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+def history_diff(old: int, new: int):
+    """Show the changes between two recorded folds."""
+    console = Console()
+    conn = connect(Path.cwd())
+    old_data, new_data = _load(conn, old, console), _load(conn, new, console)
+    before = {f.path: f for f in old_data.files}
+    after = {f.path: f for f in new_data.files}
+    for path in sorted(set(before) | set(after)):
+        a = before[path].content if path in before else None
+        b = after[path].content if path in after else None
+        if path in before and path in after and a == b:
+            continue
+        diff = difflib.unified_diff(
+            (a or "").splitlines(keepends=True),
+            (b or "").splitlines(keepends=True),
+            fromfile=f"{old}/{path}" if path in before else "/dev/null",
+            tofile=f"{new}/{path}" if path in after else "/dev/null",
+        )
+        sys.stdout.writelines(line if line.endswith("\n") else line + "\n" for line in diff)
+    if old_data.instructions != new_data.instructions:
+        console.print("[dim]Instructions differ.[/dim]")
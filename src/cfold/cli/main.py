@@ -7,7 +7,11 @@ from .fold import fold
 from .unfold import unfold
 from .rc import rc
 from .view import view
+from .cat import cat, extract
+from .history import history_diff, history_list, history_show
+from .stats import stats
 from .add import add
+from .serve import serve
 
 app = treeparse.cli(
     name="cfold",
@@ -44,7 +48,8 @@ fold_cmd = treeparse.command(
         ),
         treeparse.option(
             flags=["--dialect", "-d"],
-            help="Instruction dialect (available: default, py, pytest, doc, typst)",
+            help="Instruction dialect (default, py, pytest, doc, typst, edit, outline); "
+            "comma-separated dialects fold the tree once into an --output naming {dialect}",
             arg_type=str,
             default="default",
             sort_key=2,
@@ -56,16 +61,120 @@ fold_cmd = treeparse.command(
             arg_type=bool,
             sort_key=3,
         ),
+        treeparse.option(
+            flags=["--watch", "-w"],
+            help="Keep watching the folded files and rewrite the output on change",
+            flag=True,
+            sort_key=4,
+        ),
+        treeparse.option(
+            flags=["--outline", "-l"],
+            help="Fold non-focus .py files as outlines (signatures, docstrings, constants)",
+            flag=True,
+            sort_key=5,
+        ),
+        treeparse.option(
+            flags=["--follow-imports", "-f"],
+            help="Also fold the in-tree modules imported by the given files, transitively",
+            flag=True,
+            sort_key=6,
+        ),
+        treeparse.option(
+            flags=["--depth", "-D"],
+            help="Maximum import depth for --follow-imports (default: unlimited)",
+            arg_type=int,
+            default=None,
+            sort_key=7,
+        ),
+        treeparse.option(
+            flags=["--auto-select", "-a"],
+            help="Add the K files most relevant to the --prompt text (BM25 ranking)",
+            arg_type=int,
+            default=None,
+            sort_key=8,
+        ),
+        treeparse.option(
+            flags=["--max-tokens", "-t"],
+            help="Token budget for --auto-select, counting the given files too",
+            arg_type=int,
+            default=None,
+            sort_key=9,
+        ),
+        treeparse.option(
+            flags=["--symbol", "-s"],
+            help="Fold the files defining these comma-separated symbol names "
+            "(e.g. Codebase,Klass.method)",
+            arg_type=str,
+            default=None,
+            sort_key=10,
+        ),
+        treeparse.option(
+            flags=["--references", "-r"],
+            help="With --symbol, also fold the files referencing the symbols",
+            flag=True,
+            sort_key=11,
+        ),
+        treeparse.option(
+            flags=["--from-coverage", "-c"],
+            help="Fold the files hit in a coverage.py data file (e.g. .coverage)",
+            arg_type=str,
+            default=None,
+            sort_key=12,
+        ),
+        treeparse.option(
+            flags=["--context", "-x"],
+            help="With --from-coverage, only lines hit by this test context",
+            arg_type=str,
+            default=None,
+            sort_key=13,
+        ),
+        treeparse.option(
+            flags=["--coverage-ranges", "-R"],
+            help="With --from-coverage, fold only the hit line ranges instead of whole files",
+            flag=True,
+            sort_key=14,
+        ),
+        treeparse.option(
+            flags=["--index", "-I"],
+            help="Also write a sidecar .idx with entry offsets for cat/extract",
+            flag=True,
+            sort_key=15,
+        ),
+        treeparse.option(
+            flags=["--processes", "-P"],
+            help="Fold the whole tree on N processes, one shard per top-level directory",
+            arg_type=int,
+            default=None,
+            sort_key=16,
+        ),
+        treeparse.option(
+            flags=["--compact", "-k"],
+            help="Write the fold without indentation (smaller, faster for big trees)",
+            flag=True,
+            sort_key=17,
+        ),
+        treeparse.option(
+            flags=["--cache-friendly", "-K"],
+            help="Stable layout for prompt caching: rarely changed files first, prompt last",
+            flag=True,
+            sort_key=18,
+        ),
+        treeparse.option(
+            flags=["--record", "-H"],
+            help="Record the fold in .cfold/history.sqlite (or set record_history in .foldrc)",
+            flag=True,
+            sort_key=19,
+        ),
     ],
 )
 app.commands.append(fold_cmd)
 
 unfold_cmd = treeparse.command(
     name="unfold",
-    help="Unfold a modified fold file into a directory.",
+    help="Unfold modified fold files (merged in order, '-' for stdin) into a directory.",
     callback=unfold,
     arguments=[
-        treeparse.argument(name="foldfile", arg_type=str, sort_key=0),
+        treeparse.argument(name="foldfiles", arg_type=str, nargs="+", sort_key=0),
     ],
     options=[
         treeparse.option(
@@ -82,6 +191,26 @@ unfold_cmd = treeparse.command(
             default=None,
             sort_key=1,
         ),
+        treeparse.option(
+            flags=["--on-conflict", "-C"],
+            help="What to do with files changed locally since the fold: refuse, skip or merge",
+            arg_type=str,
+            default="refuse",
+            choices=["refuse", "skip", "merge"],
+            sort_key=2,
+        ),
+        treeparse.option(
+            flags=["--resume"],
+            help="Finish an interrupted unfold from its journal",
+            flag=True,
+            sort_key=3,
+        ),
+        treeparse.option(
+            flags=["--rollback"],
+            help="Undo an interrupted unfold from its journal",
+            flag=True,
+            sort_key=4,
+        ),
     ],
 )
 app.commands.append(unfold_cmd)
@@ -103,6 +232,113 @@ view_cmd = treeparse.command(
 )
 app.commands.append(view_cmd)
 
+stats_cmd = treeparse.command(
+    name="stats",
+    help="Report what a fold would include and exclude, without building or copying it.",
+    callback=stats,
+    options=[
+        treeparse.option(
+            flags=["--dialect", "-d"],
+            help="Dialect whose patterns to apply",
+            arg_type=str,
+            default="default",
+            sort_key=0,
+        ),
+        treeparse.option(
+            flags=["--top", "-n"],
+            help="Number of largest files to list",
+            arg_type=int,
+            default=10,
+            sort_key=1,
+        ),
+        treeparse.option(
+            flags=["--depth", "-D"],
+            help="Directory depth of the per-directory totals",
+            arg_type=int,
+            default=2,
+            sort_key=2,
+        ),
+    ],
+)
+app.commands.append(stats_cmd)
+
+cat_cmd = treeparse.command(
+    name="cat",
+    help="Print one file of a fold file without loading the whole fold.",
+    callback=cat,
+    arguments=[
+        treeparse.argument(name="foldfile", arg_type=str, sort_key=0),
+        treeparse.argument(name="path", arg_type=str, sort_key=1),
+    ],
+)
+app.commands.append(cat_cmd)
+
+extract_cmd = treeparse.command(
+    name="extract",
+    help="Write the files of a fold file matching glob patterns into a directory.",
+    callback=extract,
+    arguments=[
+        treeparse.argument(name="foldfile", arg_type=str, sort_key=0),
+    ],
+    options=[
+        treeparse.option(
+            flags=["--glob", "-g"],
+            help="Glob patterns of fold paths to extract",
+            arg_type=str,
+            nargs="+",
+            required=True,
+            sort_key=0,
+        ),
+        treeparse.option(
+            flags=["--output-dir", "-o"],
+            help="Output directory",
+            arg_type=str,
+            default=".",
+            sort_key=1,
+        ),
+    ],
+)
+app.commands.append(extract_cmd)
+
+history_group = treeparse.group(
+    name="history",
+    help="Browse the folds recorded in .cfold/history.sqlite.",
+    commands=[
+        treeparse.command(
+            name="list",
+            help="List recorded folds.",
+            callback=history_list,
+        ),
+        treeparse.command(
+            name="show",
+            help="Print a recorded fold, or write it to a file.",
+            callback=history_show,
+            arguments=[
+                treeparse.argument(name="snapshot", arg_type=int, sort_key=0),
+            ],
+            options=[
+                treeparse.option(
+                    flags=["--output", "-o"],
+                    help="Write the fold to this file instead of stdout",
+                    arg_type=str,
+                    default=None,
+                    sort_key=0,
+                ),
+            ],
+        ),
+        treeparse.command(
+            name="diff",
+            help="Show the file changes between two recorded folds.",
+            callback=history_diff,
+            arguments=[
+                treeparse.argument(name="old", arg_type=int, sort_key=0),
+                treeparse.argument(name="new", arg_type=int, sort_key=1),
+            ],
+        ),
+    ],
+)
+app.subgroups.append(history_group)
+
 add_cmd = treeparse.command(
     name="add",
     help="Add files to an existing cfold file.",
@@ -124,6 +360,27 @@ add_cmd = treeparse.command(
 )
 app.commands.append(add_cmd)
 
+serve_cmd = treeparse.command(
+    name="serve",
+    help="Serve warm fold indexes over a Unix socket; fold, view and add use it when running.",
+    callback=serve,
+    arguments=[
+        treeparse.argument(
+            name="roots", arg_type=str, nargs="*", default=[], sort_key=0
+        ),
+    ],
+    options=[
+        treeparse.option(
+            flags=["--socket", "-s"],
+            help="Socket path (default: $CFOLD_SOCKET or a per-user runtime path)",
+            arg_type=str,
+            default=None,
+            sort_key=0,
+        ),
+    ],
+)
+app.commands.append(serve_cmd)
+
 
 def main():
     app.run()
@@ -0,0 +1,31 @@
+"""Handle serve command for cfold."""
+
+import sys
+from pathlib import Path
+from rich.console import Console
+from cfold.utils.daemon import serve_forever, socket_path
+from typing import List
+
+
+def serve(roots: List[str], socket: str = None):
+    """Serve warm fold indexes for one or more roots over a Unix domain socket."""
+    console = Console()
+    roots = [str(Path(r).absolute()) for r in roots] or [str(Path.cwd())]
+    missing = [r for r in roots if not Path(r).is_dir()]
+    if missing:
+        console.print(f"Error: not a directory: {', '.join(missing)}", style="red")
+        sys.exit(1)
+    path = socket or socket_path()
+
+    def ready(server):
+        console.print(
+            f"Serving [blue]{', '.join(roots)}[/blue] on [cyan]{path}[/cyan], press Ctrl+C to stop."
+        )
+
+    try:
+        serve_forever(roots, path, ready)
+    except RuntimeError as e:
+        console.print(f"Error: {e}", style="red")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        console.print("[dim]Daemon stopped.[/dim]")
@@ -0,0 +1,59 @@
+"""Handle stats command: report what a fold would contain without building it."""
+
+import time
+from pathlib import Path
+from rich.console import Console
+from rich.table import Table
+from cfold.cli.fold import load_dialect
+from cfold.utils.foldignore import IgnoreMatcher
+from cfold.utils.stats import collect_stats, directory_totals, size_tokens
+
+
+def stats(dialect: str = "default", top: int = 10, depth: int = 2):
+    """Report included/excluded files, the largest files and sizes per directory."""
+    console = Console()
+    cwd = Path.cwd()
+    start = time.perf_counter()
+    dialect, _, patterns = load_dialect(dialect, cwd, console)
+    config_time = time.perf_counter() - start
+    result = collect_stats(cwd, patterns, IgnoreMatcher(cwd))
+    timings = {"config": config_time, **result.timings}
+
+    total = sum(size for _, size in result.files)
+    console.print(
+        f"Dialect [cyan]{dialect}[/cyan]: [green]{len(result.files)}[/green] file(s), "
+        f"{total} bytes, ~{size_tokens(total)} tokens; "
+        f"{sum(result.skipped_files.values())} file(s) excluded, "
+        f"{sum(result.pruned_dirs.values())} dir(s) pruned."
+    )
+
+    excluded = Table("excluded by", "files", "dirs pruned", title="Exclusions")
+    for reason in sorted(
+        set(result.skipped_files) | set(result.pruned_dirs),
+        key=lambda r: -(result.skipped_files[r] + result.pruned_dirs[r]),
+    ):
+        excluded.add_row(
+            reason, str(result.skipped_files[reason]), str(result.pruned_dirs[reason])
+        )
+    if excluded.rows:
+        console.print(excluded)
+
+    largest = Table("file", "bytes", "~tokens", title=f"Largest {top} files")
+    for rel, size in sorted(result.files, key=lambda item: -item[1])[:top]:
+        largest.add_row(rel, str(size), str(size_tokens(size)))
+    if result.files:
+        console.print(largest)
+
+    directories = Table("directory", "files", "bytes", "~tokens", title="Per directory")
+    for directory, (count, size) in sorted(directory_totals(result.files).items()):
+        if directory != "." and directory.count("/") >= depth:
+            continue
+        directories.add_row(directory, str(count), str(size), str(size_tokens(size)))
+    if result.files:
+        console.print(directories)
+
+    console.print(
+        "[dim]Time: "
+        + ", ".join(f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in timings.items())
+        + "[/dim]"
+    )
@@ -1,108 +1,218 @@
 """Handle unfolding command for cfold."""
 
 import os
-import shutil
 import json
 from rich.console import Console
 from rich.tree import Tree
-from pathlib import Path
-from cfold.utils.foldignore import should_include_file
-from cfold.core.models import Codebase  # Added for Pydantic model
+from cfold.core.models import Codebase, FileEntry, FileState  # Added for Pydantic model
+from cfold.utils.journal import (
+    Journal,
+    Step,
+    apply_steps,
+    discard_staged,
+    fsync_paths,
+    rollback_steps,
+    stage_copy,
+    stage_text,
+)
+from cfold.utils.manifest import (
+    base_content,
+    build_manifest,
+    changed_files,
+    load_manifest,
+    save_manifest,
+)
+from cfold.utils.patching import PatchError, entry_content, merge3
+from cfold.utils.regions import apply_regions
+from cfold.utils.notebooks import fold_content, is_notebook, unfold_content
+from cfold.utils.plan import Operation, plan_unfold
+from cfold.utils.streaming import FoldStream, read_chunks
+from pydantic import ValidationError
+from typing import Callable, Dict, List, Optional, Tuple
+import sys
 
 
-def unfold(foldfile, original_dir=None, output_dir=None):
-    """Unfold a modified fold file into a directory."""
+def unfold(
+    foldfiles: List[str],
+    original_dir=None,
+    output_dir=None,
+    on_conflict="refuse",
+    resume=False,
+    rollback=False,
+):
+    """Unfold one or more modified fold files into a directory."""
     console = Console()
+    foldfiles = [foldfiles] if isinstance(foldfiles, str) else list(foldfiles)
     cwd = os.getcwd()
     output_dir = os.path.abspath(output_dir or cwd)
-    output_path = Path(output_dir).resolve()
-    # Note: included_patterns etc. seem unused in unfold; if needed, adjust
+    if recover(output_dir, resume, rollback, console) or resume or rollback:
+        return
+    if not (original_dir and os.path.isdir(original_dir)):
+        original_dir = None
 
-    with open(foldfile, "r", encoding="utf-8") as infile:
-        raw_data = json.load(infile)
-        data = Codebase.model_validate(raw_data)
+    if foldfiles == ["-"] and not original_dir:
+        # Apply entries as they arrive; copying an original tree needs the whole answer
+        results = stream_unfold(sys.stdin, output_dir, on_conflict, console)
+        print_summary(console, output_dir, *results)
+        return
+    folds = [(name, load_fold(name, console)) for name in foldfiles]
+    for _, fold_data in folds:
+        warn_transforms(fold_data.files, console)
+    # Regions, like edits and patches, are applied to the current file, not checked
+    regions = {e.path for _, d in folds for e in d.files if e.start_line is not None}
 
-    modified_files = {f.path: f for f in data.files}
+    failed_files = []
+    superseded = []
+    if len(folds) == 1:
+        data = folds[0][1]
+    else:
+        data, superseded = merge_folds(
+            folds,
+            lambda path: os.path.join(original_dir or output_dir, path),
+            failed_files,
+        )
+    modified_files = collapse_regions(
+        data.files,
+        lambda path: os.path.join(original_dir or output_dir, path),
+        failed_files,
+    )
+
+    operations, unsafe = plan_unfold(modified_files, output_dir, original_dir)
+    for path in unsafe:
+        console.print(f"[yellow]Skipping operation outside output dir: {path}[/yellow]")
+    skipped_files = []
+    base_root = original_dir or output_dir
+    # Answers come back without a manifest; the one saved by fold is checked instead
+    saved = load_manifest(base_root) if data.manifest is None else {}
+    manifest = {
+        k: v for k, v in (data.manifest or saved).items() if k not in regions
+    }
+    if manifest:
+        operations, conflicts = resolve_conflicts(
+            operations, manifest, on_conflict, base_root, failed_files
+        )
+        if conflicts and on_conflict == "refuse":
+            console.print(
+                "Files changed locally since the fold, nothing was written "
+                "(use --on-conflict skip or merge):",
+                style="red",
+            )
+            for path in conflicts:
+                console.print(f"  {path}", style="red")
+            sys.exit(1)
+        if on_conflict == "skip":
+            skipped_files = conflicts
 
     if os.path.exists(output_dir) and os.listdir(output_dir):
         console.print(f"[dim]Merging into existing directory: {output_dir}[/dim]")
     else:
         os.makedirs(output_dir, exist_ok=True)
 
-    added_files = []
-    deleted_files = []
-    modified_files_list = []
-
-    if original_dir and os.path.isdir(original_dir):
-        original_dir = os.path.abspath(original_dir)
-        for dirpath, _, filenames in os.walk(original_dir):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                if should_include_file(
-                    filepath,
-                    original_dir,
-                    [],  # included_patterns empty or adjust
-                    [],  # excluded_patterns
-                    [],  # included_dirs
-                ):
-                    relpath = os.path.relpath(
-                        filepath, original_dir
-                    )  # Changed to relpath from original_dir
-                    dst = os.path.join(output_dir, relpath)
-                    if relpath in modified_files:
-                        entry = modified_files[relpath]
-                        if entry.delete:
-                            if os.path.exists(dst):
-                                os.remove(dst)
-                            deleted_files.append(relpath)
-                        else:
-                            os.makedirs(os.path.dirname(dst), exist_ok=True)
-                            with open(dst, "w", encoding="utf-8") as outfile:
-                                outfile.write(entry.content)
-                            modified_files_list.append(relpath)
-                    else:
-                        os.makedirs(os.path.dirname(dst), exist_ok=True)
-                        if os.path.abspath(filepath) != os.path.abspath(dst):
-                            shutil.copy2(filepath, dst)
-                            added_files.append(relpath)
-
-        for path, entry in modified_files.items():
-            original_path = os.path.join(original_dir, path)
-            if os.path.exists(original_path):
-                continue  # Already handled
-            if entry.delete:
-                continue  # Skip deleting non-existing
-            full_path = os.path.join(output_dir, path)
-            resolved_path = Path(full_path).resolve()
-            if not resolved_path.is_relative_to(output_path):
-                console.print(
-                    f"[yellow]Skipping addition outside output dir: {path}[/yellow]"
-                )
+    added_files, modified_files_list, deleted_files = execute_plan(
+        operations, output_dir, failed_files
+    )
+    if saved and os.path.abspath(base_root) == output_dir:
+        record_written(output_dir, added_files + modified_files_list, deleted_files)
+
+    print_summary(
+        console,
+        output_dir,
+        added_files,
+        modified_files_list,
+        deleted_files,
+        failed_files,
+        skipped_files,
+        superseded,
+    )
+
+
+def load_fold(name: str, console: Console) -> Codebase:
+    """Load a fold file, or the fold found in stdin for '-'."""
+    if name == "-":
+        # Merged with other folds or an original tree, so the whole fold is read first
+        stream = FoldStream()
+        for chunk in read_chunks(sys.stdin):
+            stream.feed(chunk)
+            if stream.end is not None:
+                break  # trailing prose of an answer is not waited for
+        return Codebase.model_validate(read_stream_document(stream, console))
+    with open(name, "r", encoding="utf-8") as infile:
+        return Codebase.model_validate(json.load(infile))
+
+
+def merge_folds(
+    folds: List[Tuple[str, Codebase]], base_path: Callable[[str], str], failed: List
+) -> Tuple[Codebase, List[Tuple[str, str]]]:
+    """Merge the entries of several folds in order into one net change per path.
+
+    Later whole-file contents and deletes win (a delete followed by an add is an add);
+    later edits, patches and regions are applied to the content merged so far.
+    Returns the merged fold and (path, 'earlier -> later') for overwritten changes.
+    """
+    merged: Dict[str, FileEntry] = {}
+    origin: Dict[str, str] = {}
+    superseded = []
+    manifest: Dict[str, FileState] = {}
+
+    def current(path: str) -> Optional[str]:
+        """Return the folded form of a path as of the folds merged so far."""
+        entry = merged.get(path)
+        if entry is not None and entry.delete:
+            return None
+        original = read_existing(base_path(path))
+        original = fold_content(path, original) if original is not None else None
+        return original if entry is None else entry_content(entry, original)
+
+    for name, data in folds:
+        for path, state in (data.manifest or {}).items():
+            manifest.setdefault(path, state)  # the earliest fold saw the base
+        groups: Dict[str, List[FileEntry]] = {}
+        whole = {e.path for e in data.files if e.start_line is None or e.delete}
+        for entry in data.files:
+            path = entry.path
+            if entry.start_line is not None and not entry.delete:
+                groups.setdefault(path, []).append(entry)
                 continue
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            with open(full_path, "w", encoding="utf-8") as outfile:
-                outfile.write(entry.content)
-            added_files.append(path)
-    else:
-        for path, entry in modified_files.items():
-            full_path = os.path.join(output_dir, path)
-            resolved_path = Path(full_path).resolve()
-            if not resolved_path.is_relative_to(output_path):
-                console.print(
-                    f"[yellow]Skipping operation outside output dir: {path}[/yellow]"
+            if path in merged and (entry.delete or entry.content is not None):
+                superseded.append(
+                    (path, f"{os.path.basename(origin[path])} -> {os.path.basename(name)}")
                 )
+            elif path in merged:
+                try:
+                    entry = FileEntry(
+                        path=path, content=entry_content(entry, current(path))
+                    )
+                except PatchError as e:
+                    failed.append((path, f"{name}: {e}"))
+                    continue
+            merged[path] = entry
+            origin[path] = name
+        for path, group in groups.items():
+            if path in whole:
+                continue  # a whole-file entry replaces the regions
+            try:
+                text = current(path)
+                if text is None:
+                    raise ValueError("file does not exist, regions need the original file")
+                merged[path] = FileEntry(path=path, content=apply_regions(text, group))
+            except (ValueError, SyntaxError) as e:
+                failed.append((path, f"{name}: {e}"))
                 continue
-            if entry.delete:
-                if os.path.exists(full_path):
-                    os.remove(full_path)
-                    deleted_files.append(path)
-                continue
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            with open(full_path, "w", encoding="utf-8") as outfile:
-                outfile.write(entry.content)
-            added_files.append(path)
+            origin[path] = name
+    return Codebase(files=list(merged.values()), manifest=manifest or None), superseded
+
 
-    # Output summary tree
+def print_summary(
+    console: Console,
+    output_dir: str,
+    added_files: List[str],
+    modified_files_list: List[str],
+    deleted_files: List[str],
+    failed_files: List,
+    skipped_files: List[str] = (),
+    superseded: List[Tuple[str, str]] = (),
+):
+    """Print the operations tree and exit with status 1 if any file failed."""
     tree = Tree(
         f"[bold dim]Operations in[/bold dim] [blue]{output_dir}[/blue]",
         guide_style="dim",
@@ -119,5 +229,319 @@ def unfold(foldfile, original_dir=None, output_dir=None):
         modified_node = tree.add("[yellow]Modified files[/yellow]")
         for file in modified_files_list:
             modified_node.add("[dim]" + file + "[/dim]")
+    if skipped_files:
+        skipped_node = tree.add("[yellow]Skipped files (changed locally)[/yellow]")
+        for file in skipped_files:
+            skipped_node.add("[dim]" + file + "[/dim]")
+    if superseded:
+        superseded_node = tree.add("[yellow]Overwritten by a later fold[/yellow]")
+        for file, folds in superseded:
+            superseded_node.add(f"[dim]{file}[/dim] {folds}")
+    if failed_files:
+        failed_node = tree.add("[bold red]Failed files[/bold red]")
+        for file, reason in failed_files:
+            failed_node.add(f"[dim]{file}[/dim] [red]{reason}[/red]")
     console.print(tree)
     console.print(f"[bold dim]Codebase unfolded into {output_dir}[/bold dim]")
+    if failed_files:
+        console.print(
+            f"{len(failed_files)} file(s) could not be updated, left unchanged.",
+            style="red",
+        )
+        sys.exit(1)
+
+
+def warn_transforms(entries: List[FileEntry], console: Console):
+    """Warn about entries whose content went through lossy transforms."""
+    for entry in entries:
+        if entry.transforms and not entry.delete:
+            console.print(
+                f"Warning: {entry.path} was folded with lossy transforms "
+                f"({', '.join(entry.transforms)}); its content is written back as is.",
+                style="yellow",
+            )
+
+
+def read_stream_document(stream: FoldStream, console: Console) -> dict:
+    """Return the fold object found in streamed input, or exit if there is none."""
+    try:
+        return stream.document()
+    except ValueError as e:
+        console.print(f"Error reading the fold from stdin: {e}", style="red")
+        sys.exit(1)
+
+
+def stream_unfold(stdin, output_dir: str, on_conflict: str, console: Console):
+    """Apply each files entry of a fold streamed on stdin as soon as it is complete.
+
+    Entries are checked against the manifest saved by fold, known before the
+    first one arrives; in 'refuse' mode a changed file is reported and left
+    alone. Region entries wait for the end of the stream so they are spliced
+    together. Returns (added, modified, deleted, failed, skipped).
+    """
+    added, modified, deleted, failed, skipped = [], [], [], [], []
+    regions = []
+    saved = load_manifest(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    def apply(entries: List[FileEntry], check: bool = True):
+        warn_transforms(entries, console)
+        collapsed = collapse_regions(
+            entries, lambda path: os.path.join(output_dir, path), failed
+        )
+        operations, unsafe = plan_unfold(collapsed, output_dir)
+        for path in unsafe:
+            console.print(
+                f"[yellow]Skipping operation outside output dir: {path}[/yellow]"
+            )
+        if check and saved:
+            operations, conflicts = resolve_conflicts(
+                operations, saved, on_conflict, output_dir, failed
+            )
+            if on_conflict == "skip":
+                skipped.extend(conflicts)
+            elif on_conflict == "refuse":
+                failed.extend(
+                    (path, "changed locally since the fold, not written (see --on-conflict)")
+                    for path in conflicts
+                )
+        results = execute_plan(operations, output_dir, failed)
+        for paths, done in zip((added, modified, deleted), results):
+            paths.extend(done)
+
+    stream = FoldStream()
+    for chunk in read_chunks(stdin):
+        for raw in stream.feed(chunk):
+            try:
+                entry = FileEntry.model_validate(raw)
+            except ValidationError as e:
+                path = raw.get("path", "?") if isinstance(raw, dict) else "?"
+                failed.append((path, str(e).splitlines()[-1].strip()))
+                continue
+            if entry.start_line is not None and not entry.delete:
+                regions.append(entry)
+            else:
+                apply([entry])
+        if stream.end is not None:
+            break  # trailing prose of an answer is not waited for
+    read_stream_document(stream, console)
+    if regions:
+        # Regions, like edits and patches, are applied to the current file
+        apply(regions, check=False)
+    if saved:
+        record_written(output_dir, added + modified, deleted)
+    return added, modified, deleted, failed, skipped
+
+
+def record_written(output_dir: str, written: List[str], deleted: List[str]):
+    """Update the saved manifest with the files an unfold wrote.
+
+    A follow-up answer builds on these files, not on the folded ones.
+    """
+    save_manifest(output_dir, build_manifest(output_dir, written), removed=deleted)
+
+
+def resolve_conflicts(
+    operations: List[Operation],
+    manifest: Dict[str, FileState],
+    mode: str,
+    base_root: str,
+    failed: List,
+) -> Tuple[List[Operation], List[str]]:
+    """Find files changed since the fold; drop or 3-way merge their operations.
+
+    Returns the operations to run and the conflicting paths. In 'merge' mode whole-file
+    content is merged with the local changes against the folded version; edits and
+    patches already apply to the current file.
+    """
+    checks = [
+        (op.path, op.source, manifest[op.path])
+        for op in operations
+        if op.action != "copy" and op.path in manifest
+    ]
+    conflicts = set(changed_files(checks))
+    if mode != "merge":
+        kept = [op for op in operations if op.path not in conflicts]
+        return kept, sorted(conflicts)
+    kept = []
+    for op in operations:
+        if op.path not in conflicts or (
+            op.action == "write" and op.entry.content is None
+        ):
+            kept.append(op)
+            continue
+        try:
+            if op.action == "delete":
+                raise PatchError("changed locally, not deleting it")
+            current = read_existing(op.source)
+            if current is None:
+                raise PatchError("deleted locally since the fold")
+            base = base_content(base_root, manifest[op.path])
+            if base is None:
+                raise PatchError("changed locally and the folded version is not cached")
+            merged = merge3(
+                fold_content(op.path, base),
+                fold_content(op.path, current),
+                op.entry.content,
+            )
+        except PatchError as e:
+            failed.append((op.path, str(e)))
+            continue
+        kept.append(op._replace(entry=op.entry.model_copy(update={"content": merged})))
+    return kept, sorted(conflicts)
+
+
+def execute_plan(
+    operations: List[Operation], output_dir: str, failed: List
+) -> Tuple[List[str], List[str], List[str]]:
+    """Apply planned operations under output_dir; return (added, modified, deleted).
+
+    New contents are staged next to their targets first, then renamed into place
+    under a journal so an interrupted run can be resumed or rolled back. A file that
+    cannot be staged is reported in failed and left unchanged.
+    """
+    added, modified, deleted = [], [], []
+    steps = []
+    journal = Journal(output_dir)
+    staging = [op.path for op in operations if op.action != "delete"]
+    if staging:
+        # Journaled first, so temp files of a run that dies before begin() are found
+        journal.stage(staging)
+    for op in operations:
+        dst = os.path.join(output_dir, op.path)
+        backup = op.path if os.path.lexists(dst) else None
+        if op.action == "delete":
+            if backup:
+                steps.append(Step("delete", op.path, backup=backup))
+            deleted.append(op.path)
+            continue
+        try:
+            if op.action == "copy":
+                tmp = stage_copy(output_dir, op.path, op.source)
+                done = added
+            else:
+                content = render_entry(op.entry, op.source, failed)
+                if content is not None:
+                    tmp = stage_text(output_dir, op.path, content)
+                    done = modified if op.existed else added
+                elif op.existed and os.path.abspath(op.source) != os.path.abspath(dst):
+                    # Keep the original when the edit does not apply
+                    tmp = stage_copy(output_dir, op.path, op.source)
+                    done = None
+                else:
+                    continue
+        except OSError as e:
+            discard_staged(output_dir, op.path)
+            failed.append((op.path, f"could not be staged: {e}"))
+            continue
+        if done is not None:
+            done.append(op.path)
+        steps.append(Step("replace", op.path, tmp, backup))
+    if steps:
+        try:
+            fsync_paths(
+                [os.path.join(output_dir, s.tmp) for s in steps if s.tmp], dirs=False
+            )
+            journal.begin(steps)
+        except BaseException:
+            # Nothing was moved yet; leave no staged files behind
+            for step in steps:
+                if step.tmp:
+                    discard_staged(output_dir, step.path)
+            if journal.exists():
+                journal.finish()
+            raise
+        apply_steps(journal, steps)
+        journal.finish()
+    elif staging:
+        journal.finish()  # nothing could be staged
+    return added, modified, deleted
+
+
+def recover(output_dir: str, resume: bool, rollback: bool, console: Console) -> bool:
+    """Resume or roll back an interrupted unfold; return False if there was none.
+
+    A run that died before journaling its steps changed nothing; its staged
+    temp files are removed and False is returned.
+    """
+    journal = Journal(output_dir)
+    if not journal.exists():
+        if resume or rollback:
+            console.print(f"No interrupted unfold in {output_dir}.", style="yellow")
+        return False
+    steps, done = journal.load()
+    if not steps:
+        # The run died while staging: nothing was moved, only temp files are left
+        for rel in journal.staging():
+            discard_staged(output_dir, rel)
+        journal.finish()
+        console.print(
+            f"[dim]Removed files staged by an interrupted unfold in {output_dir}.[/dim]"
+        )
+        return False
+    if rollback:
+        rollback_steps(journal, steps)
+        journal.finish()
+        console.print(f"Rolled back the interrupted unfold in {output_dir}.")
+    elif resume:
+        apply_steps(journal, steps, done)
+        journal.finish()
+        console.print(
+            f"Resumed the interrupted unfold in {output_dir}: "
+            f"{len(steps) - done} of {len(steps)} operation(s) left were applied."
+        )
+    else:
+        console.print(
+            f"An interrupted unfold left a journal in {journal.directory}; "
+            "run unfold with --resume or --rollback first.",
+            style="red",
+        )
+        sys.exit(1)
+    return True
+
+
+def collapse_regions(
+    entries: List[FileEntry], base_path: Callable[[str], str], failed: List
+) -> Dict[str, FileEntry]:
+    """Map paths to entries, splicing region entries into whole-file entries."""
+    result = {}
+    regions = {}
+    for entry in entries:
+        if entry.outline and not entry.delete:
+            failed.append((entry.path, "outline entry, refusing to overwrite the file"))
+        elif entry.start_line is None or entry.delete:
+            result[entry.path] = entry
+        else:
+            regions.setdefault(entry.path, []).append(entry)
+    for path, group in regions.items():
+        if path in result:
+            continue  # a whole-file entry replaces the regions
+        try:
+            original = read_existing(base_path(path))
+            if original is None:
+                raise ValueError("file does not exist, regions need the original file")
+            result[path] = FileEntry(path=path, content=apply_regions(original, group))
+        except (ValueError, SyntaxError) as e:
+            failed.append((path, str(e)))
+    return result
+
+
+def read_existing(path) -> Optional[str]:
+    """Read the current content of a file, or None if it does not exist."""
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as infile:
+        return infile.read()
+
+
+def render_entry(entry: FileEntry, base: str, failed: List) -> Optional[str]:
+    """Return an entry's new content, applying edits/patch against base; None on failure."""
+    try:
+        notebook = is_notebook(entry.path)
+        original = read_existing(base) if entry.content is None or notebook else None
+        # Edits and patches of notebooks are made against their folded text form
+        current = fold_content(entry.path, original) if original is not None else None
+        return unfold_content(entry.path, entry_content(entry, current), original)
+    except PatchError as e:
+        failed.append((entry.path, str(e)))
+        return None
@@ -4,16 +4,27 @@ import json
 from rich.console import Console
 from rich.tree import Tree
 from cfold.core.models import Codebase
+from cfold.utils.daemon import request_daemon
+from pathlib import Path
 
 
 def view(foldfile: str):
     """View the prompts and files in a fold file."""
     console = Console()
 
+    served = request_daemon("view", foldfile=str(Path(foldfile).absolute()))
     try:
-        with open(foldfile, "r", encoding="utf-8") as infile:
-            raw_data = json.load(infile)
-            data = Codebase.model_validate(raw_data)
+        if served is not None:
+            data = Codebase.model_validate(
+                {
+                    "instructions": served["instructions"],
+                    "files": [{**f, "content": ""} for f in served["files"]],
+                }
+            )
+        else:
+            with open(foldfile, "r", encoding="utf-8") as infile:
+                raw_data = json.load(infile)
+                data = Codebase.model_validate(raw_data)
     except Exception as e:
         console.print(f"Error loading {foldfile}: {e}", style="red")
         return
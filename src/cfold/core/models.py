@@ -1,7 +1,21 @@
 """Pydantic models for cfold data structures."""
 
-from typing import List, Optional
-from pydantic import BaseModel, field_validator, model_validator
+from typing import Dict, List, Optional
+from pydantic import BaseModel, field_validator, model_serializer, model_validator
+
+# Optional FileEntry fields left out of dumps when unset, keeping folds in the base schema
+OPTIONAL_ENTRY_FIELDS = (
+    "patch",
+    "edits",
+    "start_line",
+    "end_line",
+    "symbol",
+    "outline",
+    "transforms",
+)
+
+
+PROMPT_NAME = "prompt"  # the user prompt instruction, last in cache-friendly folds
 
 
 class Instruction(BaseModel):
@@ -11,21 +25,68 @@ class Instruction(BaseModel):
     synopsis: Optional[str] = None
 
 
+class Edit(BaseModel):
+    search: str  # exact text to find, must occur exactly once
+    replace: str
+
+
 class FileEntry(BaseModel):
     path: str
     content: Optional[str] = None
     delete: bool = False
+    patch: Optional[str] = None  # unified diff against the current file
+    edits: Optional[List[Edit]] = None  # search/replace blocks, applied in order
+    start_line: Optional[int] = None  # content is lines start..end (1-based) of path
+    end_line: Optional[int] = None
+    symbol: Optional[str] = None  # dotted Python symbol the region was taken from
+    outline: Optional[bool] = None  # content is a read-only API skeleton of path
+    transforms: Optional[List[str]] = None  # lossy transforms applied to content
 
     @model_validator(mode="after")
     def check_content(self):
-        if not self.delete and self.content is None:
+        given = [
+            name
+            for name in ("content", "patch", "edits")
+            if getattr(self, name) is not None
+        ]
+        if not self.delete and not given:
             raise ValueError("Content must be provided if not deleting")
+        if len(given) > 1 and not self.delete:
+            raise ValueError(f"Provide only one of content, patch or edits, got {given}")
+        if (self.start_line is None) != (self.end_line is None):
+            raise ValueError("start_line and end_line must be given together")
         return self
 
+    @model_serializer(mode="wrap")
+    def drop_unset_optional(self, handler):
+        data = handler(self)
+        for key in OPTIONAL_ENTRY_FIELDS:
+            if key in data and data[key] is None:
+                del data[key]
+        return data
+
+
+class FileState(BaseModel):
+    sha256: str  # hash of the file bytes when it was folded
+    size: int
+    mtime_ns: Optional[int] = None  # lets unfold skip hashing files that were not touched
+
 
 class Codebase(BaseModel):
     instructions: List[Instruction] = []
     files: List[FileEntry] = []
+    manifest: Optional[Dict[str, FileState]] = None  # path -> state of the folded file
+
+    @model_validator(mode="before")
+    @classmethod
+    def merge_trailing_prompt(cls, data):
+        # Cache-friendly folds carry the user prompt after the files
+        if isinstance(data, dict) and PROMPT_NAME in data:
+            data = dict(data)
+            data["instructions"] = list(data.get("instructions", [])) + list(
+                data.pop(PROMPT_NAME) or []
+            )
+        return data
 
     @field_validator("instructions", mode="before")
     @classmethod
@@ -33,3 +94,10 @@ class Codebase(BaseModel):
         if isinstance(v, dict):
             return [Instruction(**item) for item in v]
         return v
+
+    @model_serializer(mode="wrap")
+    def drop_empty_manifest(self, handler):
+        data = handler(self)
+        if data.get("manifest") is None:
+            data.pop("manifest", None)
+        return data
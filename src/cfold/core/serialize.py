@@ -0,0 +1,133 @@
+"""Encode folds to JSON bytes: orjson when installed, the stdlib json module otherwise.
+
+Both backends write the same layout as json.dumps(..., indent=2) (or compact
+separators), so folds stay readable by any JSON parser. The stdlib backend is
+byte-identical to json.dumps; orjson writes non-ASCII text as UTF-8 instead of
+\\u escapes.
+"""
+
+import json
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from cfold.core.models import PROMPT_NAME, Codebase, FileEntry
+
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+INDENT = "  "
+
+_compact_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def encode(
+    obj, compact: bool = False, level: int = 0, canonical: bool = False
+) -> bytes:
+    """Encode a JSON value as it appears nested at an indent level of a fold.
+
+    canonical output uses the stdlib encoder, so it is the same on every machine.
+    """
+    fast = None if canonical else orjson
+    if compact:
+        if fast is not None:
+            return fast.dumps(obj)
+        return _compact_encoder.encode(obj).encode("utf-8")
+    if fast is None:
+        data = json.dumps(obj, indent=2).encode("utf-8")
+    else:
+        data = fast.dumps(obj, option=fast.OPT_INDENT_2)
+    # Encoded strings hold no raw newlines, so every newline starts an indented line
+    return data.replace(b"\n", b"\n" + INDENT.encode() * level) if level else data
+
+
+def single_line(text: bytes) -> bytes:
+    """Put an indented encoding on one line, like json.dumps without indent.
+
+    Encoded strings hold no raw newlines, so every newline and its indent can
+    be dropped; an item separator keeps json.dumps' ", " spacing.
+    """
+    lines = [line.lstrip(b" ") for line in text.split(b"\n")]
+    return b"".join(line + b" " if line.endswith(b",") else line for line in lines)
+
+
+def encode_entries(
+    entries: Iterable[FileEntry], compact: bool = False, canonical: bool = False
+) -> bytes:
+    """Encode file entries as the items of a fold's files list, without the brackets."""
+    if compact:
+        return b",".join(encode(e.model_dump(), True, 0, canonical) for e in entries)
+    pad = (INDENT * 2).encode()
+    return b",\n".join(
+        pad + encode(e.model_dump(), False, 2, canonical) for e in entries
+    )
+
+
+def fold_chunks(
+    instructions: List[Dict],
+    fragments: Iterable[bytes],
+    manifest: Optional[Dict] = None,
+    compact: bool = False,
+    canonical: bool = False,
+    prompt: Optional[List[Dict]] = None,
+) -> Iterator[bytes]:
+    """Yield a fold document piece by piece, concatenating files fragments in order.
+
+    instructions, manifest and prompt are dumped models; empty fragments are
+    skipped. Folds written by cfold carry no manifest, it is saved locally instead.
+    prompt instructions go in a trailing "prompt" list, after everything else.
+    """
+    if compact:
+        yield b'{"instructions":' + encode(instructions, True, 0, canonical)
+        yield b',"files":['
+        sep, first, last = b",", b"", b"]"
+    else:
+        yield b'{\n  "instructions": ' + encode(instructions, False, 1, canonical)
+        yield b',\n  "files": ['
+        sep, first, last = b",\n", b"\n", b"\n  ]"
+    written = False
+    for fragment in fragments:
+        if fragment:
+            yield sep if written else first
+            yield fragment
+            written = True
+    yield last if written else b"]"
+    if manifest is not None:
+        key = b',"manifest":' if compact else b',\n  "manifest": '
+        yield key + encode(manifest, compact, 1, canonical)
+    if prompt:
+        key = b',"prompt":' if compact else b',\n  "prompt": '
+        yield key + encode(prompt, compact, 1, canonical)
+    yield b"}" if compact else b"\n}"
+
+
+def _dump_manifest(data: Codebase) -> Optional[Dict]:
+    if data.manifest is None:
+        return None
+    return {path: state.model_dump() for path, state in data.manifest.items()}
+
+
+def dump_fold(
+    data: Codebase, compact: bool = False, cache_friendly: bool = False
+) -> bytes:
+    """Encode a fold, equivalent to json.dumps(data.model_dump(), indent=2).
+
+    cache_friendly output is canonical and moves the user prompt to the end, so
+    folds that differ only in later files or the prompt share a byte prefix.
+    """
+    instructions = [i.model_dump() for i in data.instructions]
+    prompt = None
+    if cache_friendly:
+        prompt = [i for i in instructions if i["name"] == PROMPT_NAME]
+        instructions = [i for i in instructions if i["name"] != PROMPT_NAME]
+    return b"".join(
+        fold_chunks(
+            instructions,
+            [encode_entries(data.files, compact, cache_friendly)],
+            _dump_manifest(data),
+            compact,
+            cache_friendly,
+            prompt,
+        )
+    )
@@ -0,0 +1,118 @@
+"""Content-addressed on-disk cache and cached parallel mapping of text transforms."""
+
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+STATE_DIR = ".cfold"
+MIN_PARALLEL = 8  # below this many misses a process pool costs more than it saves
+PRUNE_INTERVAL = 24 * 3600  # seconds between two prune passes over a cache
+
+
+def state_dir(root) -> Path:
+    """Return the per-project .cfold directory, creating it (git-ignored) on first use."""
+    directory = Path(root) / STATE_DIR
+    if not directory.is_dir():
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / ".gitignore").write_text("*\n", encoding="utf-8")
+    return directory
+
+
+def content_hash(text) -> str:
+    """Return the sha256 hex digest of a text or bytes value."""
+    if isinstance(text, str):
+        text = text.encode("utf-8")
+    return hashlib.sha256(text).hexdigest()
+
+
+class ContentCache:
+    """Store derived texts on disk under keys derived from their input content."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    @classmethod
+    def for_root(cls, root, namespace: str) -> Optional["ContentCache"]:
+        """Return the cache for a namespace under root/.cfold, or None if it is not writable."""
+        try:
+            return cls(state_dir(root) / "cache" / namespace)
+        except OSError:
+            return None
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key[2:]
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            return self._path(key).read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def touch(self, key: str) -> bool:
+        """Mark a cached key as used now; return False if it is not cached."""
+        try:
+            os.utime(self._path(key))
+            return True
+        except OSError:
+            return False
+
+    def prune(self, max_age: float):
+        """Remove entries unused for max_age seconds, at most once per PRUNE_INTERVAL."""
+        stamp = self.directory / ".pruned"
+        now = time.time()
+        try:
+            if now - stamp.stat().st_mtime < PRUNE_INTERVAL:
+                return
+        except OSError:
+            pass
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            stamp.touch()
+        except OSError:
+            return
+        for path in self.directory.glob("??/*"):
+            try:
+                if now - path.stat().st_mtime > max_age:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def put(self, key: str, value: str):
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(value, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the cache is best effort, e.g. on a read-only checkout
+
+
+def map_cached(
+    func: Callable[[Any], str],
+    items: List[Any],
+    cache: Optional[ContentCache],
+    version: str,
+    workers: Optional[int] = None,
+    key: Callable[[Any], str] = str,
+) -> List[str]:
+    """Apply a picklable function to many items, reusing cached results by content hash.
+
+    key(item) must capture everything the result depends on besides version.
+    """
+    keys = [content_hash(f"{version}\0{key(item)}") for item in items]
+    results: List[Optional[str]] = [cache.get(k) if cache else None for k in keys]
+    missing = [i for i, r in enumerate(results) if r is None]
+    if len(missing) >= MIN_PARALLEL and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            computed = list(pool.map(func, [items[i] for i in missing], chunksize=8))
+    else:
+        computed = [func(items[i]) for i in missing]
+    for i, value in zip(missing, computed):
+        results[i] = value
+        if cache is not None:
+            cache.put(keys[i], value)
+    return results
@@ -0,0 +1,69 @@
+"""Rank files by how often they change, for prompt-cache-friendly fold layouts."""
+
+import sqlite3
+import subprocess
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List, Optional, Set, Tuple
+
+from cfold.utils.cache import STATE_DIR
+from cfold.utils.foldignore import walk_order_key
+from cfold.utils.history import HISTORY_FILE, change_counts, connect
+
+MAX_COMMITS = 2000  # how far back git history is read; older churn matters less
+
+
+def _git(root, *args) -> Optional[List[str]]:
+    try:
+        out = subprocess.run(
+            ["git", "-C", str(root), *args, "-z"],
+            capture_output=True,
+            check=True,
+            timeout=30,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.decode("utf-8", "surrogateescape").split("\0")
+
+
+def git_churn(root) -> Optional[Tuple[Counter, Set[str]]]:
+    """Return (commits touching each path, paths changed in the work tree), or None."""
+    log = _git(
+        root,
+        "log",
+        f"-n{MAX_COMMITS}",
+        "--format=",
+        "--name-only",
+        "--no-renames",
+        "--relative",
+    )
+    if log is None:
+        return None
+    dirty = set(_git(root, "diff", "--name-only", "--relative", "HEAD") or [])
+    dirty |= set(_git(root, "ls-files", "--others", "--exclude-standard") or [])
+    return Counter(path for path in log if path), dirty - {""}
+
+
+def history_churn(root) -> Counter:
+    """Count content changes per path across the folds recorded in the history."""
+    if not (Path(root) / STATE_DIR / HISTORY_FILE).is_file():
+        return Counter()
+    try:
+        conn = connect(root)
+        try:
+            return change_counts(conn)
+        finally:
+            conn.close()
+    except (sqlite3.Error, KeyError):
+        return Counter()
+
+
+def churn_order(root) -> Callable[[str], tuple]:
+    """Return a sort key putting rarely changed files first, then walk order.
+
+    Churn comes from git history, with uncommitted and untracked files last,
+    or from the local fold history outside a git work tree.
+    """
+    churn = git_churn(root)
+    counts, dirty = churn if churn is not None else (history_churn(root), set())
+    return lambda path: (path in dirty, counts[path], walk_order_key(path))
@@ -0,0 +1,81 @@
+"""Read line coverage from a coverage.py data file (sqlite) without importing coverage."""
+
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+RANGE_GAP = 3  # hit lines at most this far apart are folded as one range
+
+
+def numbits_to_lines(numbits: bytes) -> List[int]:
+    """Decode coverage.py numbits (bit n set means line n was hit) to line numbers."""
+    return [
+        index * 8 + bit
+        for index, byte in enumerate(numbits)
+        if byte
+        for bit in range(8)
+        if byte & (1 << bit)
+    ]
+
+
+def context_matches(name: str, wanted: str) -> bool:
+    """Match a recorded context against a test id, e.g. 'tests/test_x.py::test_y'."""
+    return name == wanted or any(
+        name.startswith(wanted + sep) for sep in ("|", "::", ".", "[")
+    )
+
+
+def covered_lines(datafile, context: Optional[str] = None) -> Dict[str, Set[int]]:
+    """Return the executed lines per measured file, optionally for one test context."""
+    try:
+        conn = sqlite3.connect(f"{Path(datafile).absolute().as_uri()}?mode=ro", uri=True)
+        tables = {
+            r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        }
+    except sqlite3.Error as e:
+        raise ValueError(f"{datafile} is not a coverage data file: {e}")
+    if not {"file", "context"} <= tables:
+        conn.close()
+        raise ValueError(f"{datafile} is not a coverage data file")
+    try:
+        contexts = dict(conn.execute("SELECT id, context FROM context"))
+        if context is not None:
+            contexts = {
+                cid: name for cid, name in contexts.items() if context_matches(name, context)
+            }
+            if not contexts:
+                raise ValueError(
+                    f"No coverage context matches '{context}'; record contexts "
+                    "with 'pytest --cov-context=test' or coverage's dynamic_context"
+                )
+        files = dict(conn.execute("SELECT id, path FROM file"))
+        lines: Dict[str, Set[int]] = {}
+        if "line_bits" in tables:
+            for file_id, context_id, numbits in conn.execute(
+                "SELECT file_id, context_id, numbits FROM line_bits"
+            ):
+                if context_id in contexts:
+                    lines.setdefault(files[file_id], set()).update(
+                        numbits_to_lines(numbits)
+                    )
+        if "arc" in tables:
+            for file_id, context_id, fromno, tono in conn.execute(
+                "SELECT file_id, context_id, fromno, tono FROM arc"
+            ):
+                if context_id in contexts:
+                    hit = lines.setdefault(files[file_id], set())
+                    hit.update(n for n in (fromno, tono) if n > 0)
+    finally:
+        conn.close()
+    return {path: hit for path, hit in lines.items() if hit}
+
+
+def line_ranges(lines: Iterable[int], gap: int = RANGE_GAP) -> List[Tuple[int, int]]:
+    """Merge line numbers into inclusive ranges, bridging gaps of up to gap lines."""
+    ranges: List[List[int]] = []
+    for line in sorted(lines):
+        if ranges and line - ranges[-1][1] <= gap + 1:
+            ranges[-1][1] = line
+        else:
+            ranges.append([line, line])
+    return [(start, end) for start, end in ranges]
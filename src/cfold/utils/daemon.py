@@ -0,0 +1,369 @@
+"""Persistent fold daemon: warm per-root indexes served over a Unix domain socket."""
+
+import json
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from cfold.core.models import Codebase, FileEntry, FileState
+from cfold.utils.foldignore import (
+    IGNORE_FILES,
+    IgnoreMatcher,
+    is_included,
+    should_include_file,
+    should_walk_dir,
+    walk_dirs,
+    walk_order_key,
+    walk_relpaths,
+)
+from cfold.utils.cache import ContentCache
+from cfold.utils.instructions import load_instructions, resolve_dialect
+from cfold.utils.manifest import BASE_NAMESPACE, read_with_state
+from cfold.utils.outline import outline_entries
+from cfold.utils.transforms import transform_entries
+from cfold.utils.regions import FileSpec, file_entry, parse_file_spec
+from cfold.utils.watch import debounced_changes, open_watcher
+
+CONNECT_TIMEOUT = 0.5
+REQUEST_TIMEOUT = 30.0
+
+
+def socket_path() -> str:
+    """Return the daemon socket path ($CFOLD_SOCKET, else a per-user runtime path)."""
+    path = os.environ.get("CFOLD_SOCKET")
+    if path:
+        return path
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, "cfold.sock")
+    return os.path.join(tempfile.gettempdir(), f"cfold-{os.getuid()}.sock")
+
+
+def request_daemon(op: str, path: Optional[str] = None, **payload) -> Optional[Dict]:
+    """Send a request to a running daemon; return its result, or None to fall back locally."""
+    if os.environ.get("CFOLD_NO_DAEMON"):
+        return None
+    path = path or socket_path()
+    if not is_own_socket(path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(path)
+            sock.settimeout(REQUEST_TIMEOUT)
+            sock.sendall(json.dumps({"op": op, **payload}).encode() + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+        response = json.loads(line)
+    except (OSError, ValueError):
+        return None
+    if not response.get("ok"):
+        return None
+    return response.get("result")
+
+
+def is_own_socket(path) -> bool:
+    """Return True if path is a Unix socket owned by the current user."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def _sig(path) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class RootIndex:
+    """In-memory index of one root: walked paths, file contents and dialect configs.
+
+    File contents are kept with the manifest state taken by the same read.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.matcher = IgnoreMatcher(self.root)
+        self.lock = threading.RLock()
+        self.paths = set(self._scan())
+        self._contents: Dict[str, Tuple[tuple, str, FileState]] = {}
+        self._configs: Dict[tuple, tuple] = {}
+        self._base = ContentCache.for_root(self.root, BASE_NAMESPACE)
+        self.watcher = None
+
+    def _scan(self):
+        return walk_relpaths(self.root, matcher=self.matcher)
+
+    def open_watcher(self):
+        """Open a watcher reporting changes below the root."""
+        dirs = [reldir for reldir, _ in walk_dirs(self.root, matcher=self.matcher)]
+        return open_watcher(
+            self.root,
+            dirs,
+            lambda rel: should_walk_dir(rel, matcher=self.matcher),
+            self._scan,
+        )
+
+    def start(self):
+        """Start a background thread that keeps the index fresh."""
+        self.watcher = self.open_watcher()
+        thread = threading.Thread(target=self._watch, daemon=True)
+        thread.start()
+
+    def _watch(self):
+        for changed in debounced_changes(self.watcher):
+            self.refresh(changed)
+
+    def refresh(self, changed):
+        """Invalidate cached contents for changed paths and update the path set."""
+        with self.lock:
+            if any(os.path.basename(rel) in IGNORE_FILES for rel in changed):
+                self.matcher.invalidate()
+                self.paths = set(self._scan())
+                self._contents.clear()
+                return
+            for rel in changed:
+                rel = rel.replace(os.sep, "/")
+                self._contents.pop(rel, None)
+                full = os.path.join(self.root, rel)
+                if os.path.isfile(full):
+                    if is_included(rel, self.root, matcher=self.matcher):
+                        self.paths.add(rel)
+                    continue
+                self.paths.discard(rel)
+                prefix = rel + "/"
+                for path in [p for p in self.paths if p.startswith(prefix)]:
+                    self.paths.discard(path)
+                    self._contents.pop(path, None)
+
+    def read(self, rel: str) -> str:
+        """Return the content of a path relative to the root, cached by (mtime, size).
+
+        The stat check catches changes the watcher has not reported yet.
+        """
+        path = os.path.join(self.root, rel)
+        sig = _sig(path)
+        with self.lock:
+            cached = self._contents.get(rel)
+        if cached is not None and sig is not None and cached[0] == sig:
+            return cached[1]
+        content, state = read_with_state(path, self._base)
+        with self.lock:
+            self._contents[rel] = ((state.mtime_ns, state.size), content, state)
+        return content
+
+    def states(self, paths: List[str]) -> Dict[str, FileState]:
+        """Return the manifest states of the paths whose cached content is current."""
+        with self.lock:
+            cached = {rel: self._contents.get(rel) for rel in paths}
+        return {
+            rel: entry[2]
+            for rel, entry in cached.items()
+            if entry is not None and entry[0] == _sig(os.path.join(self.root, rel))
+        }
+
+    def config(self, dialect: str):
+        """Resolve a dialect to (name, instructions, patterns), cached by .foldrc state."""
+        key = (dialect, _sig(os.path.join(self.root, ".foldrc")))
+        cached = self._configs.get(key)
+        if cached is None:
+            root = Path(self.root)
+            resolved = resolve_dialect(dialect, root)
+            instructions, patterns = load_instructions(resolved, root)
+            cached = (resolved, instructions, patterns)
+            self._configs[key] = cached
+        return cached
+
+    def select(self, patterns: Dict) -> List[str]:
+        """Filter the indexed paths through dialect patterns, in walk order."""
+        excluded = list(patterns.get("excluded", []))
+        exclude_files = set(patterns.get("exclude_files", []))
+        with self.lock:
+            paths = list(self.paths)
+        selected = [
+            rel
+            for rel in paths
+            if rel not in exclude_files
+            and should_include_file(
+                os.path.join(self.root, rel),
+                self.root,
+                patterns.get("included", []),
+                excluded,
+                patterns.get("included_dirs", []),
+            )
+        ]
+        return sorted(selected, key=walk_order_key)
+
+
+def fold_entries(
+    index: RootIndex, cwd, files: List[str], patterns: Dict, outline=False
+) -> List[FileEntry]:
+    """Build the file entries of a fold from a warm index (files relative to cwd)."""
+    outline = outline or patterns.get("outline", False)
+    if outline and not files:
+        raise ValueError("outline mode needs one or more focus files")
+    entries = []
+    if files:
+        exclude_files = set(patterns.get("exclude_files", []))
+        for f in files:
+            spec = FileSpec(f) if Path(cwd, f).is_file() else parse_file_spec(f)
+            full = Path(cwd, spec.path)
+            if not full.is_file():
+                continue
+            rel = os.path.relpath(str(full.absolute()), index.root)
+            if rel not in exclude_files:
+                entries.append(file_entry(rel, _read(index, rel), spec))
+    focus = {e.path for e in entries}
+    if outline or not files:
+        for rel in index.select(patterns):
+            if rel not in focus:
+                entries.append(file_entry(rel, _read(index, rel), FileSpec(rel)))
+    if outline:
+        entries = outline_entries(entries, focus, index.root)
+    return transform_entries(entries, patterns["transforms"], index.root)
+
+
+def _read(index: RootIndex, rel: str) -> str:
+    if rel.startswith(".."):
+        with open(os.path.join(index.root, rel), "r", encoding="utf-8") as f:
+            return f.read()
+    return index.read(rel.replace(os.sep, "/"))
+
+
+class FoldDaemon:
+    """Dispatch fold/view/add requests against warm root indexes."""
+
+    def __init__(self, roots: List[str]):
+        self.roots = {os.path.abspath(r): RootIndex(r) for r in roots}
+        self._folds: Dict[str, tuple] = {}
+
+    def start(self):
+        for index in self.roots.values():
+            index.start()
+
+    def _index(self, cwd: str) -> RootIndex:
+        index = self.roots.get(os.path.abspath(cwd))
+        if index is None:
+            raise LookupError(f"{cwd} is not served")
+        return index
+
+    def handle(self, request: Dict):
+        """Dispatch a decoded request to the matching operation."""
+        op = request.get("op")
+        if op == "ping":
+            return {"roots": sorted(self.roots)}
+        if op == "fold":
+            return self.fold(
+                request["cwd"],
+                request.get("files", []),
+                request["dialect"],
+                request.get("bare", False),
+                request.get("outline", False),
+            )
+        if op == "view":
+            return self.view(request["foldfile"])
+        if op == "add":
+            return self.add(request["cwd"], request["foldfile"], request["files"])
+        raise ValueError(f"Unknown operation: {op}")
+
+    def fold(
+        self, cwd: str, files: List[str], dialect: str, bare: bool, outline=False
+    ):
+        """Return instructions and file entries for a fold of a served root."""
+        index = self._index(cwd)
+        resolved, instructions, patterns = index.config(dialect)
+        entries = fold_entries(index, cwd, files, patterns, outline)
+        states = index.states([e.path for e in entries])
+        return {
+            "dialect": resolved,
+            "instructions": [] if bare else [i.model_dump() for i in instructions],
+            "files": [e.model_dump() for e in entries],
+            "states": {rel: state.model_dump() for rel, state in states.items()},
+        }
+
+    def _load_fold(self, foldfile: str):
+        sig = _sig(foldfile)
+        cached = self._folds.get(foldfile)
+        if cached is None or cached[0] != sig:
+            with open(foldfile, "r", encoding="utf-8") as f:
+                data = Codebase.model_validate(json.load(f))
+            cached = (sig, data)
+            self._folds[foldfile] = cached
+        return cached[1]
+
+    def view(self, foldfile: str):
+        """Return the instructions and file list of a fold file."""
+        data = self._load_fold(foldfile)
+        return {
+            "instructions": [i.model_dump() for i in data.instructions],
+            "files": [{"path": f.path, "delete": f.delete} for f in data.files],
+        }
+
+    def add(self, cwd: str, foldfile: str, files: List[str]):
+        """Add files to a fold file using warm contents where possible."""
+        from cfold.cli.add import add_to_codebase, read_text, write_fold
+
+        data = self._load_fold(foldfile).model_copy(deep=True)
+        index = self.roots.get(os.path.abspath(cwd))
+
+        def read(path: Path) -> str:
+            if index is not None:
+                rel = os.path.relpath(str(path), index.root).replace(os.sep, "/")
+                if rel in index.paths:
+                    return index.read(rel)
+            return read_text(path)
+
+        added, skipped = add_to_codebase(data, files, Path(cwd), read)
+        write_fold(data, foldfile)  # a temp file renamed over it, never a partial fold
+        self._folds.pop(foldfile, None)
+        return {"added": added, "skipped": skipped}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            result = self.server.daemon.handle(json.loads(line))
+            response = {"ok": True, "result": result}
+        except Exception as e:  # reported to the client, which then falls back
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class FoldServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, daemon: FoldDaemon):
+        self.daemon = daemon
+        super().__init__(path, _Handler)
+
+
+def serve_forever(roots: List[str], path: Optional[str] = None, ready=None):
+    """Run the daemon until interrupted, removing the socket on exit."""
+    path = path or socket_path()
+    if os.path.lexists(path):
+        if not is_own_socket(path):
+            raise RuntimeError(f"{path} exists and is not a socket owned by you")
+        if request_daemon("ping", path=path) is not None:
+            raise RuntimeError(f"A cfold daemon is already listening on {path}")
+        os.unlink(path)
+    daemon = FoldDaemon(roots)
+    daemon.start()
+    server = FoldServer(path, daemon)
+    try:
+        if ready is not None:
+            ready(server)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
@@ -1,6 +1,46 @@
+"""File inclusion rules and hierarchical .gitignore/.foldignore matching."""
+
+from functools import lru_cache
 from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 import fnmatch
 import os
+import posixpath
+import re
+
+EXCLUDED_DIRS = {
+    ".pytest_cache",
+    "__pycache__",
+    "build",
+    "dist",
+    ".egg-info",
+    "venv",
+    ".venv",
+    ".ruff_cache",
+    ".git",
+    "node_modules",  # Added to ignore common directories
+    ".cfold",  # cfold's own cache and state
+}
+EXCLUDED_FILES = {".pyc", ".egg-info"}
+EXCLUDED_PATTERNS = [
+    "*.egg-info/*",
+    ".*rc",
+    "*.txt",
+    "*.json",
+    "build/*",
+    "dist/*",
+    ".venv/*",
+    # "example*",
+    "htmlcov/*",
+    "*png",
+    "*vtu",
+    "*xdmf",
+    "*data/*",
+    "*log",
+    ".*",
+    "*sh",
+]
+IGNORE_FILES = (".gitignore", ".foldignore")
 
 
 def should_include_file(
@@ -11,26 +51,48 @@ def should_include_file(
     included_dirs=None,
 ):
     """Check if a file should be included based on patterns."""
-    EXCLUDED_DIRS = {
-        ".pytest_cache",
-        "__pycache__",
-        "build",
-        "dist",
-        ".egg-info",
-        "venv",
-        ".venv",
-        ".ruff_cache",
-        ".git",
-        "node_modules",  # Added to ignore common directories
-    }
-    EXCLUDED_FILES = {".pyc", ".egg-info"}
-
     path = Path(filepath)
     if root_dir:
         relpath = os.path.relpath(filepath, root_dir)
     else:
         relpath = str(path)
 
+    if excluded_patterns is None:
+        excluded_patterns = []
+    for i in EXCLUDED_PATTERNS:
+        if i not in excluded_patterns:
+            excluded_patterns.append(i)
+
+    if any(part in EXCLUDED_DIRS for part in path.parts):
+        return False
+    return _include_relpath(relpath, included_patterns, excluded_patterns, included_dirs)
+
+
+@lru_cache(maxsize=256)
+def _pattern_regex(patterns: Tuple[str, ...]) -> re.Pattern:
+    """Compile fnmatch patterns into a single regex matching any of them."""
+    return re.compile(
+        "|".join(f"(?:{fnmatch.translate(os.path.normcase(p))})" for p in patterns)
+    )
+
+
+def _fnmatch_any(name: str, patterns) -> bool:
+    """Equivalent to any(fnmatch.fnmatch(name, p) for p in patterns), but compiled once."""
+    if not patterns:
+        return False
+    return _pattern_regex(tuple(patterns)).match(os.path.normcase(name)) is not None
+
+
+def _include_relpath(relpath, included_patterns, excluded_patterns, included_dirs):
+    """Apply included dirs, excluded suffixes and fnmatch patterns to a relative path."""
+    return (
+        exclusion_reason(relpath, included_patterns, excluded_patterns, included_dirs)
+        is None
+    )
+
+
+def exclusion_reason(relpath, included_patterns, excluded_patterns, included_dirs):
+    """Return why _include_relpath leaves a path out (naming the rule), or None."""
     relpath_norm = relpath.replace(os.sep, "/")
     if included_dirs:
         is_in_included_dir = any(
@@ -38,44 +100,442 @@ def should_include_file(
         )
         is_root_file = "." in included_dirs and "/" not in relpath_norm
         if not (is_in_included_dir or is_root_file):
-            return False
-
-    EXCLUDED_PATTERNS = [
-        "*.egg-info/*",
-        ".*rc",
-        "*.txt",
-        "*.json",
-        "build/*",
-        "dist/*",
-        ".venv/*",
-        # "example*",
-        "htmlcov/*",
-        "*png",
-        "*vtu",
-        "*xdmf",
-        "*data/*",
-        "*log",
-        ".*",
-        "*sh",
-    ]
+            return "outside included dirs"
+    for part in relpath_norm.split("/"):
+        if part in EXCLUDED_DIRS:
+            return f"excluded dir {part}"
+    suffix = os.path.splitext(os.path.basename(relpath))[1]
+    if suffix in EXCLUDED_FILES:
+        return f"excluded suffix {suffix}"
+    if included_patterns and not _fnmatch_any(relpath, included_patterns):
+        return "no included pattern"
+    if excluded_patterns and _fnmatch_any(relpath, excluded_patterns):
+        # Only an excluded path pays for finding the pattern that matched
+        pattern = next(p for p in excluded_patterns if _fnmatch_any(relpath, (p,)))
+        return f"excluded pattern {pattern}"
+    return None
 
-    if excluded_patterns is None:
-        excluded_patterns = []
-    for i in EXCLUDED_PATTERNS:
-        if i not in excluded_patterns:
-            excluded_patterns.append(i)
 
-    if any(part in EXCLUDED_DIRS for part in path.parts):
+class IgnoreRule(NamedTuple):
+    """A single compiled gitignore-style pattern."""
+
+    regex: "re.Pattern[str]"
+    negate: bool
+    dir_only: bool
+    anchored: bool
+    pattern: str
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob (without leading '/' or '!') into a regex."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                at_start = i == 0 or pattern[i - 1] == "/"
+                at_end = i + 2 == n or pattern[i + 2] == "/"
+                if at_start and at_end:
+                    if i + 2 == n:
+                        out.append(".*")
+                        i += 2
+                    else:
+                        out.append("(?:.*/)?")
+                        i += 3
+                    continue
+                while i < n and pattern[i] == "*":
+                    i += 1
+                out.append("[^/]*")
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : j]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def compile_ignore_pattern(line: str) -> Optional[IgnoreRule]:
+    """Compile one line of an ignore file, returning None for blanks and comments."""
+    line = line.rstrip("\n").rstrip("\r")
+    while line.endswith(" ") and not line.endswith("\\ "):
+        line = line[:-1]
+    if not line or line.startswith("#"):
+        return None
+    original = line
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    anchored = "/" in line
+    line = line.lstrip("/")
+    regex = re.compile(_translate(line) + r"\Z", re.DOTALL)
+    return IgnoreRule(regex, negate, dir_only, anchored, original)
+
+
+@lru_cache(maxsize=4096)
+def _compile_ignore_file(path: str, mtime_ns: int, size: int) -> Tuple[IgnoreRule, ...]:
+    """Compile an ignore file; cached on (path, mtime, size) so edits are picked up."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.readlines()
+    except OSError:
+        return ()
+    return tuple(rule for rule in map(compile_ignore_pattern, lines) if rule)
+
+
+def load_dir_rules(dirpath, include_git_exclude: bool = False) -> Tuple[IgnoreRule, ...]:
+    """Load the compiled ignore rules declared directly in a directory."""
+    sources = [os.path.join(dirpath, name) for name in IGNORE_FILES]
+    if include_git_exclude:
+        sources.insert(0, os.path.join(dirpath, ".git", "info", "exclude"))
+    rules: Tuple[IgnoreRule, ...] = ()
+    for source in sources:
+        try:
+            st = os.stat(source)
+        except OSError:
+            continue
+        rules += _compile_ignore_file(source, st.st_mtime_ns, st.st_size)
+    return rules
+
+
+class IgnoreMatcher:
+    """Hierarchical .gitignore/.foldignore matcher rooted at a directory."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._stacks = {}
+        self._ignored_dirs = {}
+
+    def invalidate(self):
+        """Forget cached per-directory rule stacks (e.g. after an ignore file changed)."""
+        self._stacks.clear()
+        self._ignored_dirs.clear()
+
+    def rules_for(self, reldir: str) -> Tuple[Tuple[str, IgnoreRule], ...]:
+        """Return (base, rule) pairs that apply to entries of a directory, root first."""
+        stack = self._stacks.get(reldir)
+        if stack is None:
+            parent = self.rules_for(posixpath.dirname(reldir)) if reldir else ()
+            own = load_dir_rules(
+                os.path.join(self.root, reldir), include_git_exclude=not reldir
+            )
+            stack = parent + tuple((reldir, rule) for rule in own)
+            self._stacks[reldir] = stack
+        return stack
+
+    def match(self, relpath: str, is_dir: bool = False) -> Optional[IgnoreRule]:
+        """Return the last rule matching a path (ancestors are not checked)."""
+        relpath = relpath.replace(os.sep, "/")
+        name = posixpath.basename(relpath)
+        for base, rule in reversed(self.rules_for(posixpath.dirname(relpath))):
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.anchored:
+                subject = relpath[len(base) + 1 :] if base else relpath
+            else:
+                subject = name
+            if rule.regex.match(subject):
+                return rule
+        return None
+
+    def is_ignored(self, relpath: str, is_dir: bool = False) -> bool:
+        """Check whether a path or any of its parent directories is ignored."""
+        relpath = relpath.replace(os.sep, "/")
+        parent = posixpath.dirname(relpath)
+        if parent and self._is_dir_ignored(parent):
+            return True
+        rule = self.match(relpath, is_dir)
+        return bool(rule and not rule.negate)
+
+    def _is_dir_ignored(self, reldir: str) -> bool:
+        cached = self._ignored_dirs.get(reldir)
+        if cached is None:
+            cached = self.is_ignored(reldir, is_dir=True)
+            self._ignored_dirs[reldir] = cached
+        return cached
+
+
+def _dir_in_scope(reldir: str, included_dirs) -> bool:
+    """Check if a directory may contain files under one of the included dirs."""
+    for d in included_dirs:
+        d = d.replace(os.sep, "/").strip("/")
+        if d in ("", "."):
+            continue
+        if d == reldir or d.startswith(reldir + "/") or reldir.startswith(d + "/"):
+            return True
+    return False
+
+
+def _in_scope(relpath: str, scope) -> bool:
+    """Check if a path is one of the scope paths or lies below one."""
+    return any(relpath == s or relpath.startswith(s + "/") for s in scope)
+
+
+def _dir_excluded(reldir: str, excluded_patterns) -> bool:
+    """Check if every file below a directory would match a trailing-'*' exclude pattern."""
+    return any(
+        pattern.endswith("*") and fnmatch.fnmatch(reldir + "/", pattern)
+        for pattern in excluded_patterns
+    )
+
+
+def walk_order_key(relpath: str):
+    """Sort key reproducing the walker's order: a directory's files before its subdirectories."""
+    parts = relpath.replace(os.sep, "/").split("/")
+    return (tuple(parts[:-1]), parts[-1])
+
+
+def _keep_dir(rel, name, included_dirs, dir_excludes, matcher) -> bool:
+    return dir_exclusion_reason(rel, name, included_dirs, dir_excludes, matcher) is None
+
+
+def dir_exclusion_reason(rel, name, included_dirs, dir_excludes, matcher) -> Optional[str]:
+    """Return why the walker prunes a directory (naming the rule), or None."""
+    if name in EXCLUDED_DIRS or name.endswith(".egg-info"):
+        return f"excluded dir {name}"
+    if included_dirs and not _dir_in_scope(rel, included_dirs):
+        return "outside included dirs"
+    for pattern in dir_excludes:
+        if _dir_excluded(rel, (pattern,)):
+            return f"excluded pattern {pattern}"
+    rule = matcher.match(rel, is_dir=True)
+    if rule and not rule.negate:
+        return f"ignore rule {rule.pattern}"
+    return None
+
+
+def should_walk_dir(
+    reldir: str,
+    excluded_patterns=None,
+    included_dirs=None,
+    matcher: Optional[IgnoreMatcher] = None,
+    root=None,
+) -> bool:
+    """Decide whether the walker should descend into a directory."""
+    reldir = reldir.replace(os.sep, "/")
+    if matcher is None:
+        matcher = IgnoreMatcher(root or os.getcwd())
+    dir_excludes = list(excluded_patterns or []) + EXCLUDED_PATTERNS
+    if any(p in EXCLUDED_DIRS or p.endswith(".egg-info") for p in reldir.split("/")[:-1]):
         return False
-    if path.suffix in EXCLUDED_FILES:
+    if matcher.is_ignored(reldir, is_dir=True):
         return False
+    return _keep_dir(reldir, posixpath.basename(reldir), included_dirs, dir_excludes, matcher)
 
-    if included_patterns and not any(
-        fnmatch.fnmatch(relpath, pattern) for pattern in included_patterns
-    ):
+
+def walk_dirs(
+    root,
+    excluded_patterns=None,
+    included_dirs=None,
+    matcher: Optional[IgnoreMatcher] = None,
+    on_skip: Optional[Callable[[str, str], None]] = None,
+    scope: Optional[List[str]] = None,
+) -> Iterator[Tuple[str, List[str]]]:
+    """Walk a tree in sorted order, yielding (reldir, filenames) for directories in scope.
+
+    on_skip(reldir + '/', reason) is called for every pruned directory. A scope of
+    relpaths (files or directories) limits the walk to those subtrees, silently.
+    """
+    root = os.path.abspath(root)
+    if matcher is None:
+        matcher = IgnoreMatcher(root)
+    dir_excludes = list(dict.fromkeys(list(excluded_patterns or []) + EXCLUDED_PATTERNS))
+    for dirpath, dirnames, filenames in os.walk(root):
+        reldir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        reldir = "" if reldir == "." else reldir
+        kept = []
+        for d in sorted(dirnames):
+            rel = f"{reldir}/{d}" if reldir else d
+            if scope is not None and not _dir_in_scope(rel, scope):
+                continue
+            reason = dir_exclusion_reason(rel, d, included_dirs, dir_excludes, matcher)
+            if reason is None:
+                kept.append(d)
+            elif on_skip is not None:
+                on_skip(rel + "/", reason)
+        dirnames[:] = kept
+        if scope is not None:
+            filenames = [
+                f for f in filenames if _in_scope(f"{reldir}/{f}" if reldir else f, scope)
+            ]
+        yield reldir, sorted(filenames)
+
+
+def is_included(
+    relpath: str,
+    root,
+    included_patterns=None,
+    excluded_patterns=None,
+    included_dirs=None,
+    exclude_files=None,
+    matcher: Optional[IgnoreMatcher] = None,
+) -> bool:
+    """Check a single path against ignore files, excluded dirs and dialect patterns."""
+    relpath = relpath.replace(os.sep, "/")
+    if exclude_files and relpath in exclude_files:
         return False
-    if excluded_patterns and any(
-        fnmatch.fnmatch(relpath, pattern) for pattern in excluded_patterns
-    ):
+    if matcher is None:
+        matcher = IgnoreMatcher(root)
+    if matcher.is_ignored(relpath):
         return False
-    return True
+    parts = relpath.split("/")
+    if any(p in EXCLUDED_DIRS or p.endswith(".egg-info") for p in parts[:-1]):
+        return False
+    return should_include_file(
+        os.path.join(root, relpath),
+        root,
+        included_patterns,
+        list(excluded_patterns or []),
+        included_dirs,
+    )
+
+
+def walk_relpaths(
+    root,
+    included_patterns=None,
+    excluded_patterns=None,
+    included_dirs=None,
+    exclude_files=None,
+    matcher: Optional[IgnoreMatcher] = None,
+    on_skip: Optional[Callable[[str, str], None]] = None,
+    scope: Optional[List[str]] = None,
+) -> Iterator[str]:
+    """Walk a tree like walk_files, yielding '/'-separated paths relative to root.
+
+    on_skip(relpath, reason) is called for every left-out file and pruned directory.
+    """
+    root = os.path.abspath(root)
+    if matcher is None:
+        matcher = IgnoreMatcher(root)
+    if any(part in EXCLUDED_DIRS for part in Path(root).parts):
+        return
+    excluded_patterns = list(
+        dict.fromkeys(list(excluded_patterns or []) + EXCLUDED_PATTERNS)
+    )
+    exclude_files = set(exclude_files or [])
+    for reldir, filenames in walk_dirs(
+        root, excluded_patterns, included_dirs, matcher, on_skip, scope
+    ):
+        for filename in filenames:
+            rel = f"{reldir}/{filename}" if reldir else filename
+            if rel in exclude_files:
+                if on_skip is not None:
+                    on_skip(rel, "dialect exclude_files")
+                continue
+            rule = matcher.match(rel)
+            if rule and not rule.negate:
+                if on_skip is not None:
+                    on_skip(rel, f"ignore rule {rule.pattern}")
+                continue
+            if _include_relpath(
+                rel.replace("/", os.sep),
+                included_patterns,
+                excluded_patterns,
+                included_dirs,
+            ):
+                yield rel
+            elif on_skip is not None:
+                on_skip(
+                    rel,
+                    exclusion_reason(
+                        rel, included_patterns, excluded_patterns, included_dirs
+                    ),
+                )
+
+
+def walk_dialects(
+    root, pattern_sets: List[Dict], matcher: Optional[IgnoreMatcher] = None
+) -> Iterator[Tuple[str, List[int]]]:
+    """Walk a tree once for several dialects' patterns.
+
+    Yields (relpath, indexes of the pattern sets including it); each dialect sees
+    the same paths, in the same order, as its own walk_relpaths would yield.
+    """
+    root = os.path.abspath(root)
+    if matcher is None:
+        matcher = IgnoreMatcher(root)
+    if any(part in EXCLUDED_DIRS for part in Path(root).parts):
+        return
+    dialects = [
+        (
+            p.get("included", []),
+            list(dict.fromkeys(list(p.get("excluded", [])) + EXCLUDED_PATTERNS)),
+            p.get("included_dirs", []),
+            set(p.get("exclude_files", [])),
+        )
+        for p in pattern_sets
+    ]
+    walking = {"": list(range(len(dialects)))}  # reldir -> dialects that walk it
+    for dirpath, dirnames, filenames in os.walk(root):
+        reldir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        reldir = "" if reldir == "." else reldir
+        active = walking.pop(reldir)
+        kept = []
+        for d in sorted(dirnames):
+            rel = f"{reldir}/{d}" if reldir else d
+            keep = [
+                i
+                for i in active
+                if dir_exclusion_reason(rel, d, dialects[i][2], dialects[i][1], matcher)
+                is None
+            ]
+            if keep:
+                kept.append(d)
+                walking[rel] = keep
+        dirnames[:] = kept
+        for filename in sorted(filenames):
+            rel = f"{reldir}/{filename}" if reldir else filename
+            rule = matcher.match(rel)
+            if rule and not rule.negate:
+                continue
+            folding = [
+                i
+                for i in active
+                if rel not in dialects[i][3]
+                and _include_relpath(rel.replace("/", os.sep), *dialects[i][:3])
+            ]
+            if folding:
+                yield rel, folding
+
+
+def walk_files(
+    root,
+    included_patterns=None,
+    excluded_patterns=None,
+    included_dirs=None,
+    exclude_files=None,
+    matcher: Optional[IgnoreMatcher] = None,
+) -> Iterator[Path]:
+    """Walk a tree in sorted order, pruning ignored and out-of-scope subtrees."""
+    root = os.path.abspath(root)
+    for rel in walk_relpaths(
+        root, included_patterns, excluded_patterns, included_dirs, exclude_files, matcher
+    ):
+        yield Path(root, rel)
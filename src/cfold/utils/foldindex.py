@@ -0,0 +1,125 @@
+"""Sidecar index of entry offsets in a fold file, for reading single files without parsing it."""
+
+import json
+import mmap
+import os
+import re
+from typing import Dict, List, Optional
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 2
+# Entry keys marking content that is not the whole file as it is on disk
+_PARTIAL = {
+    b'"start_line"': "region",
+    b'"outline"': "outline",
+    b'"transforms"': "transformed",
+}
+
+_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]')
+_COLON = re.compile(rb"\s*:")
+
+
+def index_path(foldfile: str) -> str:
+    return foldfile + INDEX_SUFFIX
+
+
+def scan_entries(data) -> List[Dict]:
+    """Find the files entries of fold JSON bytes (or an mmap) in one regex pass.
+
+    Returns {path, offset, length, region, outline, transformed} per entry with
+    content, where offset and length delimit the JSON string literal of its content.
+    """
+    entries = []
+    depth = 0
+    key1 = key3 = None
+    in_files = False
+    current: Optional[Dict] = None
+    for match in _TOKEN.finditer(data):
+        token = match.group()
+        if token[:1] == b'"':
+            if _COLON.match(data, match.end()):
+                if depth == 1:
+                    key1 = token
+                elif depth == 3:
+                    key3 = token
+                    if current is not None and token in _PARTIAL:
+                        current[_PARTIAL[token]] = True
+            elif depth == 3 and current is not None:
+                if key3 == b'"path"':
+                    current["path"] = json.loads(token)
+                elif key3 == b'"content"':
+                    current["offset"] = match.start()
+                    current["length"] = match.end() - match.start()
+        elif token in (b"{", b"["):
+            depth += 1
+            if depth == 2 and token == b"[" and key1 == b'"files"':
+                in_files = True
+            elif depth == 3 and in_files and token == b"{":
+                current, key3 = dict.fromkeys(_PARTIAL.values(), False), None
+        else:
+            if depth == 3 and current is not None:
+                if "path" in current and "offset" in current:
+                    entries.append(current)
+                current = None
+            elif depth == 2:
+                in_files = False
+            depth -= 1
+    return entries
+
+
+def _signature(foldfile: str) -> List[int]:
+    stat = os.stat(foldfile)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_index(foldfile: str, entries: List[Dict]):
+    """Write the sidecar index for a fold file that was just written."""
+    tmp = index_path(foldfile) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as outfile:
+        json.dump(
+            {
+                "version": INDEX_VERSION,
+                "fold": _signature(foldfile),
+                "entries": entries,
+            },
+            outfile,
+        )
+    os.replace(tmp, index_path(foldfile))
+
+
+def build_index(foldfile: str) -> List[Dict]:
+    """Scan a fold file once (memory-mapped) for its entry offsets."""
+    with open(foldfile, "rb") as infile:
+        if os.fstat(infile.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return scan_entries(data)
+
+
+def load_index(foldfile: str) -> List[Dict]:
+    """Return the entry offsets of a fold, from a current sidecar or a one-pass scan.
+
+    A rebuilt index is saved as the sidecar when the location is writable.
+    """
+    try:
+        with open(index_path(foldfile), "r", encoding="utf-8") as infile:
+            index = json.load(infile)
+        if index.get("version") == INDEX_VERSION and index["fold"] == _signature(
+            foldfile
+        ):
+            return index["entries"]
+    except (OSError, ValueError, KeyError):
+        pass
+    entries = build_index(foldfile)
+    try:
+        write_index(foldfile, entries)
+    except OSError:
+        pass
+    return entries
+
+
+def read_content(foldfile: str, entry: Dict) -> str:
+    """Read one entry's content by seeking to its offset."""
+    with open(foldfile, "rb") as infile:
+        infile.seek(entry["offset"])
+        return json.loads(infile.read(entry["length"]))
@@ -0,0 +1,186 @@
+"""Local history of folds: content-addressed, delta-compressed snapshots in sqlite."""
+
+import json
+import sqlite3
+import time
+import zlib
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from cfold.core.models import Codebase
+from cfold.utils.cache import content_hash, state_dir
+
+HISTORY_FILE = "history.sqlite"
+SCHEMA_VERSION = 1
+MAX_CHAIN = 16  # longest run of deltas before a blob is stored in full again
+
+
+def connect(root) -> sqlite3.Connection:
+    """Open the history database of a project, creating it on first use."""
+    conn = sqlite3.connect(str(state_dir(root) / HISTORY_FILE), timeout=10)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version not in (0, SCHEMA_VERSION):
+        raise sqlite3.DatabaseError(f"unsupported history schema version {version}")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS blobs ("
+        "hash TEXT PRIMARY KEY, base TEXT, depth INTEGER, data BLOB) WITHOUT ROWID"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS snapshots ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL, output TEXT, "
+        "tree TEXT, instructions TEXT, manifest TEXT, files INTEGER, bytes INTEGER)"
+    )
+    return conn
+
+
+def make_delta(base: str, text: str) -> list:
+    """Describe text as copies of base line ranges ([start, end]) and new strings."""
+    old = base.splitlines(keepends=True)
+    new = text.splitlines(keepends=True)
+    ops = []
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(new[j1:j2]))
+    return ops
+
+
+def apply_delta(base: str, ops: list) -> str:
+    old = base.splitlines(keepends=True)
+    return "".join(op if isinstance(op, str) else "".join(old[op[0] : op[1]]) for op in ops)
+
+
+def put_blob(conn: sqlite3.Connection, text: str, base: Optional[str] = None) -> str:
+    """Store text under its hash, as a delta against base when that is smaller."""
+    digest = content_hash(text)
+    if conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone():
+        return digest
+    row = conn.execute("SELECT depth FROM blobs WHERE hash = ?", (base,)).fetchone()
+    data, depth = zlib.compress(text.encode("utf-8")), 0
+    if row is not None and row[0] < MAX_CHAIN:
+        delta = zlib.compress(json.dumps(make_delta(get_blob(conn, base), text)).encode())
+        if len(delta) < len(data):
+            data, depth = delta, row[0] + 1
+    conn.execute(
+        "INSERT INTO blobs VALUES (?, ?, ?, ?)",
+        (digest, base if depth else None, depth, data),
+    )
+    return digest
+
+
+def get_blob(conn: sqlite3.Connection, digest: str) -> str:
+    """Return the text of a blob, replaying its delta chain."""
+    chain = []
+    while True:
+        row = conn.execute(
+            "SELECT base, depth, data FROM blobs WHERE hash = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"missing history blob {digest}")
+        base, depth, data = row
+        chain.append(zlib.decompress(data).decode("utf-8"))
+        if not depth:
+            break
+        digest = base
+    text = chain.pop()
+    for delta in reversed(chain):
+        text = apply_delta(text, json.loads(delta))
+    return text
+
+
+def _lines_json(items) -> str:
+    """Serialize a list one item per line, so deltas between versions stay small."""
+    return "".join(json.dumps(item, sort_keys=True) + "\n" for item in items)
+
+
+def _tree(conn: sqlite3.Connection, digest: Optional[str]) -> List[dict]:
+    if digest is None:
+        return []
+    return [json.loads(line) for line in get_blob(conn, digest).splitlines()]
+
+
+def record_snapshot(root, data: Codebase, output: str) -> int:
+    """Store a fold as a new snapshot and return its id."""
+    conn = connect(root)
+    with conn:
+        last = conn.execute(
+            "SELECT tree, instructions, manifest FROM snapshots ORDER BY id DESC LIMIT 1"
+        ).fetchone() or (None, None, None)
+        previous = {item["path"]: item.get("content") for item in _tree(conn, last[0])}
+        tree = []
+        size = 0
+        for entry in data.files:
+            item = entry.model_dump()
+            if entry.content is not None:
+                item["content"] = put_blob(conn, entry.content, previous.get(entry.path))
+                size += len(entry.content)
+            tree.append(item)
+        instructions = [i.model_dump() for i in data.instructions]
+        manifest = (
+            [[path, state.model_dump()] for path, state in sorted(data.manifest.items())]
+            if data.manifest
+            else None
+        )
+        cursor = conn.execute(
+            "INSERT INTO snapshots (created, output, tree, instructions, manifest, files, "
+            "bytes) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                time.time(),
+                output,
+                put_blob(conn, _lines_json(tree), last[0]),
+                put_blob(conn, _lines_json(instructions), last[1]),
+                put_blob(conn, _lines_json(manifest), last[2]) if manifest else None,
+                len(tree),
+                size,
+            ),
+        )
+    conn.close()
+    return cursor.lastrowid
+
+
+def list_snapshots(conn: sqlite3.Connection) -> List[Tuple[int, float, str, int, int]]:
+    """Return (id, created, output, files, bytes) for every snapshot, oldest first."""
+    return conn.execute(
+        "SELECT id, created, output, files, bytes FROM snapshots ORDER BY id"
+    ).fetchall()
+
+
+def load_snapshot(conn: sqlite3.Connection, snapshot: int) -> Codebase:
+    """Rebuild the fold of a snapshot."""
+    row = conn.execute(
+        "SELECT tree, instructions, manifest FROM snapshots WHERE id = ?", (snapshot,)
+    ).fetchone()
+    if row is None:
+        raise KeyError(f"no snapshot {snapshot}")
+    files = []
+    for item in _tree(conn, row[0]):
+        if item.get("content") is not None:
+            item["content"] = get_blob(conn, item["content"])
+        files.append(item)
+    manifest: Optional[Dict] = dict(map(tuple, _tree(conn, row[2]))) if row[2] else None
+    return Codebase.model_validate(
+        {"instructions": _tree(conn, row[1]), "files": files, "manifest": manifest}
+    )
+
+
+def change_counts(conn: sqlite3.Connection) -> Counter:
+    """Count how often each path's content changed from one snapshot to the next."""
+    seen: Dict[str, Optional[str]] = {}
+    changes: Counter = Counter()
+    for (tree,) in conn.execute("SELECT tree FROM snapshots ORDER BY id"):
+        for item in _tree(conn, tree):
+            path, content = item["path"], item.get("content")
+            if path in seen and seen[path] != content:
+                changes[path] += 1
+            seen[path] = content
+    return changes
+
+
+def storage_bytes(conn: sqlite3.Connection) -> int:
+    """Return the compressed size of all stored blobs."""
+    return conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()[0]
@@ -0,0 +1,141 @@
+"""Static import graph of Python files, persisted in the project index."""
+
+import ast
+import os
+import posixpath
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from cfold.utils.foldignore import walk_order_key, walk_relpaths
+from cfold.utils.indexdb import connect, refresh
+
+KIND = "imports"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS imports (path TEXT, module TEXT, name TEXT, level INTEGER);
+CREATE INDEX IF NOT EXISTS imports_path ON imports (path);
+"""
+SOURCE_DIRS = ("src", "lib")
+
+
+def extract_imports(source: str) -> List[Tuple[str, Optional[str], int]]:
+    """Return (module, name, level) for every import statement in a Python source."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            found.extend((alias.name, None, 0) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            found.extend(
+                (node.module or "", None if alias.name == "*" else alias.name, node.level)
+                for alias in node.names
+            )
+    return found
+
+
+def _update(conn, rel: str, text: Optional[str]):
+    conn.execute("DELETE FROM imports WHERE path = ?", (rel,))
+    if text is not None and rel.endswith(".py"):
+        conn.executemany(
+            "INSERT INTO imports VALUES (?, ?, ?, ?)",
+            [(rel, *row) for row in extract_imports(text)],
+        )
+
+
+def module_names(paths: List[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Map dotted module names to paths, and paths to their package-derived module name."""
+    present = set(paths)
+    modules: Dict[str, str] = {}
+    owner: Dict[str, str] = {}
+    for rel in sorted(paths, key=walk_order_key):
+        parts = rel[: -len(".py")].split("/")
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        if not parts:
+            continue
+        # The package root is the first ancestor without an __init__.py
+        top = len(parts) - 1
+        while top > 0 and "/".join(parts[:top] + ["__init__.py"]) in present:
+            top -= 1
+        names = [".".join(parts[top:])]
+        if parts[0] in SOURCE_DIRS and len(parts) > 1:
+            names.append(".".join(parts[1:]))
+        names.append(".".join(parts))
+        owner[rel] = names[0]
+        for name in names:
+            modules.setdefault(name, rel)
+    return modules, owner
+
+
+def resolve_import(
+    module: str, name: Optional[str], level: int, importer: str, rel: str, modules
+) -> List[str]:
+    """Resolve one import of the file rel (module name importer) to in-tree paths.
+
+    The imported file comes last, after the __init__.py of each parent package,
+    which Python runs first.
+    """
+    if level:
+        package = importer.split(".")
+        if not rel.endswith("__init__.py"):
+            package = package[:-1]
+        if level - 1 > len(package):
+            return []
+        package = package[: len(package) - (level - 1)]
+        module = ".".join(package + ([module] if module else []))
+    candidates = [f"{module}.{name}" if module else name] if name else []
+    candidates.append(module)
+    for candidate in candidates:
+        if candidate and candidate in modules:
+            parts = candidate.split(".")
+            parents = [modules.get(".".join(parts[:i])) for i in range(1, len(parts))]
+            return [
+                path for path in parents if path and path.endswith("__init__.py")
+            ] + [modules[candidate]]
+    return []
+
+
+def import_graph(root, paths: List[str]) -> Dict[str, List[str]]:
+    """Return each path's imported in-tree files, re-parsing only files that changed."""
+    conn = connect(root)
+    try:
+        conn.executescript(SCHEMA)
+        refresh(conn, root, KIND, paths, _update)
+        rows = conn.execute("SELECT path, module, name, level FROM imports").fetchall()
+    finally:
+        conn.close()
+    modules, owner = module_names(paths)
+    graph: Dict[str, List[str]] = {rel: [] for rel in paths}
+    for rel, module, name, level in rows:
+        if rel not in graph or rel not in owner:
+            continue
+        for target in resolve_import(module, name, level, owner[rel], rel, modules):
+            if target != rel and target not in graph[rel]:
+                graph[rel].append(target)
+    return graph
+
+
+def reachable_modules(
+    root, entries: List[str], depth: Optional[int] = None, matcher=None
+) -> List[str]:
+    """Return the entry files followed by the in-tree modules they import, transitively."""
+    root = os.path.abspath(root)
+    paths = list(walk_relpaths(root, ["*.py"], matcher=matcher))
+    entries = [posixpath.normpath(e.replace(os.sep, "/")) for e in entries]
+    walked = set(paths)
+    paths += [e for e in entries if e.endswith(".py") and e not in walked]
+    graph = import_graph(root, paths)
+    seen = dict.fromkeys(entries)
+    queue = deque((e, 0) for e in entries)
+    while queue:
+        rel, level = queue.popleft()
+        if depth is not None and level >= depth:
+            continue
+        for target in graph.get(rel, []):
+            if target not in seen:
+                seen[target] = None
+                queue.append((target, level + 1))
+    reached = sorted((p for p in seen if p not in entries), key=walk_order_key)
+    return entries + reached
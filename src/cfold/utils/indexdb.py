@@ -0,0 +1,103 @@
+"""Persistent per-project file index in sqlite, refreshed incrementally by stat.
+
+An index covers the whole walked tree, whatever dialect asked for it; queries
+are narrowed to a dialect's files by joining the temp table 'selected'.
+"""
+
+import os
+import sqlite3
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from cfold.utils.cache import state_dir
+from cfold.utils.foldignore import walk_relpaths
+
+INDEX_FILE = "index.sqlite"
+SCHEMA_VERSION = 1
+
+Updater = Callable[[sqlite3.Connection, str, Optional[str]], None]
+
+
+def connect(root) -> sqlite3.Connection:
+    """Open (creating or resetting on schema change) the index database of a project."""
+    path = state_dir(root) / INDEX_FILE
+    conn = sqlite3.connect(str(path), timeout=10)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        tables = [
+            r[0]
+            for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        ]
+        for table in tables:
+            conn.execute(f'DROP TABLE "{table}"')
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS files ("
+        "kind TEXT, path TEXT, mtime_ns INTEGER, size INTEGER, "
+        "PRIMARY KEY (kind, path)) WITHOUT ROWID"
+    )
+    return conn
+
+
+def tree_paths(root) -> List[str]:
+    """Return the files an index covers: the tree walk without dialect patterns."""
+    return list(walk_relpaths(root))
+
+
+def select_paths(conn: sqlite3.Connection, paths: Iterable[str]):
+    """Fill the temp table 'selected' that queries join to keep only these paths."""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS selected (path TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM selected")
+    conn.executemany("INSERT OR IGNORE INTO selected VALUES (?)", [(p,) for p in paths])
+
+
+def stat_paths(root, paths: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+    """Return (mtime_ns, size) for each existing path relative to root."""
+    sigs = {}
+    for rel in paths:
+        try:
+            st = os.stat(os.path.join(root, rel))
+        except OSError:
+            continue
+        sigs[rel] = (st.st_mtime_ns, st.st_size)
+    return sigs
+
+
+def refresh(
+    conn: sqlite3.Connection, root, kind: str, paths: Iterable[str], update: Updater
+) -> List[str]:
+    """Bring one index kind up to date with paths; return the paths that were re-indexed.
+
+    update(conn, path, text) replaces the rows of one path; text is None for removed
+    or unreadable files.
+    """
+    current = stat_paths(root, paths)
+    stored = {
+        path: (mtime_ns, size)
+        for path, mtime_ns, size in conn.execute(
+            "SELECT path, mtime_ns, size FROM files WHERE kind = ?", (kind,)
+        )
+    }
+    changed = [p for p, sig in current.items() if stored.get(p) != sig]
+    removed = [p for p in stored if p not in current]
+    if not changed and not removed:
+        return []
+    with conn:
+        for rel in removed:
+            update(conn, rel, None)
+        conn.executemany(
+            "DELETE FROM files WHERE kind = ? AND path = ?",
+            [(kind, rel) for rel in removed],
+        )
+        for rel in changed:
+            try:
+                with open(os.path.join(root, rel), "r", encoding="utf-8") as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError):
+                text = None
+            update(conn, rel, text)
+        conn.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+            [(kind, rel, *current[rel]) for rel in changed],
+        )
+    return changed
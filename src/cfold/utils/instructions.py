@@ -6,6 +6,9 @@ import yaml
 from typing import List, Dict, Optional
 from cfold.core.models import Instruction
 
+# Scalar dialect settings; the most specific dialect in the 'pre' chain wins
+DIALECT_SETTINGS = ("outline",)
+
 
 def collect_instructions(
     config: Dict, dialect: str, processed: set = None, path: set = None
@@ -66,21 +69,53 @@ def collect_patterns(
         "excluded": [],
         "included_dirs": [],
         "exclude": [],
+        "transforms": [],
     }
 
+    settings = {}
     for pre_d in instr.get("pre", []):
         pre_patterns = collect_patterns(config, pre_d, processed, path)
         for key in patterns:
             patterns[key].extend(pre_patterns.get(key, []))
+        settings.update((k, pre_patterns[k]) for k in DIALECT_SETTINGS if k in pre_patterns)
 
     for key in patterns:
         patterns[key].extend(instr.get(key, []))
+    settings.update((k, instr[k]) for k in DIALECT_SETTINGS if k in instr)
+    patterns.update(settings)
 
     path.remove(dialect)
     processed.add(dialect)
     return patterns
 
 
+def resolve_dialect(dialect: str = "default", directory: Optional[Path] = None) -> str:
+    """Resolve 'default' to the default_dialect of a local .foldrc, if set."""
+    if dialect != "default":
+        return dialect
+    if directory is None:
+        directory = Path.cwd()
+    local_path = directory / ".foldrc"
+    if local_path.exists():
+        with local_path.open("r", encoding="utf-8") as f:
+            local_config = yaml.safe_load(f) or {}
+        if "default_dialect" in local_config:
+            return local_config["default_dialect"]
+    return dialect
+
+
+def foldrc_setting(key: str, directory: Optional[Path] = None, default=None):
+    """Return a top-level setting of the local .foldrc, or default if unset."""
+    if directory is None:
+        directory = Path.cwd()
+    local_path = directory / ".foldrc"
+    if local_path.exists():
+        with local_path.open("r", encoding="utf-8") as f:
+            local_config = yaml.safe_load(f) or {}
+        return local_config.get(key, default)
+    return default
+
+
 def load_instructions(
     dialect: str = "default", directory: Optional[Path] = None
 ) -> tuple[List[Instruction], Dict]:
@@ -125,6 +160,8 @@ def load_instructions(
         "excluded": all_patterns.get("excluded", []),
         "included_dirs": all_patterns.get("included_dirs", []),
         "exclude_files": all_patterns.get("exclude", []),
+        "outline": bool(all_patterns.get("outline", False)),
+        "transforms": list(dict.fromkeys(all_patterns.get("transforms", []))),
     }
     return instructions_list, patterns
 
@@ -0,0 +1,181 @@
+"""Crash-safe unfold: stage files next to their targets, rename them in, journal progress."""
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from cfold.utils.cache import state_dir
+
+JOURNAL_DIR = "unfold"
+BATCH = 256  # operations applied between journal records and directory fsyncs
+
+
+class Step(NamedTuple):
+    """A journaled change; paths are relative to the output dir, backup to the journal."""
+
+    action: str  # 'replace' (move tmp into place) or 'delete'
+    path: str
+    tmp: Optional[str] = None  # staged content, renamed onto path
+    backup: Optional[str] = None  # where the previous file is kept until the run ends
+
+
+def staged_path(rel: str) -> str:
+    """Return the temp file a path is staged into, in the same directory."""
+    head, tail = os.path.split(rel)
+    return os.path.join(head, f".{tail}.cfold-tmp")
+
+
+def stage_text(output_dir: str, rel: str, content: str) -> str:
+    """Write new content to the staging file of rel, keeping the target's mode."""
+    tmp = staged_path(rel)
+    full = os.path.join(output_dir, tmp)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, "w", encoding="utf-8") as outfile:
+        outfile.write(content)
+    dst = os.path.join(output_dir, rel)
+    if os.path.exists(dst):
+        shutil.copymode(dst, full)
+    return tmp
+
+
+def stage_copy(output_dir: str, rel: str, source: str) -> str:
+    """Copy a file to the staging file of rel."""
+    tmp = staged_path(rel)
+    full = os.path.join(output_dir, tmp)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    shutil.copy2(source, full)
+    return tmp
+
+
+def discard_staged(output_dir: str, rel: str):
+    """Remove the staging file of rel, if any."""
+    try:
+        os.remove(os.path.join(output_dir, staged_path(rel)))
+    except OSError:
+        pass
+
+
+def fsync_paths(paths: Iterable[str], files: bool = True, dirs: bool = True):
+    """Flush files and/or, once each, their directories to disk in one pass."""
+    parents = set()
+    for path in paths:
+        parents.add(os.path.dirname(path))
+        if files and os.path.isfile(path):
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+    if dirs and hasattr(os, "O_DIRECTORY"):
+        for parent in filter(os.path.isdir, parents):
+            fd = os.open(parent, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+class Journal:
+    """Record the steps of an unfold and which of them were applied, in .cfold/unfold."""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.directory = Path(output_dir) / ".cfold" / JOURNAL_DIR
+        self.path = self.directory / "journal.jsonl"
+
+    def exists(self) -> bool:
+        return self.path.is_file()
+
+    def _append(self, record: dict):
+        with open(self.path, "a", encoding="utf-8") as outfile:
+            outfile.write(json.dumps(record) + "\n")
+            outfile.flush()
+            os.fsync(outfile.fileno())
+
+    def _create(self):
+        self.directory = state_dir(self.output_dir) / JOURNAL_DIR
+        self.directory.mkdir(exist_ok=True)
+
+    def stage(self, paths: List[str]):
+        """Record the paths about to be staged, before any temp file is written."""
+        self._create()
+        self._append({"staging": paths})
+
+    def begin(self, steps: List[Step]):
+        self._create()
+        self._append({"steps": [step._asdict() for step in steps]})
+
+    def mark(self, done: int):
+        self._append({"done": done})
+
+    def load(self) -> Tuple[List[Step], int]:
+        """Return the journaled steps and how many were applied for sure."""
+        steps, done = [], 0
+        with open(self.path, "r", encoding="utf-8") as infile:
+            for line in infile:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # a torn last record
+                if "steps" in record:
+                    steps = [Step(**step) for step in record["steps"]]
+                done = record.get("done", done)
+        return steps, done
+
+    def staging(self) -> List[str]:
+        """Return the paths recorded by stage(), whose temp files may be left over."""
+        paths = []
+        with open(self.path, "r", encoding="utf-8") as infile:
+            for line in infile:
+                try:
+                    paths.extend(json.loads(line).get("staging", []))
+                except ValueError:
+                    break
+        return paths
+
+    def backup_path(self, step: Step) -> str:
+        return str(self.directory / "backup" / step.backup)
+
+    def finish(self):
+        """Drop the journal and the backups once every step is in place."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        state = self.directory.parent
+        if [p.name for p in state.iterdir()] == [".gitignore"]:
+            shutil.rmtree(state, ignore_errors=True)  # only the journal needed it
+
+
+def apply_steps(journal: Journal, steps: List[Step], start: int = 0):
+    """Apply steps from start on, recording progress in batches; safe to repeat."""
+    out = journal.output_dir
+    for begin in range(start, len(steps), BATCH):
+        touched = []
+        for step in steps[begin : begin + BATCH]:
+            dst = os.path.join(out, step.path)
+            if step.backup:
+                backup = journal.backup_path(step)
+                if os.path.lexists(dst) and not os.path.lexists(backup):
+                    os.makedirs(os.path.dirname(backup), exist_ok=True)
+                    os.replace(dst, backup)
+                touched.append(backup)
+            if step.tmp and os.path.exists(os.path.join(out, step.tmp)):
+                os.replace(os.path.join(out, step.tmp), dst)
+            touched.append(dst)
+        fsync_paths(touched, files=False)  # contents were synced when staged
+        journal.mark(min(begin + BATCH, len(steps)))
+
+
+def rollback_steps(journal: Journal, steps: List[Step]):
+    """Undo journaled steps in reverse, restoring backups and removing new files."""
+    out = journal.output_dir
+    for step in reversed(steps):
+        dst = os.path.join(out, step.path)
+        tmp = os.path.join(out, step.tmp) if step.tmp else None
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)  # never moved into place
+        elif step.action == "replace" and not step.backup and os.path.exists(dst):
+            os.remove(dst)  # a file the unfold added
+        if step.backup and os.path.lexists(journal.backup_path(step)):
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            os.replace(journal.backup_path(step), dst)
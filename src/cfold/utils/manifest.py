@@ -0,0 +1,158 @@
+"""Record the on-disk state of folded files and detect local changes made since."""
+
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from cfold.core.models import FileState
+from cfold.utils.cache import MIN_PARALLEL, STATE_DIR, ContentCache, state_dir
+
+BASE_NAMESPACE = "base"  # cache of folded file versions, keyed by sha256, for merges
+BASE_MAX_AGE = 30 * 24 * 3600  # versions no fold has referenced for this long are pruned
+MANIFEST_FILE = "manifest.json"  # states of the last folded files, under .cfold
+
+
+def _map(func: Callable, items: List, workers: Optional[int]) -> List:
+    """Map over items on a thread pool (hashing releases the GIL), serially if few."""
+    if len(items) < MIN_PARALLEL or workers == 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, items))
+
+
+def file_state(path, cache: Optional[ContentCache] = None) -> Optional[FileState]:
+    """Hash a file, keeping its text in cache as a merge base; None if unreadable."""
+    try:
+        stat = os.stat(path)
+        with open(path, "rb") as infile:
+            data = infile.read()
+    except OSError:
+        return None
+    return data_state(data, stat.st_mtime_ns, cache)
+
+
+def decode_text(data: bytes) -> str:
+    """Decode file bytes like a text-mode open() does, newlines translated."""
+    return io.TextIOWrapper(io.BytesIO(data), encoding="utf-8").read()
+
+
+def data_state(
+    data: bytes,
+    mtime_ns: int,
+    cache: Optional[ContentCache] = None,
+    text: Optional[str] = None,
+) -> FileState:
+    """Describe file bytes that were already read, like file_state does.
+
+    The cached base is the text-mode reading of the bytes (text, if given), so
+    merges compare it with the current file read the same way.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    if cache is not None and not cache.touch(digest):
+        try:
+            cache.put(digest, decode_text(data) if text is None else text)
+        except UnicodeDecodeError:
+            pass
+    return FileState(sha256=digest, size=len(data), mtime_ns=mtime_ns)
+
+
+def read_with_state(path, cache: Optional[ContentCache] = None) -> Tuple[str, FileState]:
+    """Read a file as text, like a text-mode open(), together with its state."""
+    with open(path, "rb") as infile:
+        data = infile.read()
+        mtime_ns = os.fstat(infile.fileno()).st_mtime_ns
+    text = decode_text(data)
+    return text, data_state(data, mtime_ns, cache, text)
+
+
+def build_manifest(
+    root,
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    known: Optional[Dict[str, FileState]] = None,
+) -> Dict[str, FileState]:
+    """Return the state of the files under root that a fold was taken from.
+
+    known holds states already taken while reading the files; only the other
+    paths are hashed. Base versions no fold has used for a while are pruned.
+    """
+    paths = sorted(set(paths))
+    known = known or {}
+    cache = ContentCache.for_root(root, BASE_NAMESPACE)
+    missing = [rel for rel in paths if rel not in known]
+    states = _map(
+        lambda rel: file_state(os.path.join(root, rel), cache), missing, workers
+    )
+    found = dict(zip(missing, states))
+    if cache is not None:
+        cache.prune(BASE_MAX_AGE)
+    return {
+        rel: known.get(rel) or found[rel]
+        for rel in paths
+        if rel in known or found[rel] is not None
+    }
+
+
+def load_manifest(root) -> Dict[str, FileState]:
+    """Return the file states saved by the folds taken under root, empty if none."""
+    path = Path(root) / STATE_DIR / MANIFEST_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as infile:
+            saved = json.load(infile)
+        return {rel: FileState.model_validate(state) for rel, state in saved.items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def save_manifest(root, states: Dict[str, FileState], removed: Iterable[str] = ()):
+    """Merge new file states into the manifest saved under root/.cfold.
+
+    The manifest stays local: unfold checks answers against it, since they
+    come back without one. Best effort, like the base cache.
+    """
+    saved = load_manifest(root)
+    saved.update(states)
+    for rel in removed:
+        saved.pop(rel, None)
+    try:
+        path = state_dir(root) / MANIFEST_FILE
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(
+            json.dumps({rel: saved[rel].model_dump() for rel in sorted(saved)}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def is_unchanged(path, state: FileState) -> bool:
+    """Compare a file with its recorded state: stat first, hash only if size matches."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != state.size:
+        return False
+    if state.mtime_ns is not None and stat.st_mtime_ns == state.mtime_ns:
+        return True
+    current = file_state(path)
+    return current is not None and current.sha256 == state.sha256
+
+
+def changed_files(
+    checks: List[Tuple[str, str, FileState]], workers: Optional[int] = None
+) -> List[str]:
+    """Return the names of (name, path, state) checks whose file changed on disk."""
+    unchanged = _map(lambda check: is_unchanged(check[1], check[2]), checks, workers)
+    return [name for (name, _, _), same in zip(checks, unchanged) if not same]
+
+
+def base_content(root, state: FileState) -> Optional[str]:
+    """Return the folded version of a file from the base cache, if it is still there."""
+    cache = ContentCache.for_root(root, BASE_NAMESPACE)
+    return cache.get(state.sha256) if cache is not None else None
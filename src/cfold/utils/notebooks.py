@@ -0,0 +1,110 @@
+"""Fold Jupyter notebooks as compact cell sources and rebuild them on unfold."""
+
+import json
+import re
+import uuid
+from typing import List, Optional, Tuple
+
+NOTEBOOK_SUFFIX = ".ipynb"
+_CELL_HEADER = re.compile(r"^# %% \[(?P<type>\w+)\](?: id=(?P<id>\S+))?$", re.MULTILINE)
+
+
+def is_notebook(path: str) -> bool:
+    return path.lower().endswith(NOTEBOOK_SUFFIX)
+
+
+def _load(text: Optional[str]) -> Optional[dict]:
+    """Parse notebook JSON, or return None if text is not a notebook."""
+    if not text:
+        return None
+    try:
+        nb = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(nb, dict) or not isinstance(nb.get("cells"), list):
+        return None
+    return nb
+
+
+def _source(cell: dict) -> str:
+    source = cell.get("source", "")
+    return "".join(source) if isinstance(source, list) else source
+
+
+def notebook_to_text(text: str) -> str:
+    """Render notebook JSON as '# %% [type] id=...' cells with sources only (no outputs)."""
+    nb = _load(text)
+    if nb is None:
+        return text
+    blocks = []
+    for cell in nb["cells"]:
+        header = f"# %% [{cell.get('cell_type', 'code')}]"
+        if cell.get("id"):
+            header += f" id={cell['id']}"
+        blocks.append(f"{header}\n{_source(cell).rstrip(chr(10))}\n")
+    return "\n".join(blocks)
+
+
+def parse_cells(text: str) -> List[Tuple[str, Optional[str], str]]:
+    """Split the folded text form into (cell_type, id, source) tuples."""
+    headers = list(_CELL_HEADER.finditer(text))
+    cells = []
+    for n, match in enumerate(headers):
+        end = headers[n + 1].start() if n + 1 < len(headers) else len(text)
+        source = text[match.end() + 1 : end].rstrip("\n")
+        cells.append((match["type"], match["id"], source))
+    return cells
+
+
+def text_to_notebook(text: str, original: Optional[str] = None) -> str:
+    """Rebuild notebook JSON from the text form, keeping metadata and unchanged outputs."""
+    nb = _load(original) or {
+        "cells": [],
+        "metadata": {},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+    with_ids = (nb.get("nbformat", 4), nb.get("nbformat_minor", 0)) >= (4, 5)
+    by_id = {c["id"]: c for c in nb["cells"] if c.get("id")}
+    cells = []
+    for index, (cell_type, cell_id, source) in enumerate(parse_cells(text)):
+        if cell_id:
+            previous = by_id.get(cell_id)
+        elif index < len(nb["cells"]) and not nb["cells"][index].get("id"):
+            previous = nb["cells"][index]  # notebooks without cell ids match by position
+        else:
+            previous = None
+        if (
+            previous is not None
+            and previous.get("cell_type") == cell_type
+            and _source(previous).rstrip("\n") == source
+        ):
+            cells.append(previous)
+            continue
+        cell = {
+            "cell_type": cell_type,
+            "metadata": previous.get("metadata", {}) if previous else {},
+            "source": source.splitlines(keepends=True),
+        }
+        if with_ids:
+            cell["id"] = cell_id or uuid.uuid4().hex[:8]
+        if previous and "attachments" in previous:
+            cell["attachments"] = previous["attachments"]
+        if cell_type == "code":
+            cell["execution_count"] = None
+            cell["outputs"] = []
+        cells.append(cell)
+    nb["cells"] = cells
+    return json.dumps(nb, indent=1, sort_keys=True, ensure_ascii=False) + "\n"
+
+
+def fold_content(path: str, text: str) -> str:
+    """Return the content to fold for a file: the text form for notebooks, else text."""
+    return notebook_to_text(text) if is_notebook(path) else text
+
+
+def unfold_content(path: str, content: str, original: Optional[str]) -> str:
+    """Return the content to write for a file, rebuilding notebooks from the text form."""
+    if is_notebook(path) and _load(content) is None:
+        return text_to_notebook(content, original)
+    return content
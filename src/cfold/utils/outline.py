@@ -0,0 +1,100 @@
+"""AST outlines of Python modules: imports, signatures, docstrings and constants."""
+
+import ast
+import copy
+from typing import List, Optional, Set
+from cfold.core.models import FileEntry
+from cfold.utils.cache import ContentCache, map_cached
+
+OUTLINE_VERSION = "outline-v1"
+MAX_CONSTANT_LENGTH = 120
+
+
+def _docstring_expr(node):
+    if (
+        node.body
+        and isinstance(node.body[0], ast.Expr)
+        and isinstance(node.body[0].value, ast.Constant)
+        and isinstance(node.body[0].value.value, str)
+    ):
+        return [node.body[0]]
+    return []
+
+
+def _ellipsis():
+    return ast.Expr(value=ast.Constant(value=Ellipsis))
+
+
+def _constant(node):
+    """Keep a module or class level assignment, eliding long values."""
+    text = ast.unparse(node)
+    if len(text) <= MAX_CONSTANT_LENGTH:
+        return node
+    node = copy.copy(node)
+    node.value = ast.Constant(value=Ellipsis)
+    return node
+
+
+def _outline_body(body, in_class=False):
+    out = []
+    for node in body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            out.append(node)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            stub = copy.copy(node)
+            stub.body = _docstring_expr(node) + [_ellipsis()]
+            out.append(stub)
+        elif isinstance(node, ast.ClassDef):
+            stub = copy.copy(node)
+            inner = _outline_body(node.body[len(_docstring_expr(node)) :], True)
+            stub.body = _docstring_expr(node) + (inner or [_ellipsis()])
+            out.append(stub)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None:
+            out.append(_constant(node))
+        elif isinstance(node, ast.AnnAssign) and in_class:
+            out.append(node)  # dataclass / pydantic style field declarations
+    return out
+
+
+def outline_source(source: str) -> str:
+    """Return a skeleton of a Python module, or the source itself if it does not parse."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return source
+    doc = _docstring_expr(tree)
+    body = doc + _outline_body(tree.body[len(doc) :])
+    return ast.unparse(ast.Module(body=body, type_ignores=[])) + "\n"
+
+
+def outline_entry(rel: str, content: str, cache=None) -> FileEntry:
+    """Build an outline entry for one Python file, using the cache when given."""
+    (text,) = map_cached(outline_source, [content], cache, OUTLINE_VERSION, workers=1)
+    return FileEntry(path=rel, content=text, outline=True)
+
+
+def outline_entries(
+    entries: List[FileEntry], focus: Set[str], root, workers: Optional[int] = None
+) -> List[FileEntry]:
+    """Replace whole-file .py entries outside the focus set with their outlines."""
+    targets = [
+        i
+        for i, e in enumerate(entries)
+        if e.path.endswith(".py")
+        and e.path not in focus
+        and e.content is not None
+        and e.start_line is None
+    ]
+    if not targets:
+        return entries
+    texts = map_cached(
+        outline_source,
+        [entries[i].content for i in targets],
+        ContentCache.for_root(root, "outline"),
+        OUTLINE_VERSION,
+        workers,
+    )
+    entries = list(entries)
+    for i, text in zip(targets, texts):
+        entries[i] = FileEntry(path=entries[i].path, content=text, outline=True)
+    return entries
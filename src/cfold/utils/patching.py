@@ -0,0 +1,160 @@
+"""Apply edit-based file entries: search/replace blocks, unified diffs and 3-way merges."""
+
+import re
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+_HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """Raised when an edit or patch does not apply to the current file."""
+
+
+def apply_edits(original: str, edits) -> str:
+    """Apply search/replace edits in order; each search must match exactly once."""
+    text = original
+    for i, edit in enumerate(edits, 1):
+        if edit.search == "":
+            if text:
+                raise PatchError(f"edit {i}: empty search text on a non-empty file")
+            text = edit.replace
+            continue
+        count = text.count(edit.search)
+        if count == 0:
+            raise PatchError(f"edit {i}: search text not found")
+        if count > 1:
+            raise PatchError(
+                f"edit {i}: search text matches {count} times, add more context"
+            )
+        text = text.replace(edit.search, edit.replace, 1)
+    return text
+
+
+def parse_hunks(patch: str) -> List[Tuple[int, List[str], List[str]]]:
+    """Parse a unified diff into (old_start, old_lines, new_lines) hunks."""
+    hunks = []
+    current = None
+    lines = patch.splitlines(keepends=True)
+    for n, line in enumerate(lines):
+        match = _HUNK.match(line)
+        if match:
+            current = (int(match.group(1)), [], [])
+            hunks.append(current)
+            continue
+        if current is None:
+            continue  # headers ('---', '+++', 'diff', ...) before the first hunk
+        if line.startswith("\\"):
+            # "\ No newline at end of file" applies to the previous line
+            prev = lines[n - 1] if n else ""
+            for target, marker in ((current[1], "-"), (current[2], "+")):
+                if target and prev[:1] in (marker, " "):
+                    target[-1] = target[-1].rstrip("\n")
+            continue
+        tag, body = line[:1], line[1:]
+        if not line.endswith("\n"):
+            body += "\n"
+        if tag == " " or line in ("\n", "\r\n"):
+            body = body if tag == " " else line
+            current[1].append(body)
+            current[2].append(body)
+        elif tag == "-":
+            current[1].append(body)
+        elif tag == "+":
+            current[2].append(body)
+        else:
+            current = None  # trailing garbage ends the hunk
+    if not hunks:
+        raise PatchError("patch contains no hunks")
+    return hunks
+
+
+def _find(lines: List[str], old: List[str], expected: int, start: int) -> Optional[int]:
+    """Find old lines at or near the expected index, searching outward."""
+    n = len(old)
+    limit = len(lines) - n
+    if limit < start:
+        return None
+    for delta in range(0, max(expected - start, limit - expected) + 1):
+        for pos in (expected + delta, expected - delta):
+            if start <= pos <= limit and lines[pos : pos + n] == old:
+                return pos
+    return None
+
+
+def apply_patch(original: str, patch: str) -> str:
+    """Apply a unified diff to text, tolerating hunks that moved by a few lines."""
+    lines = original.splitlines(keepends=True)
+    out: List[str] = []
+    cursor = 0
+    offset = 0
+    for i, (old_start, old, new) in enumerate(parse_hunks(patch), 1):
+        if old:
+            pos = _find(lines, old, max(old_start - 1 + offset, cursor), cursor)
+            if pos is None:
+                raise PatchError(f"hunk {i} (line {old_start}) does not match the file")
+        else:
+            pos = min(max(old_start + offset, cursor), len(lines))
+        out.extend(lines[cursor:pos])
+        out.extend(new)
+        cursor = pos + len(old)
+        offset = pos - (old_start - 1 if old else old_start)
+    out.extend(lines[cursor:])
+    return "".join(out)
+
+
+def _matches(base: List[str], other: List[str]) -> Dict[int, int]:
+    """Map base line indices to the line of other they are matched with."""
+    pairs = {}
+    matcher = SequenceMatcher(None, base, other, autojunk=False)
+    for a, b, size in matcher.get_matching_blocks():
+        for n in range(size):
+            pairs[a + n] = b + n
+    return pairs
+
+
+def merge3(base: str, ours: str, theirs: str) -> str:
+    """Merge two edits of base line by line (diff3), raising PatchError on conflicts."""
+    base_lines = base.splitlines(keepends=True)
+    ours_lines = ours.splitlines(keepends=True)
+    theirs_lines = theirs.splitlines(keepends=True)
+    in_ours = _matches(base_lines, ours_lines)
+    in_theirs = _matches(base_lines, theirs_lines)
+    out: List[str] = []
+    i = j = k = 0
+    while True:
+        # The next base line kept by both sides (at or after i) closes the chunk
+        sync = next(
+            (
+                n
+                for n in range(i, len(base_lines))
+                if in_ours.get(n, -1) >= j and in_theirs.get(n, -1) >= k
+            ),
+            len(base_lines),
+        )
+        if sync < len(base_lines):
+            j2, k2 = in_ours[sync], in_theirs[sync]
+        else:
+            j2, k2 = len(ours_lines), len(theirs_lines)
+        old, mine, other = base_lines[i:sync], ours_lines[j:j2], theirs_lines[k:k2]
+        if mine == old or mine == other:
+            out.extend(other)
+        elif other == old:
+            out.extend(mine)
+        else:
+            raise PatchError(f"conflicting changes near line {j + 1}")
+        if sync == len(base_lines):
+            return "".join(out)
+        out.append(base_lines[sync])
+        i, j, k = sync + 1, j2 + 1, k2 + 1
+
+
+def entry_content(entry, original: Optional[str]) -> str:
+    """Return the full new content of a file entry, applying edits or a patch."""
+    if entry.content is not None:
+        return entry.content
+    if entry.patch is not None:
+        return apply_patch(original or "", entry.patch)
+    if original is None:
+        raise PatchError("file does not exist, edits need an existing file")
+    return apply_edits(original, entry.edits)
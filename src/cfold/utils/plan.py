@@ -0,0 +1,97 @@
+"""Plan unfold operations from fold entries, without walking the target tree."""
+
+import os
+import posixpath
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from cfold.core.models import FileEntry
+from cfold.utils.foldignore import should_include_file
+
+_DRIVE = re.compile(r"^[A-Za-z]:")
+
+
+class Operation(NamedTuple):
+    """One step of an unfold: write an entry, delete a path or copy an original file."""
+
+    action: str  # 'write', 'delete' or 'copy'
+    path: str  # normalized, '/'-separated, relative to the output dir
+    entry: Optional[FileEntry] = None
+    source: Optional[str] = None  # original file to copy, or the current file
+    existed: bool = False  # whether the path existed before (modify vs add)
+
+
+def normalize_entry_path(path: str) -> Optional[str]:
+    """Normalize a fold path, or return None if it is absolute or escapes the root."""
+    path = path.replace("\\", "/")
+    if path.startswith("/") or _DRIVE.match(path):
+        return None
+    norm = posixpath.normpath(path)
+    if norm in (".", "..") or norm.startswith("../"):
+        return None
+    return norm
+
+
+def resolves_inside(output_dir: str, rel: str) -> bool:
+    """Check that a normalized path, with symlinks resolved, stays inside output_dir."""
+    root = os.path.realpath(output_dir)
+    target = os.path.realpath(os.path.join(root, rel))
+    return os.path.commonpath([root, target]) == root and target != root
+
+
+def same_dir(a, b) -> bool:
+    """Check whether two directory paths refer to the same directory."""
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return os.path.abspath(a) == os.path.abspath(b)
+
+
+def _original_files(original_dir: str, output_dir: str) -> Iterator[str]:
+    """Walk an original tree (skipping the output dir inside it) for files to carry over."""
+    output_dir = os.path.abspath(output_dir)
+    for dirpath, dirnames, filenames in os.walk(original_dir):
+        dirnames[:] = sorted(
+            d for d in dirnames if os.path.join(dirpath, d) != output_dir
+        )
+        for filename in sorted(filenames):
+            filepath = os.path.join(dirpath, filename)
+            if should_include_file(filepath, original_dir, [], [], []):
+                yield os.path.relpath(filepath, original_dir).replace(os.sep, "/")
+
+
+def plan_unfold(
+    entries: Dict[str, FileEntry], output_dir: str, original_dir: Optional[str] = None
+) -> Tuple[List[Operation], List[str]]:
+    """Return (operations, unsafe paths) for applying entries to output_dir.
+
+    In place (no original dir, or the same directory) only the entries are looked at;
+    a separate original dir is walked once to copy its unchanged files.
+    """
+    output_dir = os.path.abspath(output_dir)
+    separate = bool(original_dir) and not same_dir(original_dir, output_dir)
+    base_dir = os.path.abspath(original_dir) if separate else output_dir
+    operations: List[Operation] = []
+    unsafe: List[str] = []
+    planned = set()
+    for path, entry in entries.items():
+        rel = normalize_entry_path(path)
+        if rel is None or not resolves_inside(output_dir, rel):
+            unsafe.append(path)
+            continue
+        planned.add(rel)
+        base = os.path.join(base_dir, rel)
+        exists = os.path.isfile(base)
+        if entry.delete:
+            target = os.path.join(output_dir, rel)
+            if exists or os.path.isfile(target):
+                operations.append(Operation("delete", rel, entry, base, True))
+            continue
+        operations.append(Operation("write", rel, entry, base, exists))
+    if separate:
+        operations += [
+            Operation("copy", rel, source=os.path.join(base_dir, rel))
+            for rel in _original_files(base_dir, output_dir)
+            if rel not in planned
+        ]
+    return operations, unsafe
@@ -0,0 +1,121 @@
+"""Line-range and symbol-range regions for partial file folding."""
+
+import ast
+import re
+from typing import NamedTuple, Optional, Tuple
+from cfold.core.models import FileEntry
+from cfold.utils.notebooks import fold_content
+from cfold.utils.patching import entry_content
+
+_SYMBOL_SPEC = re.compile(r"^(?P<path>.+?)::(?P<symbol>[A-Za-z_][\w.]*)$")
+_RANGE_SPEC = re.compile(r"^(?P<path>.+?):(?P<start>\d+)(?:-(?P<end>\d+))?$")
+
+
+class FileSpec(NamedTuple):
+    """A file argument, optionally restricted to a line range or a symbol."""
+
+    path: str
+    start_line: Optional[int] = None
+    end_line: Optional[int] = None
+    symbol: Optional[str] = None
+
+    @property
+    def is_region(self) -> bool:
+        return self.start_line is not None or self.symbol is not None
+
+
+def parse_file_spec(spec: str) -> FileSpec:
+    """Parse 'path', 'path:120-260', 'path:42' or 'path::Class.method'."""
+    match = _SYMBOL_SPEC.match(spec)
+    if match:
+        return FileSpec(match["path"], symbol=match["symbol"])
+    match = _RANGE_SPEC.match(spec)
+    if match:
+        start = int(match["start"])
+        end = int(match["end"]) if match["end"] else start
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid line range in '{spec}'")
+        return FileSpec(match["path"], start, end)
+    return FileSpec(spec)
+
+
+def find_symbol(source: str, qualname: str) -> Tuple[int, int]:
+    """Return the 1-based inclusive line span of a (dotted) Python symbol, decorators included."""
+    body = ast.parse(source).body
+    node = None
+    for part in qualname.split("."):
+        node = next(
+            (
+                n
+                for n in body
+                if isinstance(n, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+                and n.name == part
+            ),
+            None,
+        )
+        if node is None:
+            raise ValueError(f"Symbol '{qualname}' not found")
+        body = node.body
+    start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+    return start, node.end_lineno
+
+
+def extract_region(text: str, start: int, end: int) -> str:
+    """Return lines start..end (1-based, inclusive) of a text."""
+    lines = text.splitlines(keepends=True)
+    if end > len(lines):
+        raise ValueError(f"Lines {start}-{end} are outside the file ({len(lines)} lines)")
+    return "".join(lines[start - 1 : end])
+
+
+def splice_region(text: str, start: int, end: int, region: str) -> str:
+    """Replace lines start..end (1-based, inclusive) of a text with a new region."""
+    lines = text.splitlines(keepends=True)
+    if end > len(lines):
+        raise ValueError(f"Lines {start}-{end} are outside the file ({len(lines)} lines)")
+    after = lines[end:]
+    if region and after and not region.endswith("\n"):
+        region += "\n"
+    return "".join(lines[: start - 1]) + region + "".join(after)
+
+
+def resolve_region(text: str, spec) -> Tuple[int, int]:
+    """Locate a spec or entry's region in text, preferring its symbol when it still parses."""
+    if spec.symbol:
+        try:
+            return find_symbol(text, spec.symbol)
+        except (SyntaxError, ValueError):
+            if spec.start_line is None:
+                raise ValueError(f"Symbol '{spec.symbol}' not found")
+    return spec.start_line, spec.end_line
+
+
+def file_entry(rel: str, text: str, spec: FileSpec) -> FileEntry:
+    """Build a fold entry for a whole file or for the region a spec selects."""
+    if not spec.is_region:
+        return FileEntry(path=rel, content=fold_content(rel, text))
+    start, end = resolve_region(text, spec)
+    return FileEntry(
+        path=rel,
+        content=extract_region(text, start, end),
+        start_line=start,
+        end_line=end,
+        symbol=spec.symbol,
+    )
+
+
+def apply_regions(text: str, entries) -> str:
+    """Splice region entries (content, edits or patch) back into the full text of a file."""
+    spans = sorted(
+        ((resolve_region(text, e), e) for e in entries),
+        key=lambda item: item[0][0],
+        reverse=True,
+    )
+    previous_start = None
+    for (start, end), entry in spans:
+        if previous_start is not None and end >= previous_start:
+            raise ValueError(f"Regions overlap at lines {start}-{end}")
+        region = entry_content(entry, extract_region(text, start, end))
+        text = splice_region(text, start, end, region)
+        previous_start = start
+    return text
@@ -0,0 +1,98 @@
+"""BM25 relevance ranking of project files over words and identifier parts."""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import List, Optional, Tuple
+
+from cfold.utils.foldignore import walk_order_key
+from cfold.utils.indexdb import connect, refresh, select_paths, tree_paths
+from cfold.utils.tokens import estimate_tokens
+
+KIND = "bm25"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (term TEXT, path TEXT, tf INTEGER);
+CREATE INDEX IF NOT EXISTS postings_term ON postings (term);
+CREATE INDEX IF NOT EXISTS postings_path ON postings (path);
+CREATE TABLE IF NOT EXISTS docs (path TEXT PRIMARY KEY, length INTEGER, tokens INTEGER);
+"""
+K1 = 1.2
+B = 0.75
+STOPWORDS = frozenset(
+    "an and are as at be by do for from if in into is it of on or so that the "
+    "this to was we with you not no but can should would will".split()
+)
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+")
+
+
+def terms(text: str) -> List[str]:
+    """Split text into lowercase terms: whole identifiers plus their snake/camel parts."""
+    out = []
+    for word in _WORD.findall(text):
+        for term in {word.lower(), *(p.lower() for p in _PART.findall(word))}:
+            if len(term) > 1 and term not in STOPWORDS:
+                out.append(term)
+    return out
+
+
+def _update(conn, rel: str, text: Optional[str]):
+    conn.execute("DELETE FROM postings WHERE path = ?", (rel,))
+    conn.execute("DELETE FROM docs WHERE path = ?", (rel,))
+    if text is None:
+        return
+    counts = Counter(terms(f"{rel.replace('/', ' ')} {text}"))
+    conn.executemany(
+        "INSERT INTO postings VALUES (?, ?, ?)",
+        [(term, rel, tf) for term, tf in counts.items()],
+    )
+    conn.execute(
+        "INSERT INTO docs VALUES (?, ?, ?)",
+        (rel, sum(counts.values()), estimate_tokens(text)),
+    )
+
+
+def _query_terms(conn, query_terms: List[str], count: int) -> List[str]:
+    """Drop query terms found in over half the files, unless nothing else is left."""
+    df = {
+        term: conn.execute(
+            "SELECT COUNT(*) FROM postings JOIN selected USING (path) WHERE term = ?",
+            (term,),
+        ).fetchone()[0]
+        for term in dict.fromkeys(query_terms)
+    }
+    rare = [t for t, n in df.items() if 0 < n <= count / 2]
+    return rare or [t for t, n in df.items() if n]
+
+
+def rank_files(root, paths: List[str], query: str) -> List[Tuple[str, float, int]]:
+    """Return (path, score, estimated tokens) for paths matching a query, best first."""
+    conn = connect(root)
+    try:
+        conn.executescript(SCHEMA)
+        refresh(conn, root, KIND, tree_paths(root), _update)
+        select_paths(conn, paths)
+        count, avgdl = conn.execute(
+            "SELECT COUNT(*), AVG(length) FROM docs JOIN selected USING (path)"
+        ).fetchone()
+        scores = defaultdict(float)
+        tokens = {}
+        for term in _query_terms(conn, terms(query), count):
+            rows = conn.execute(
+                "SELECT p.path, p.tf, d.length, d.tokens FROM postings p "
+                "JOIN docs d ON d.path = p.path JOIN selected s ON s.path = p.path "
+                "WHERE p.term = ?",
+                (term,),
+            ).fetchall()
+            if not rows:
+                continue
+            idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+            for path, tf, length, size in rows:
+                norm = K1 * (1 - B + B * length / (avgdl or 1))
+                scores[path] += idf * tf * (K1 + 1) / (tf + norm)
+                tokens[path] = size
+    finally:
+        conn.close()
+    ranked = sorted(scores, key=lambda p: (-scores[p], walk_order_key(p)))
+    return [(p, scores[p], tokens[p]) for p in ranked]
@@ -0,0 +1,122 @@
+"""Sharded folds: walk, read and encode partitions of a tree in worker processes."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple
+
+from cfold.core.models import FileState, Instruction
+from cfold.core.serialize import encode_entries, fold_chunks
+from cfold.utils.cache import ContentCache
+from cfold.utils.foldignore import walk_relpaths
+from cfold.utils.manifest import BASE_MAX_AGE, BASE_NAMESPACE, read_with_state
+from cfold.utils.regions import FileSpec, file_entry
+from cfold.utils.transforms import transform_entries
+
+
+class ShardResult(NamedTuple):
+    fragment: bytes  # files list items; the whole fold from write_sharded_fold
+    states: Dict[str, FileState]  # manifest states of the folded files
+    warnings: List[str]  # files that could not be folded
+
+
+def shard_scopes(root, patterns: Dict) -> List[List[str]]:
+    """Partition a tree into walk scopes whose folds concatenate in walk order.
+
+    Scopes are the dialect's included_dirs when it has any, else the root's
+    files (one scope) followed by each top-level directory.
+    """
+    included_dirs = [
+        d.replace(os.sep, "/").strip("/") for d in patterns.get("included_dirs", [])
+    ]
+    if included_dirs and all(d not in ("", ".") for d in included_dirs):
+        scopes: List[List[str]] = []
+        for d in sorted(set(included_dirs), key=lambda d: tuple(d.split("/"))):
+            if not any(d.startswith(s[0] + "/") for s in scopes):
+                scopes.append([d])
+        return scopes
+    with os.scandir(root) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    files = [e.name for e in entries if not e.is_dir()]
+    return ([files] if files else []) + [[e.name] for e in entries if e.is_dir()]
+
+
+def fold_shard(
+    root: str, patterns: Dict, scope: List[str], compact: bool = False
+) -> ShardResult:
+    """Walk, read, transform and encode the files of one scope (runs in a worker)."""
+    cache = ContentCache.for_root(root, BASE_NAMESPACE)
+    entries, states, warnings = [], {}, []
+    for rel in walk_relpaths(
+        root,
+        patterns.get("included", []),
+        patterns.get("excluded", []),
+        patterns.get("included_dirs", []),
+        patterns.get("exclude_files", []),
+        scope=scope,
+    ):
+        try:
+            text, state = read_with_state(os.path.join(root, rel), cache)
+            entries.append(file_entry(rel, text, FileSpec(rel)))
+        except (OSError, SyntaxError, ValueError) as e:
+            warnings.append(f"{rel}: {e}")
+            continue
+        states[rel] = state
+    entries = transform_entries(entries, patterns["transforms"], root, 1)
+    return ShardResult(encode_entries(entries, compact), states, warnings)
+
+
+def write_sharded_fold(
+    root,
+    patterns: Dict,
+    instructions: List[Instruction],
+    output: str,
+    processes: int,
+    compact: bool = False,
+) -> ShardResult:
+    """Fold a whole tree on a process pool, streaming shards into output in walk order.
+
+    The file is byte-identical to write_fold of the same fold. Returns the written
+    bytes with the states and warnings of all shards; output is left untouched
+    (and no bytes are returned) when no file was folded.
+    """
+    root = os.path.abspath(root)
+    scopes = shard_scopes(root, patterns)
+    tmp = f"{output}.tmp"
+    states: Dict[str, FileState] = {}
+    warnings: List[str] = []
+    chunks: List[bytes] = []
+    written = False
+
+    def fragments(results: Iterable[ShardResult]) -> Iterator[bytes]:
+        nonlocal written
+        for result in results:
+            states.update(result.states)
+            warnings.extend(result.warnings)
+            written = written or bool(result.fragment)
+            yield result.fragment
+
+    try:
+        with ProcessPoolExecutor(processes) as pool, open(tmp, "wb") as outfile:
+            n = len(scopes)
+            results = pool.map(
+                fold_shard, [root] * n, [patterns] * n, scopes, [compact] * n
+            )
+            for chunk in fold_chunks(
+                [i.model_dump() for i in instructions],
+                fragments(results),
+                compact=compact,
+            ):
+                outfile.write(chunk)
+                chunks.append(chunk)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    if written:
+        os.replace(tmp, output)
+    else:
+        os.remove(tmp)
+        chunks = []
+    cache = ContentCache.for_root(root, BASE_NAMESPACE)
+    if cache is not None:
+        cache.prune(BASE_MAX_AGE)
+    return ShardResult(b"".join(chunks), states, warnings)
@@ -0,0 +1,68 @@
+"""Dry-run statistics of a dialect walk: what would be folded, what not and why."""
+
+import os
+import posixpath
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from cfold.utils.foldignore import IgnoreMatcher, walk_relpaths
+from cfold.utils.tokens import CHARS_PER_TOKEN
+
+
+class TreeStats(NamedTuple):
+    files: List[Tuple[str, int]]  # included (path, size in bytes), in walk order
+    skipped_files: Counter  # reason -> number of left-out files
+    pruned_dirs: Counter  # reason -> number of directories not walked
+    timings: Dict[str, float]  # phase -> seconds
+
+
+def collect_stats(root, patterns: Dict, matcher: Optional[IgnoreMatcher] = None) -> TreeStats:
+    """Walk root with dialect patterns, recording skip reasons and file sizes (stat only)."""
+    skipped_files: Counter = Counter()
+    pruned_dirs: Counter = Counter()
+
+    def on_skip(rel: str, reason: str):
+        (pruned_dirs if rel.endswith("/") else skipped_files)[reason] += 1
+
+    start = time.perf_counter()
+    paths = list(
+        walk_relpaths(
+            root,
+            patterns.get("included", []),
+            patterns.get("excluded", []),
+            patterns.get("included_dirs", []),
+            patterns.get("exclude_files", []),
+            matcher,
+            on_skip,
+        )
+    )
+    walked = time.perf_counter()
+    files = []
+    for rel in paths:
+        try:
+            files.append((rel, os.stat(os.path.join(root, rel)).st_size))
+        except OSError:
+            skipped_files["unreadable"] += 1
+    timings = {"walk": walked - start, "stat": time.perf_counter() - walked}
+    return TreeStats(files, skipped_files, pruned_dirs, timings)
+
+
+def size_tokens(size: int) -> int:
+    """Estimate tokens from a size in bytes, like estimate_tokens does from text."""
+    return (size + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def directory_totals(files: List[Tuple[str, int]]) -> Dict[str, Tuple[int, int]]:
+    """Sum (files, bytes) per directory, including everything below it."""
+    totals: Dict[str, List[int]] = {}
+    for rel, size in files:
+        directory = posixpath.dirname(rel)
+        while True:
+            count = totals.setdefault(directory or ".", [0, 0])
+            count[0] += 1
+            count[1] += size
+            if not directory:
+                break
+            directory = posixpath.dirname(directory)
+    return {d: (n, size) for d, (n, size) in totals.items()}
@@ -0,0 +1,126 @@
+"""Find a fold object in streamed text (e.g. an LLM answer) and yield its files early."""
+
+import codecs
+import io
+import json
+import os
+import re
+from typing import IO, Iterator, List, Optional
+
+_STRUCTURAL = re.compile(r'[{}\[\]"]')
+_STRING_END = re.compile(r'["\\]')
+_NEXT_CHAR = re.compile(r"\s*(\S)")
+CHUNK_SIZE = 1 << 16
+
+
+def read_chunks(stream: IO[str]) -> Iterator[str]:
+    """Yield text from a stream as soon as it arrives, not when a full buffer is read."""
+    try:
+        fd = stream.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        yield from iter(lambda: stream.read(CHUNK_SIZE), "")
+        return
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        data = os.read(fd, CHUNK_SIZE)
+        if not data:
+            yield decoder.decode(b"", final=True)
+            return
+        yield decoder.decode(data)
+
+
+class FoldStream:
+    """Incrementally scan text for a JSON object with a 'files' array.
+
+    Prose and markdown fences around the object are skipped; an object is taken as
+    the fold once it turns out to contain 'files'. feed() returns the entries of
+    'files' completed by the new text, as dicts.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.start: Optional[int] = None  # offset of the candidate object's '{'
+        self.end: Optional[int] = None  # offset just past the fold object
+        self.depth = 0
+        self.in_string = False
+        self.string_start = 0
+        self.key: Optional[str] = None  # last string seen directly in the object
+        self.in_files = False
+        self.has_files = False
+        self.entry_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[dict]:
+        self.buffer += text
+        entries = []
+        buf = self.buffer
+        while self.end is None:
+            if self.start is None:
+                if not self._find_start():
+                    break
+                continue
+            if self.in_string:
+                match = _STRING_END.search(buf, self.pos)
+                if match is None:
+                    self.pos = len(buf)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buf):
+                        self.pos = match.start()  # wait for the escaped character
+                        break
+                    self.pos = match.end() + 1
+                    continue
+                self.in_string = False
+                self.pos = match.end()
+                if self.depth == 1:
+                    self.key = buf[self.string_start + 1 : match.start()]
+                continue
+            match = _STRUCTURAL.search(buf, self.pos)
+            if match is None:
+                self.pos = len(buf)
+                break
+            char, self.pos = match.group(), match.end()
+            if char == '"':
+                self.in_string = True
+                self.string_start = match.start()
+            elif char in "{[":
+                self.depth += 1
+                if self.depth == 2 and char == "[" and self.key == "files":
+                    self.in_files = self.has_files = True
+                elif self.depth == 3 and self.in_files and char == "{":
+                    self.entry_start = match.start()
+            else:
+                if self.depth == 3 and self.entry_start is not None:
+                    entries.append(json.loads(buf[self.entry_start : self.pos]))
+                    self.entry_start = None
+                elif self.depth == 2 and self.in_files:
+                    self.in_files = False
+                self.depth -= 1
+                if self.depth == 0:
+                    if self.has_files:
+                        self.end = self.pos
+                    else:
+                        self.start = None  # some other object, keep looking
+        return entries
+
+    def _find_start(self) -> bool:
+        """Move to the next '{' that opens an object with a key; False if undecided."""
+        brace = self.buffer.find("{", self.pos)
+        if brace < 0:
+            self.pos = len(self.buffer)
+            return False
+        following = _NEXT_CHAR.match(self.buffer, brace + 1)
+        if following is None:
+            self.pos = brace  # decide once more text arrives
+            return False
+        if following.group(1) == '"':
+            self.start, self.depth, self.key = brace, 1, None
+            self.has_files = self.in_files = False
+        self.pos = brace + 1
+        return True
+
+    def document(self) -> dict:
+        """Return the complete fold object, once the stream has ended."""
+        if self.end is None:
+            raise ValueError("no complete fold JSON object with 'files' found in the input")
+        return json.loads(self.buffer[self.start : self.end])
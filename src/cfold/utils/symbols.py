@@ -0,0 +1,139 @@
+"""Symbol definition and reference index (ast for Python, regexes for other files)."""
+
+import ast
+import re
+from typing import Dict, List, Optional, Tuple
+
+from cfold.utils.foldignore import walk_order_key
+from cfold.utils.indexdb import connect, refresh, select_paths, tree_paths
+
+KIND = "symbols"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS symbols (name TEXT, qualname TEXT, path TEXT, kind TEXT, line INTEGER);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+CREATE INDEX IF NOT EXISTS symbols_qualname ON symbols (qualname);
+CREATE INDEX IF NOT EXISTS symbols_path ON symbols (path);
+CREATE TABLE IF NOT EXISTS refs (name TEXT, path TEXT);
+CREATE INDEX IF NOT EXISTS refs_name ON refs (name);
+CREATE INDEX IF NOT EXISTS refs_path ON refs (path);
+"""
+
+_DEFINITION = re.compile(
+    r"^[ \t]*(?:export\s+)?(?:default\s+)?(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?"
+    r"(?P<kind>def|class|function|func|fn|struct|interface|enum|trait|type|macro)"
+    r"\s+(?:\([^)]*\)\s*)?(?P<name>[A-Za-z_]\w*)",
+    re.MULTILINE,
+)
+_BINDING = re.compile(
+    r"^[ \t]*(?:export\s+)?(?:#let|const|let|var)\s+(?P<name>[A-Za-z_]\w*)\s*[=(:]",
+    re.MULTILINE,
+)
+_IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+
+Symbol = Tuple[str, str, str, int]  # (name, qualname, kind, line)
+
+
+def python_symbols(source: str) -> Optional[List[Symbol]]:
+    """Return module-level and class-level definitions of a Python source, or None."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    found = []
+
+    def visit(body, prefix):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                kind = "class" if isinstance(node, ast.ClassDef) else "def"
+                qualname = prefix + node.name
+                found.append((node.name, qualname, kind, node.lineno))
+                if isinstance(node, ast.ClassDef):
+                    visit(node.body, qualname + ".")
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        qualname = prefix + target.id
+                        found.append((target.id, qualname, "var", node.lineno))
+
+    visit(tree.body, "")
+    return found
+
+
+def regex_symbols(source: str) -> List[Symbol]:
+    """Return definitions found by language-agnostic declaration regexes."""
+    found = []
+    for pattern in (_DEFINITION, _BINDING):
+        for match in pattern.finditer(source):
+            line = source.count("\n", 0, match.start("name")) + 1
+            kind = match.groupdict().get("kind") or "var"
+            found.append((match["name"], match["name"], kind, line))
+    return sorted(found, key=lambda s: s[3])
+
+
+def extract_symbols(rel: str, source: str) -> List[Symbol]:
+    """Return the definitions of a file, using ast for Python sources that parse."""
+    if rel.endswith(".py"):
+        symbols = python_symbols(source)
+        if symbols is not None:
+            return symbols
+    return regex_symbols(source)
+
+
+def _update(conn, rel: str, text: Optional[str]):
+    conn.execute("DELETE FROM symbols WHERE path = ?", (rel,))
+    conn.execute("DELETE FROM refs WHERE path = ?", (rel,))
+    if text is None:
+        return
+    symbols = extract_symbols(rel, text)
+    conn.executemany(
+        "INSERT INTO symbols VALUES (?, ?, ?, ?, ?)",
+        [(name, qualname, rel, kind, line) for name, qualname, kind, line in symbols],
+    )
+    conn.executemany(
+        "INSERT INTO refs VALUES (?, ?)",
+        [(name, rel) for name in set(_IDENTIFIER.findall(text))],
+    )
+
+
+def find_symbols(
+    root, paths: List[str], names: List[str], references: bool = False
+) -> Dict[str, List[str]]:
+    """Map each name (or dotted qualname) to the paths defining it, then referencing it."""
+    conn = connect(root)
+    try:
+        conn.executescript(SCHEMA)
+        refresh(conn, root, KIND, tree_paths(root), _update)
+        select_paths(conn, paths)
+        found = {}
+        for name in names:
+            column = "qualname" if "." in name else "name"
+            defining = sorted(
+                {
+                    path
+                    for (path,) in conn.execute(
+                        f"SELECT path FROM symbols JOIN selected USING (path) "
+                        f"WHERE {column} = ?",
+                        (name,),
+                    )
+                },
+                key=walk_order_key,
+            )
+            referencing = []
+            if references and defining:
+                referencing = sorted(
+                    {
+                        path
+                        for (path,) in conn.execute(
+                            "SELECT path FROM refs JOIN selected USING (path) "
+                            "WHERE name = ?",
+                            (name.rsplit(".", 1)[-1],),
+                        )
+                    }
+                    - set(defining),
+                    key=walk_order_key,
+                )
+            found[name] = defining + referencing
+    finally:
+        conn.close()
+    return found
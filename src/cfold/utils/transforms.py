@@ -0,0 +1,195 @@
+"""Content transforms applied to folded files, e.g. stripping license headers or comments."""
+
+import io
+import os
+import re
+import tokenize
+from functools import partial
+from importlib.metadata import entry_points
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from cfold.core.models import FileEntry
+from cfold.utils.cache import ContentCache, map_cached
+
+TRANSFORMS_VERSION = "transforms-v1"
+ENTRY_POINT_GROUP = "cfold.transforms"
+
+# A transform takes (text, path) and returns the new text
+Transform = Callable[[str, str], str]
+TRANSFORMS: Dict[str, Transform] = {}
+
+HASH_COMMENT_SUFFIXES = {".sh", ".toml", ".yaml", ".yml", ".cfg", ".ini", ".r"}
+SLASH_COMMENT_SUFFIXES = {
+    ".c", ".h", ".cc", ".cpp", ".hpp", ".cs", ".java", ".js", ".jsx", ".ts",
+    ".tsx", ".go", ".rs", ".swift", ".kt", ".scala", ".css", ".scss", ".typ",
+}  # fmt: skip
+_LICENSE_WORDS = re.compile(r"licen[cs]e|copyright|spdx-license-identifier", re.I)
+
+
+def register_transform(name: str):
+    """Register a transform function under a name usable in a dialect's 'transforms'."""
+
+    def decorator(func: Transform) -> Transform:
+        TRANSFORMS[name] = func
+        return func
+
+    return decorator
+
+
+def get_transform(name: str) -> Transform:
+    """Look up a transform, loading 'cfold.transforms' entry points on first miss."""
+    if name not in TRANSFORMS:
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            if ep.name == name:
+                TRANSFORMS[name] = ep.load()
+    if name not in TRANSFORMS:
+        raise ValueError(
+            f"Unknown transform '{name}'. Available: {', '.join(sorted(TRANSFORMS))}"
+        )
+    return TRANSFORMS[name]
+
+
+def _suffix(path: str) -> str:
+    return os.path.splitext(path)[1].lower()
+
+
+def _is_comment(line: str, path: str) -> bool:
+    stripped = line.strip()
+    if _suffix(path) in SLASH_COMMENT_SUFFIXES:
+        return stripped.startswith(("//", "/*", "*", "*/"))
+    return stripped.startswith("#") and not stripped.startswith("#!")
+
+
+@register_transform("strip-license-header")
+def strip_license_header(text: str, path: str) -> str:
+    """Drop a leading comment block mentioning a license or copyright."""
+    lines = text.splitlines(keepends=True)
+    start = 1 if lines and lines[0].startswith("#!") else 0
+    end = start
+    while end < len(lines) and _is_comment(lines[end], path):
+        end += 1
+    if end == start or not _LICENSE_WORDS.search("".join(lines[start:end])):
+        return text
+    while end < len(lines) and not lines[end].strip():
+        end += 1
+    return "".join(lines[:start] + lines[end:])
+
+
+@register_transform("collapse-blank-lines")
+def collapse_blank_lines(text: str, path: str) -> str:
+    """Collapse runs of blank lines into a single blank line."""
+    return re.sub(r"\n(?:[ \t]*\n){2,}", "\n\n", text)
+
+
+@register_transform("strip-trailing-whitespace")
+def strip_trailing_whitespace(text: str, path: str) -> str:
+    """Remove whitespace at the end of every line."""
+    return re.sub(r"[ \t]+(?=\r?\n|\Z)", "", text)
+
+
+def _strip_python_comments(text: str) -> str:
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(text).readline))
+    except (tokenize.TokenError, SyntaxError):
+        return text
+    lines = text.splitlines(keepends=True)
+    drop = set()
+    for tok in tokens:
+        if tok.type != tokenize.COMMENT:
+            continue
+        row, col = tok.start
+        line = lines[row - 1]
+        if row == 1 and tok.string.startswith("#!"):
+            continue
+        if not line[:col].strip():
+            drop.add(row - 1)
+        else:
+            ending = line[len(line.rstrip("\r\n")) :]
+            lines[row - 1] = line[:col].rstrip() + ending
+    return "".join(line for i, line in enumerate(lines) if i not in drop)
+
+
+_C_LIKE = re.compile(
+    r"""(?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)"""
+    r"|(?P<comment>//[^\n]*|/\*.*?\*/)",
+    re.S,
+)
+_HASH = re.compile(
+    r"""(?P<string>"(?:\\.|[^"\\\n])*"|'[^'\n]*')|(?P<comment>#[^\n]*)""",
+)
+
+
+def _strip_with(pattern: re.Pattern, text: str) -> str:
+    """Remove comment matches, dropping lines that only held a comment."""
+    marked = pattern.sub(
+        lambda m: m["string"] if m["string"] is not None else "\0", text
+    )
+    out = []
+    for line in marked.splitlines(keepends=True):
+        if "\0" not in line:
+            out.append(line)
+            continue
+        body = line.rstrip("\r\n")
+        code = body.replace("\0", "").rstrip()
+        if code.strip():
+            out.append(code + line[len(body) :])
+    return "".join(out)
+
+
+@register_transform("strip-comments")
+def strip_comments(text: str, path: str) -> str:
+    """Remove comments (tokenize for Python, a string-aware scanner for others)."""
+    suffix = _suffix(path)
+    if suffix == ".py":
+        return _strip_python_comments(text)
+    if suffix in SLASH_COMMENT_SUFFIXES:
+        return _strip_with(_C_LIKE, text)
+    if suffix in HASH_COMMENT_SUFFIXES:
+        return _strip_with(_HASH, text)
+    return text
+
+
+def run_transforms(names: Tuple[str, ...], item: Tuple[str, str]) -> str:
+    """Apply named transforms in order to a (path, text) item."""
+    path, text = item
+    for name in names:
+        text = get_transform(name)(text, path)
+    return text
+
+
+def transform_entries(
+    entries: List[FileEntry],
+    names: Sequence[str],
+    root,
+    workers: Optional[int] = None,
+) -> List[FileEntry]:
+    """Apply transforms to content entries, marking the ones whose content changed.
+
+    Outlines and line regions are left as folded: a region is spliced back into
+    its file by line numbers, which a transformed text would no longer match.
+    """
+    names = tuple(names)
+    if not names:
+        return entries
+    for name in names:
+        get_transform(name)  # fail early on unknown names
+    targets = [
+        i
+        for i, e in enumerate(entries)
+        if e.content is not None and not e.outline and e.start_line is None
+    ]
+    texts = map_cached(
+        partial(run_transforms, names),
+        [(entries[i].path, entries[i].content) for i in targets],
+        ContentCache.for_root(root, "transforms"),
+        f"{TRANSFORMS_VERSION}:{','.join(names)}",
+        workers,
+        key=lambda item: f"{item[0]}\0{item[1]}",
+    )
+    entries = list(entries)
+    for i, text in zip(targets, texts):
+        if text != entries[i].content:
+            entries[i] = entries[i].model_copy(
+                update={"content": text, "transforms": list(names)}
+            )
+    return entries
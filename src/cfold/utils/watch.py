@@ -0,0 +1,238 @@
+"""Watch a directory tree for file changes using inotify or stat polling."""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+_EVENT = struct.Struct("iIII")
+
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+def stat_snapshot(root, relpaths: Iterable[str]) -> Snapshot:
+    """Stat files under root, mapping relpath to (mtime_ns, size)."""
+    snapshot = {}
+    for rel in relpaths:
+        try:
+            st = os.stat(os.path.join(root, rel))
+        except OSError:
+            continue
+        snapshot[rel] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+
+class PollingWatcher:
+    """Detect changes by periodically re-scanning and comparing stat snapshots."""
+
+    def __init__(self, root, scan: Callable[[], Iterable[str]], interval: float = 0.5):
+        self.root = os.path.abspath(root)
+        self.scan = scan
+        self.interval = interval
+        self._snapshot = stat_snapshot(self.root, scan())
+
+    def poll(self) -> Set[str]:
+        """Re-scan once and return relpaths that were added, modified or deleted."""
+        current = stat_snapshot(self.root, self.scan())
+        previous, self._snapshot = self._snapshot, current
+        changed = {rel for rel, sig in current.items() if previous.get(rel) != sig}
+        changed.update(rel for rel in previous if rel not in current)
+        return changed
+
+    def read(self, timeout: Optional[float] = None) -> Set[str]:
+        """Wait up to timeout seconds (forever if None) for changes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self.poll()
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            wait = self.interval
+            if deadline is not None:
+                wait = max(0.0, min(wait, deadline - time.monotonic()))
+            time.sleep(wait)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify watcher over a set of directories, following new subdirectories."""
+
+    def __init__(
+        self,
+        root,
+        dirs: Iterable[str],
+        keep_dir: Callable[[str], bool],
+        scan: Callable[[], Iterable[str]],
+    ):
+        self.root = os.path.abspath(root)
+        self.keep_dir = keep_dir
+        self.scan = scan
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError("inotify is not available")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wd_to_dir: Dict[int, str] = {}
+        self._dir_to_wd: Dict[str, int] = {}
+        for reldir in dirs:
+            self._add(reldir)
+
+    def _add(self, reldir: str) -> bool:
+        if reldir in self._dir_to_wd:
+            return True
+        path = os.path.join(self.root, reldir).encode()
+        wd = self._libc.inotify_add_watch(self.fd, path, WATCH_MASK)
+        if wd < 0:
+            return False
+        self._wd_to_dir[wd] = reldir
+        self._dir_to_wd[reldir] = wd
+        return True
+
+    def _add_tree(self, reldir: str, changed: Set[str]):
+        """Watch a newly created directory and report the files already inside it."""
+        if not self.keep_dir(reldir) or not self._add(reldir):
+            return
+        try:
+            entries = list(os.scandir(os.path.join(self.root, reldir)))
+        except OSError:
+            return
+        for entry in entries:
+            rel = f"{reldir}/{entry.name}" if reldir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                self._add_tree(rel, changed)
+            else:
+                changed.add(rel)
+
+    def _drop(self, wd: int):
+        reldir = self._wd_to_dir.pop(wd, None)
+        if reldir is not None:
+            self._dir_to_wd.pop(reldir, None)
+
+    def read(self, timeout: Optional[float] = None) -> Set[str]:
+        """Wait up to timeout seconds (forever if None) and return changed relpaths."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed: Set[str] = set()
+        while True:
+            try:
+                buf = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            self._parse(buf, changed)
+        return changed
+
+    def _parse(self, buf: bytes, changed: Set[str]):
+        offset = 0
+        while offset + _EVENT.size <= len(buf):
+            wd, mask, _, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = buf[offset : offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                changed.update(self._rescan())
+                continue
+            reldir = self._wd_to_dir.get(wd)
+            if reldir is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                if mask & IN_IGNORED:
+                    self._drop(wd)
+                continue
+            rel = f"{reldir}/{name}" if reldir else name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(rel, changed)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    changed.add(rel)  # consumers drop everything below it
+                continue
+            changed.add(rel)
+
+    def _rescan(self) -> Set[str]:
+        """After a queue overflow, report every file in scope as changed."""
+        return set(self.scan())
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _load_libc():
+    """Load libc with inotify symbols, or None when unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def open_watcher(
+    root,
+    dirs: Iterable[str],
+    keep_dir: Callable[[str], bool],
+    scan: Callable[[], Iterable[str]],
+    interval: float = 0.5,
+    poll: bool = False,
+):
+    """Open an inotify watcher when available, falling back to stat polling."""
+    if not poll:
+        try:
+            return InotifyWatcher(root, dirs, keep_dir, scan)
+        except OSError:
+            pass
+    return PollingWatcher(root, scan, interval)
+
+
+def debounced_changes(watcher, debounce: float = 0.2) -> Iterator[Set[str]]:
+    """Yield batches of changed relpaths once the tree has been quiet for `debounce` seconds."""
+    while True:
+        batch = watcher.read()
+        if not batch:
+            continue
+        while True:
+            more = watcher.read(debounce)
+            if not more:
+                break
+            batch |= more
+        yield batch
@@ -1,5 +1,7 @@
+import os
 import pytest
 import json
+import shutil
 import sys
 import yaml
 from pathlib import Path
@@ -53,6 +55,10 @@ def test_fold(temp_project, tmp_path, monkeypatch, capsys):
 
 def test_fold_directory_default(temp_project, tmp_path, monkeypatch, capsys):
     """Test folding directory when no files specified."""
+    import pyperclip
+
+    copied = []
+    monkeypatch.setattr(pyperclip, "copy", copied.append)
     output_file = tmp_path / "folded.json"
     monkeypatch.chdir(temp_project)
     monkeypatch.setattr(
@@ -64,6 +70,7 @@ def test_fold_directory_default(temp_project, tmp_path, monkeypatch, capsys):
     assert output_file.exists()
     with open(output_file, "r", encoding="utf-8") as f:
         data = json.load(f)
+    assert copied[0] == json.dumps(data)  # one line, json.dumps spacing
     assert any(f["path"] == "src/project/main.py" for f in data["files"])
     assert any(f["path"] == "docs/index.md" for f in data["files"])
     assert any(f["path"] == "src/project/utils.py" for f in data["files"])
@@ -730,3 +737,888 @@ def test_add_non_file(temp_project, tmp_path, monkeypatch, capsys):
     with open(fold_file, "r", encoding="utf-8") as f:
         data = json.load(f)
     assert len(data["files"]) == 0
+
+
+def test_fold_apply_changes(temp_project):
+    """Test incremental re-reading of changed, added and deleted files in watch mode."""
+    from cfold.cli.fold import apply_changes, read_file
+    from cfold.core.models import FileEntry
+
+    entries = {
+        rel: FileEntry(path=rel, content=read_file(temp_project / rel))
+        for rel in ["src/project/main.py", "src/project/utils.py"]
+    }
+    (temp_project / "src" / "project" / "main.py").write_text("print('changed')\n")
+    (temp_project / "src" / "project" / "utils.py").unlink()
+    (temp_project / "src" / "project" / "extra.py").write_text("x = 1\n")
+    (temp_project / "notes.txt").write_text("skip")
+    changed = {
+        "src/project/main.py",
+        "src/project/utils.py",
+        "src/project/extra.py",
+        "notes.txt",
+    }
+    touched = apply_changes(
+        entries, changed, temp_project, lambda rel: rel.endswith(".py")
+    )
+    assert sorted(touched) == sorted(
+        ["src/project/main.py", "src/project/utils.py", "src/project/extra.py"]
+    )
+    assert entries["src/project/main.py"].content == "print('changed')\n"
+    assert "src/project/utils.py" not in entries
+    assert entries["src/project/extra.py"].content == "x = 1\n"
+
+
+@pytest.mark.parametrize("poll", [True, False])
+def test_watcher_detects_changes(temp_project, poll):
+    """Test inotify and polling watchers report modified, created and deleted files."""
+    from cfold.utils.watch import open_watcher
+
+    tracked = ["src/project/main.py", "src/project/utils.py"]
+
+    def scan():
+        return [p for p in tracked if (temp_project / p).exists()] + [
+            p for p in ["src/project/new.py"] if (temp_project / p).exists()
+        ]
+
+    watcher = open_watcher(
+        temp_project,
+        ["", "src", "src/project"],
+        lambda rel: True,
+        scan,
+        interval=0.01,
+        poll=poll,
+    )
+    try:
+        (temp_project / "src" / "project" / "main.py").write_text("changed\n")
+        (temp_project / "src" / "project" / "new.py").write_text("new\n")
+        (temp_project / "src" / "project" / "utils.py").unlink()
+        changed = set()
+        for _ in range(20):
+            changed |= watcher.read(0.05)
+            if len(changed) >= 3:
+                break
+    finally:
+        watcher.close()
+    assert {
+        "src/project/main.py",
+        "src/project/new.py",
+        "src/project/utils.py",
+    } <= changed
+
+
+def test_daemon_serves_fold_view_add(temp_project, tmp_path, monkeypatch, capsys):
+    """Test fold, view and add are answered by a running daemon with local-identical output."""
+    import threading
+    from cfold.utils import daemon
+
+    sock = str(tmp_path / "cfold.sock")
+    monkeypatch.setenv("CFOLD_SOCKET", sock)
+    monkeypatch.chdir(temp_project)
+    local_out = tmp_path / "local.json"
+    monkeypatch.setenv("CFOLD_NO_DAEMON", "1")
+    monkeypatch.setattr(sys, "argv", ["cfold", "fold", "-o", str(local_out), "-d", "py"])
+    main()
+    monkeypatch.delenv("CFOLD_NO_DAEMON")
+
+    started = threading.Event()
+    servers = []
+
+    def ready(server):
+        servers.append(server)
+        started.set()
+
+    thread = threading.Thread(
+        target=daemon.serve_forever, args=([str(temp_project)], sock, ready), daemon=True
+    )
+    thread.start()
+    assert started.wait(5)
+    calls = []
+    real_read = daemon.RootIndex.read
+    monkeypatch.setattr(
+        daemon.RootIndex, "read", lambda self, rel: calls.append(rel) or real_read(self, rel)
+    )
+    try:
+        assert daemon.request_daemon("ping")["roots"] == [str(temp_project)]
+        served_out = tmp_path / "served.json"
+        monkeypatch.setattr(
+            sys, "argv", ["cfold", "fold", "-o", str(served_out), "-d", "py"]
+        )
+        main()
+        assert calls  # contents came from the daemon
+        assert json.loads(served_out.read_text()) == json.loads(local_out.read_text())
+
+        monkeypatch.setattr(sys, "argv", ["cfold", "view", str(served_out)])
+        main()
+        assert "src/project/main.py" in capsys.readouterr().out
+
+        (temp_project / "extra.py").write_text("x = 1\n")
+        before = served_out.stat().st_ino
+        monkeypatch.setattr(
+            sys, "argv", ["cfold", "add", "extra.py", "-f", str(served_out)]
+        )
+        main()
+        assert "Added files to" in capsys.readouterr().out
+        data = json.loads(served_out.read_text())
+        assert any(f["path"] == "extra.py" for f in data["files"])
+        assert served_out.stat().st_ino != before  # replaced, not rewritten in place
+        assert not Path(f"{served_out}.tmp").exists()
+    finally:
+        servers[0].shutdown()
+        thread.join(5)
+    assert not os.path.exists(sock)
+
+
+def test_unfold_edits_and_patch(temp_project, tmp_path, monkeypatch, capsys):
+    """Test unfold applies edits and patches, and reports entries that do not apply."""
+    fold_file = tmp_path / "folded.json"
+    data = {
+        "instructions": [],
+        "files": [
+            {
+                "path": "src/project/utils.py",
+                "edits": [{"search": "    pass", "replace": "    return 42"}],
+            },
+            {
+                "path": "src/project/main.py",
+                "patch": '@@ -1 +1,2 @@\n print("Hello")\n+print("World")\n',
+            },
+            {
+                "path": "src/project/importer.py",
+                "edits": [{"search": "not there", "replace": ""}],
+            },
+        ],
+    }
+    fold_file.write_text(json.dumps(data))
+    output_dir = tmp_path / "unfolded"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["cfold", "unfold", str(fold_file), "-i", str(temp_project), "-o", str(output_dir)],
+    )
+    with pytest.raises(SystemExit) as exc:
+        main()
+    assert exc.value.code == 1
+    captured = capsys.readouterr()
+    assert "Failed files" in captured.out
+    assert "search text not found" in captured.out
+    project = output_dir / "src" / "project"
+    assert (project / "utils.py").read_text() == "def util():\n    return 42\n"
+    assert (project / "main.py").read_text() == 'print("Hello")\nprint("World")\n'
+    assert (project / "importer.py").read_text() == "from project.main import *\n"
+
+
+def test_fold_regions_roundtrip(temp_project, tmp_path, monkeypatch, capsys):
+    """Test folding line and symbol regions and splicing edited regions back."""
+    module = temp_project / "src" / "project" / "big.py"
+    module.write_text(
+        "import os\n\n\ndef first():\n    return 1\n\n\ndef second():\n    return 2\n"
+    )
+    output_file = tmp_path / "folded.json"
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "cfold",
+            "fold",
+            "src/project/big.py:1-1",
+            "src/project/big.py::second",
+            "-o",
+            str(output_file),
+            "-b",
+            "True",
+        ],
+    )
+    main()
+    data = json.loads(output_file.read_text())
+    first, second = data["files"]
+    assert (first["start_line"], first["end_line"], first["content"]) == (1, 1, "import os\n")
+    assert second["symbol"] == "second" and second["start_line"] == 8
+    assert second["content"] == "def second():\n    return 2\n"
+
+    # The file shifts before the answer arrives; the symbol is found again
+    module.write_text("# header\n" + module.read_text())
+    first["content"] = "import sys\n"
+    first["start_line"] = first["end_line"] = 2
+    second["content"] = "def second():\n    return 3\n"
+    output_file.write_text(json.dumps(data))
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", str(output_file)])
+    main()
+    assert module.read_text() == (
+        "# header\nimport sys\n\n\ndef first():\n    return 1\n\n\n"
+        "def second():\n    return 3\n"
+    )
+
+    for args in (["src/project/big.py:5-2"], ["src/project/big.py:0", "-w"]):
+        monkeypatch.setattr(sys, "argv", ["cfold", "fold", "-o", str(output_file)] + args)
+        with pytest.raises(SystemExit):
+            main()
+        assert "Invalid line range" in capsys.readouterr().out
+
+
+def test_fold_outline_and_unfold_refuses(temp_project, tmp_path, monkeypatch, capsys):
+    """Test outline folding of non-focus files and that unfold will not write them."""
+    utils = temp_project / "src" / "project" / "utils.py"
+    utils.write_text('def util(x):\n    """Do it."""\n    return x * 2\n')
+    output_file = tmp_path / "folded.json"
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["cfold", "fold", "src/project/main.py", "--outline", "-o", str(output_file)],
+    )
+    main()
+    data = json.loads(output_file.read_text())
+    files = {f["path"]: f for f in data["files"]}
+    assert data["files"][0]["path"] == "src/project/main.py"
+    assert "outline" not in files["src/project/main.py"]
+    assert files["src/project/utils.py"]["outline"] is True
+    assert files["src/project/utils.py"]["content"] == (
+        'def util(x):\n    """Do it."""\n    ...\n'
+    )
+    assert "outline" not in files["docs/index.md"]
+    assert (temp_project / ".cfold" / "cache" / "outline").is_dir()
+
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", str(output_file)])
+    with pytest.raises(SystemExit):
+        main()
+    assert "refusing to overwrite" in capsys.readouterr().out
+    assert utils.read_text().endswith("return x * 2\n")
+
+    for argv in (["--outline"], ["-d", "outline"]):
+        monkeypatch.setattr(sys, "argv", ["cfold", "fold", "-o", str(output_file)] + argv)
+        with pytest.raises(SystemExit):
+            main()
+        assert "Outline mode needs focus files" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("depth, expected", [(None, 3), (1, 2), (0, 1)])
+def test_fold_follow_imports(temp_project, tmp_path, monkeypatch, depth, expected):
+    """Test folding the import closure of an entry file, limited by depth."""
+    src = temp_project / "src" / "project"
+    (src / "app.py").write_text("from project import importer\n")
+    output_file = tmp_path / "folded.json"
+    monkeypatch.chdir(temp_project)
+    argv = ["cfold", "fold", "-f", "src/project/app.py", "-o", str(output_file)]
+    if depth is not None:
+        argv += ["-D", str(depth)]
+    monkeypatch.setattr(sys, "argv", argv)
+    main()
+    paths = [f["path"] for f in json.loads(output_file.read_text())["files"]]
+    assert paths == [
+        "src/project/app.py",
+        "src/project/importer.py",
+        "src/project/main.py",
+    ][:expected]
+
+
+def test_fold_auto_select(temp_project, tmp_path, monkeypatch):
+    """Test auto-selecting files relevant to the prompt within a token budget."""
+    prompt_file = tmp_path / "task.md"
+    prompt_file.write_text("Rename the util helper and update the importer.")
+    output_file = tmp_path / "folded.json"
+    monkeypatch.chdir(temp_project)
+    base = ["cfold", "fold", "-p", str(prompt_file), "-o", str(output_file), "-a"]
+    monkeypatch.setattr(sys, "argv", base + ["5"])
+    main()
+    paths = [f["path"] for f in json.loads(output_file.read_text())["files"]]
+    assert sorted(paths) == ["src/project/importer.py", "src/project/utils.py"]
+
+    monkeypatch.setattr(sys, "argv", base + ["5", "-t", "6"])
+    main()
+    paths = [f["path"] for f in json.loads(output_file.read_text())["files"]]
+    assert paths == ["src/project/utils.py"]
+
+
+def test_fold_symbol(temp_project, tmp_path, monkeypatch, capsys):
+    """Test folding the files that define (and reference) symbol names."""
+    output_file = tmp_path / "folded.json"
+    monkeypatch.chdir(temp_project)
+    argv = ["cfold", "fold", "-o", str(output_file), "-s", "util,nothing"]
+    monkeypatch.setattr(sys, "argv", argv)
+    main()
+    assert "Symbol 'nothing' not found" in capsys.readouterr().out
+    paths = [f["path"] for f in json.loads(output_file.read_text())["files"]]
+    assert paths == ["src/project/utils.py"]
+
+    (temp_project / "src" / "project" / "main.py").write_text("util()\n")
+    monkeypatch.setattr(sys, "argv", argv + ["-r"])
+    main()
+    paths = [f["path"] for f in json.loads(output_file.read_text())["files"]]
+    assert paths == ["src/project/utils.py", "src/project/main.py"]
+
+    monkeypatch.setattr(sys, "argv", argv[:-1] + ["util", "docs/index.md"])
+    main()
+    paths = [f["path"] for f in json.loads(output_file.read_text())["files"]]
+    assert paths == ["docs/index.md", "src/project/utils.py"]
+
+
+def test_fold_from_coverage(temp_project, tmp_path, monkeypatch):
+    """Test folding the files and line ranges a test context executed."""
+    import sqlite3
+
+    utils = temp_project / "src" / "project" / "utils.py"
+    utils.write_text("".join(f"x{i} = {i}\n" for i in range(1, 21)))
+    datafile = tmp_path / "cov.db"
+    conn = sqlite3.connect(datafile)
+    conn.executescript(
+        "CREATE TABLE file (id INTEGER PRIMARY KEY, path TEXT);"
+        "CREATE TABLE context (id INTEGER PRIMARY KEY, context TEXT);"
+        "CREATE TABLE line_bits (file_id INTEGER, context_id INTEGER, numbits BLOB);"
+        "INSERT INTO context VALUES (1, 'tests/test_u.py::test_u|run');"
+    )
+    conn.execute("INSERT INTO file VALUES (1, ?)", (str(utils),))
+    conn.execute("INSERT INTO file VALUES (2, '/elsewhere/site.py')")
+    # lines 2-3 and 15 of utils.py
+    conn.execute("INSERT INTO line_bits VALUES (1, 1, ?)", (bytes([0b1100, 0x80]),))
+    conn.execute("INSERT INTO line_bits VALUES (2, 1, ?)", (bytes([0b10]),))
+    conn.commit()
+    conn.close()
+    output_file = tmp_path / "folded.json"
+    monkeypatch.chdir(temp_project)
+    argv = ["cfold", "fold", "-c", str(datafile), "-x", "tests/test_u.py::test_u"]
+    monkeypatch.setattr(sys, "argv", argv + ["-o", str(output_file)])
+    main()
+    files = json.loads(output_file.read_text())["files"]
+    assert [f["path"] for f in files] == ["src/project/utils.py"]
+    assert "start_line" not in files[0]
+
+    monkeypatch.setattr(sys, "argv", argv + ["-R", "-o", str(output_file)])
+    main()
+    files = json.loads(output_file.read_text())["files"]
+    assert [(f["start_line"], f["end_line"]) for f in files] == [(2, 3), (15, 15)]
+    assert files[0]["content"] == "x2 = 2\nx3 = 3\n"
+
+
+def test_fold_transforms_and_unfold_warning(temp_project, tmp_path, monkeypatch, capsys):
+    """Test dialect transforms from .foldrc and the unfold warning for lossy entries."""
+    (temp_project / ".foldrc").write_text(
+        yaml.dump({"lean": {"pre": ["default"], "transforms": ["strip-comments"]}})
+    )
+    (temp_project / "src" / "project" / "main.py").write_text(
+        '# entry point\nprint("Hello")  # greet\n'
+    )
+    output_file = tmp_path / "folded.json"
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(
+        sys, "argv", ["cfold", "fold", "-d", "lean", "-o", str(output_file)]
+    )
+    main()
+    files = {f["path"]: f for f in json.loads(output_file.read_text())["files"]}
+    assert files["src/project/main.py"]["content"] == 'print("Hello")\n'
+    assert files["src/project/main.py"]["transforms"] == ["strip-comments"]
+    assert "transforms" not in files["docs/index.md"]
+
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", str(output_file)])
+    main()
+    assert "lossy transforms (strip-comments)" in capsys.readouterr().out
+
+
+def test_fold_unfold_notebook(temp_project, tmp_path, monkeypatch):
+    """Test notebooks fold without outputs and unfold back into valid notebook JSON."""
+    nb = {
+        "cells": [
+            {
+                "cell_type": "code",
+                "id": "a1",
+                "metadata": {},
+                "execution_count": 1,
+                "outputs": [
+                    {"output_type": "stream", "name": "stdout", "text": ["hi\n" * 1000]}
+                ],
+                "source": ["print('hi')"],
+            }
+        ],
+        "metadata": {"kernelspec": {"name": "python3"}},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+    notebook = temp_project / "docs" / "demo.ipynb"
+    notebook.write_text(json.dumps(nb))
+    output_file = tmp_path / "folded.json"
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(
+        sys, "argv", ["cfold", "fold", "docs/demo.ipynb", "-o", str(output_file)]
+    )
+    main()
+    data = json.loads(output_file.read_text())
+    assert data["files"][0]["content"] == "# %% [code] id=a1\nprint('hi')\n"
+
+    data["files"][0]["content"] += "\n# %% [markdown]\nDone.\n"
+    output_file.write_text(json.dumps(data))
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", str(output_file)])
+    main()
+    rebuilt = json.loads(notebook.read_text())
+    assert rebuilt["metadata"] == nb["metadata"]
+    assert rebuilt["cells"][0] == nb["cells"][0]
+    assert rebuilt["cells"][1]["source"] == ["Done."]
+
+
+def test_unfold_conflicts_with_manifest(temp_project, tmp_path, monkeypatch, capsys):
+    """Test unfold refuses, skips or merges files changed locally since the fold."""
+    module = temp_project / "src" / "project" / "utils.py"
+    module.write_text("a = 1\nb = 2\nc = 3\nd = 4\n")
+    output_file = tmp_path / "folded.json"
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(
+        sys, "argv", ["cfold", "fold", "src/project/utils.py", "-o", str(output_file)]
+    )
+    main()
+    from cfold.utils.manifest import load_manifest
+
+    data = json.loads(output_file.read_text())
+    assert "manifest" not in data  # answers come back without one, it stays local
+    assert load_manifest(temp_project)["src/project/utils.py"].size == 24
+    data["files"][0]["content"] = "a = 1\nb = 2\nc = 3\nd = 40\n"
+    output_file.write_text(json.dumps(data))
+    module.write_text("a = 10\nb = 2\nc = 3\nd = 4\n")  # local change after the fold
+
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", str(output_file)])
+    with pytest.raises(SystemExit):
+        main()
+    assert "src/project/utils.py" in capsys.readouterr().out
+    assert module.read_text() == "a = 10\nb = 2\nc = 3\nd = 4\n"
+
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", str(output_file), "-C", "skip"])
+    main()
+    assert module.read_text() == "a = 10\nb = 2\nc = 3\nd = 4\n"
+
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", str(output_file), "-C", "merge"])
+    main()
+    assert module.read_text() == "a = 10\nb = 2\nc = 3\nd = 40\n"
+
+
+def test_unfold_resume_interrupted(temp_project, tmp_path, monkeypatch, capsys):
+    """Test unfold refuses to run over an interrupted journal and resumes it."""
+    from cfold.utils.journal import Journal, Step, apply_steps, stage_text
+
+    main_py = temp_project / "src" / "project" / "main.py"
+    steps = [
+        Step(
+            "replace",
+            "src/project/main.py",
+            stage_text(str(temp_project), "src/project/main.py", "print('Resumed')\n"),
+            "src/project/main.py",
+        ),
+        Step("replace", "docs/new.md", stage_text(str(temp_project), "docs/new.md", "new\n")),
+    ]
+    journal = Journal(str(temp_project))
+    journal.begin(steps)
+    apply_steps(journal, steps[:1])  # dies before the last step
+    fold_file = tmp_path / "folded.json"
+    fold_file.write_text(json.dumps({"instructions": [], "files": []}))
+    monkeypatch.chdir(temp_project)
+
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", str(fold_file)])
+    with pytest.raises(SystemExit):
+        main()
+    assert "--resume or --rollback" in capsys.readouterr().out
+
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", str(fold_file), "--resume"])
+    main()
+    assert main_py.read_text() == "print('Resumed')\n"
+    assert (temp_project / "docs" / "new.md").read_text() == "new\n"
+    assert not journal.exists()
+
+
+def test_unfold_cleans_up_interrupted_staging(temp_project, tmp_path, monkeypatch):
+    """Test temp files of a run that died before journaling its steps are removed."""
+    from cfold.utils.journal import Journal, stage_text, staged_path
+
+    journal = Journal(str(temp_project))
+    journal.stage(["src/project/main.py"])
+    stage_text(str(temp_project), "src/project/main.py", "print('Half')\n")
+    tmp = temp_project / staged_path("src/project/main.py")
+    assert tmp.exists()  # dies here, before begin()
+    fold_file = tmp_path / "folded.json"
+    fold_file.write_text(
+        json.dumps({"files": [{"path": "docs/index.md", "content": "# New\n"}]})
+    )
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", str(fold_file)])
+    main()
+    assert not tmp.exists() and not journal.exists()
+    assert (temp_project / "src" / "project" / "main.py").read_text() == 'print("Hello")\n'
+    assert (temp_project / "docs" / "index.md").read_text() == "# New\n"
+
+
+def test_unfold_stdin_stream(temp_project, monkeypatch, capsys):
+    """Test unfold - applies a fold streamed on stdin, skipping prose and fences."""
+    import io
+
+    answer = {
+        "files": [
+            {"path": "src/project/main.py", "content": 'print("}{")\n'},
+            {"path": "docs/index.md", "delete": True},
+        ]
+    }
+    text = f"Here is the change:\n```json\n{json.dumps(answer)}\n```\nLet me know!\n"
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(sys, "stdin", io.StringIO(text))
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", "-"])
+    main()
+    assert (temp_project / "src" / "project" / "main.py").read_text() == 'print("}{")\n'
+    assert not (temp_project / "docs" / "index.md").exists()
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO("No JSON here."))
+    with pytest.raises(SystemExit):
+        main()
+    assert "no complete fold JSON" in capsys.readouterr().out
+
+
+def test_unfold_stdin_applies_entries_early(temp_project, monkeypatch):
+    """Test unfold - writes an entry before the rest of the answer has arrived."""
+    main_py = temp_project / "src" / "project" / "main.py"
+    chunks = [
+        '{"files": [{"path": "src/project/main.py", "content": "print(1)\\n"}, ',
+        '{"path": "docs/index.md", "content": "# New\\n"}]}',
+    ]
+
+    class Answer:
+        def read(self, size):
+            if len(chunks) == 1:
+                assert main_py.read_text() == "print(1)\n"  # already written
+            return chunks.pop(0) if chunks else ""
+
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(sys, "stdin", Answer())
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", "-"])
+    main()
+    assert (temp_project / "docs" / "index.md").read_text() == "# New\n"
+
+
+def test_unfold_stdin_checks_manifest(temp_project, monkeypatch, capsys):
+    """Test unfold - refuses to overwrite files changed since the fold."""
+    import io
+
+    fold_file = temp_project / "folded.json"
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(sys, "argv", ["cfold", "fold", "-o", str(fold_file)])
+    main()
+    text = fold_file.read_text()
+    main_py = temp_project / "src" / "project" / "main.py"
+    main_py.write_text("print('Local edit')\n")
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO(text))
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", "-"])
+    with pytest.raises(SystemExit):
+        main()
+    assert "changed locally" in capsys.readouterr().out
+    assert main_py.read_text() == "print('Local edit')\n"
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO(text))
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", "-", "--on-conflict", "skip"])
+    main()
+    assert main_py.read_text() == "print('Local edit')\n"
+
+
+def test_unfold_reports_staging_failures(temp_project, tmp_path, monkeypatch, capsys):
+    """Test a file that cannot be staged is reported and leaves no temp file behind."""
+    from cfold.cli import unfold as unfold_module
+
+    real_stage = unfold_module.stage_text
+
+    def stage_text(output_dir, rel, content):
+        tmp = real_stage(output_dir, rel, content)
+        if rel.endswith("main.py"):
+            raise OSError(28, "No space left on device")
+        return tmp
+
+    monkeypatch.setattr(unfold_module, "stage_text", stage_text)
+    fold_file = tmp_path / "answer.json"
+    fold_file.write_text(
+        json.dumps(
+            {
+                "files": [
+                    {"path": "src/project/main.py", "content": "print('New')\n"},
+                    {"path": "docs/index.md", "content": "# New\n"},
+                ]
+            }
+        )
+    )
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", str(fold_file)])
+    with pytest.raises(SystemExit):
+        main()
+    assert "could not be staged" in capsys.readouterr().out
+    assert (temp_project / "src" / "project" / "main.py").read_text() == 'print("Hello")\n'
+    assert (temp_project / "docs" / "index.md").read_text() == "# New\n"
+    assert not list(temp_project.rglob("*.cfold-tmp"))
+
+
+def test_unfold_merges_several_folds(temp_project, tmp_path, monkeypatch, capsys):
+    """Test unfold of several folds merges them in order and writes once."""
+    folds = [
+        {
+            "files": [
+                {"path": "src/project/main.py", "content": "x = 1\n"},
+                {"path": "src/project/utils.py", "delete": True},
+                {"path": "docs/index.md", "content": "# First\n"},
+            ]
+        },
+        {
+            "files": [
+                {"path": "src/project/main.py", "edits": [{"search": "1", "replace": "2"}]},
+                {"path": "src/project/utils.py", "content": "def util():\n    return 1\n"},
+            ]
+        },
+        {"files": [{"path": "docs/index.md", "content": "# Last\n"}]},
+    ]
+    names = []
+    for n, fold in enumerate(folds):
+        names.append(str(tmp_path / f"answer{n}.json"))
+        Path(names[-1]).write_text(json.dumps(fold))
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(sys, "argv", ["cfold", "unfold", *names])
+    main()
+    project = temp_project / "src" / "project"
+    assert (project / "main.py").read_text() == "x = 2\n"
+    assert (project / "utils.py").read_text() == "def util():\n    return 1\n"
+    assert (temp_project / "docs" / "index.md").read_text() == "# Last\n"
+    out = capsys.readouterr().out
+    assert "Overwritten by a later fold" in out and "answer0.json" in out
+
+
+def test_fold_index_cat_and_extract(temp_project, tmp_path, monkeypatch, capsys):
+    """Test the fold sidecar index and reading files back with cat and extract."""
+    (temp_project / "src" / "project" / "main.py").write_text('print("é \\"q\\"")\n')
+    output_file = tmp_path / "folded.json"
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(sys, "argv", ["cfold", "fold", "-o", str(output_file), "-I"])
+    main()
+    index = json.loads(Path(f"{output_file}.idx").read_text())
+    paths = {e["path"] for e in index["entries"]}
+    assert paths >= {"src/project/main.py", "docs/index.md"}
+    capsys.readouterr()
+
+    monkeypatch.setattr(
+        sys, "argv", ["cfold", "cat", str(output_file), "src/project/main.py"]
+    )
+    main()
+    assert capsys.readouterr().out == 'print("é \\"q\\"")\n'
+
+    # Without a (current) sidecar the index is rebuilt in one pass
+    Path(f"{output_file}.idx").unlink()
+    out_dir = tmp_path / "extracted"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["cfold", "extract", str(output_file), "-g", "src/*/utils.py", "docs/*"]
+        + ["-o", str(out_dir)],
+    )
+    main()
+    utils = out_dir / "src" / "project" / "utils.py"
+    assert utils.read_text() == "def util():\n    pass\n"
+    assert (out_dir / "docs" / "index.md").read_text() == "# Docs\n"
+    assert not (out_dir / "src" / "project" / "main.py").exists()
+    assert Path(f"{output_file}.idx").exists()
+
+
+def test_extract_skips_partial_entries(tmp_path, monkeypatch, capsys):
+    """Test extract writes whole files, not regions, outlines or transformed text."""
+    fold_file = tmp_path / "folded.json"
+    fold_file.write_text(
+        json.dumps(
+            {
+                "instructions": [],
+                "files": [
+                    {"path": "a.py", "content": "a = 1\n"},
+                    {"path": "b.py", "content": "def f(): ...\n", "outline": True},
+                    {"path": "c.py", "content": "c = 1\n", "transforms": ["comments"]},
+                    {"path": "d.py", "content": "d\n", "start_line": 2, "end_line": 2},
+                ],
+            }
+        )
+    )
+    out_dir = tmp_path / "out"
+    monkeypatch.setattr(
+        sys, "argv", ["cfold", "extract", str(fold_file), "-g", "*", "-o", str(out_dir)]
+    )
+    main()
+    out = capsys.readouterr().out
+    assert sorted(p.name for p in out_dir.iterdir()) == ["a.py"]
+    assert "outline entry" in out and "lossy transforms" in out and "region" in out
+
+
+def test_history_commands(temp_project, tmp_path, monkeypatch, capsys):
+    """Test folds are recorded on request and can be listed, shown and diffed."""
+    output_file = tmp_path / "folded.json"
+    monkeypatch.chdir(temp_project)
+    fold_args = ["cfold", "fold", "src/project/main.py", "-o", str(output_file)]
+    monkeypatch.setattr(sys, "argv", fold_args)
+    main()
+    assert not (temp_project / ".cfold" / "history.sqlite").exists()
+    monkeypatch.setattr(sys, "argv", fold_args + ["--record"])
+    main()
+    (temp_project / "src" / "project" / "main.py").write_text('print("Bye")\n')
+    (temp_project / ".foldrc").write_text("record_history: true\n")
+    monkeypatch.setattr(sys, "argv", fold_args)
+    main()
+    capsys.readouterr()
+
+    monkeypatch.setattr(sys, "argv", ["cfold", "history", "list"])
+    main()
+    assert "2 snapshot(s)" in capsys.readouterr().out
+
+    monkeypatch.setattr(sys, "argv", ["cfold", "history", "show", "1"])
+    main()
+    shown = json.loads(capsys.readouterr().out)
+    assert shown["files"][0]["content"] == 'print("Hello")\n'
+
+    monkeypatch.setattr(sys, "argv", ["cfold", "history", "diff", "1", "2"])
+    main()
+    out = capsys.readouterr().out
+    assert '-print("Hello")' in out and '+print("Bye")' in out
+
+
+def test_stats_dry_run(temp_project, monkeypatch, capsys):
+    """Test stats reports inclusions, exclusion reasons and sizes without folding."""
+    (temp_project / "node_modules" / "pkg").mkdir(parents=True)
+    (temp_project / "node_modules" / "pkg" / "index.py").write_text("x = 1\n")
+    (temp_project / "data.json").write_text("{}\n")
+    (temp_project / ".foldignore").write_text("importer.py\n")
+    monkeypatch.chdir(temp_project)
+    monkeypatch.setattr(sys, "argv", ["cfold", "stats", "-d", "py", "-n", "1"])
+    main()
+    out = capsys.readouterr().out
+    assert "2 file(s), 36 bytes" in out
+    assert "ignore rule importer.py" in out
+    assert "excluded dir node_modules" in out
+    assert "src/project/utils.py" in out and "src/project/main.py" not in out
+    assert not (temp_project / "codefold.json").exists()
+
+
+def test_api_folder_matches_cli(temp_project, tmp_path, monkeypatch):
+    """Test the Python API folds like the CLI and picks up file changes between calls."""
+    import asyncio
+    from cfold.api import Folder
+    from cfold.utils import manifest
+
+    monkeypatch.setenv("CFOLD_NO_DAEMON", "1")
+    monkeypatch.chdir(temp_project)
+    out = tmp_path / "cli.json"
+    monkeypatch.setattr(sys, "argv", ["cfold", "fold", "-o", str(out), "-d", "py"])
+    main()
+
+    with Folder(temp_project, "py") as folder:
+        assert json.loads(folder.fold_bytes()) == json.loads(out.read_text())
+        # A warm fold takes the manifest states from the index, nothing is re-hashed
+        monkeypatch.setattr(manifest, "file_state", lambda *a: pytest.fail("re-hash"))
+        folder.fold()
+        (temp_project / "src" / "project" / "main.py").write_text('print("Bye")\n')
+        data = asyncio.run(folder.afold(["src/project/main.py"], prompt="Why?"))
+        assert [f.content for f in data.files] == ['print("Bye")\n']
+        assert data.instructions[-1].content == "Why?"
+    with pytest.raises(ValueError), Folder(temp_project, "no-such-dialect") as other:
+        other.fold()
+
+
+def test_fold_processes_matches_single_process(temp_project, tmp_path, monkeypatch, capsys):
+    """Test a sharded fold writes the same bytes as a single-process fold."""
+    monkeypatch.setenv("CFOLD_NO_DAEMON", "1")
+    monkeypatch.chdir(temp_project)
+    (temp_project / "setup.py").write_text("setup()\r\n")
+    (temp_project / "p.txt").write_text("Review this.\n")
+    (temp_project / "tests").mkdir()
+    (temp_project / "tests" / "test_main.py").write_text("def test(): pass\n")
+    outputs = []
+    for extra in ([], ["--processes", "3", "--record"]):
+        out = tmp_path / f"fold{len(outputs)}.json"
+        argv = ["cfold", "fold", "-o", str(out), "-d", "py", "-p", "p.txt"]
+        monkeypatch.setattr(sys, "argv", argv + extra)
+        main()
+        outputs.append(out.read_bytes())
+    assert outputs[0] == outputs[1]
+    data = json.loads(outputs[1])
+    assert [f["path"] for f in data["files"]][:2] == ["setup.py", "src/project/importer.py"]
+    assert data["files"][0]["content"] == "setup()\n"
+    assert data["instructions"][-1]["content"] == "Review this.\n"
+    assert "Codebase folded into" in capsys.readouterr().out
+    monkeypatch.setattr(sys, "argv", ["cfold", "history", "list"])
+    main()
+    assert "1 snapshot(s)" in capsys.readouterr().out
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+def test_fold_cache_friendly_layout(temp_project, tmp_path, monkeypatch):
+    """Test cache-friendly folds order files by git churn and put the prompt last."""
+    import subprocess
+    from cfold.core.models import Codebase
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            cwd=temp_project,
+            check=True,
+            capture_output=True,
+        )
+
+    git("init", "-q")
+    git("add", ".")
+    git("commit", "-qm", "init")
+    for n in range(2):
+        (temp_project / "src" / "project" / "importer.py").write_text(f"x = {n}\n")
+        git("commit", "-qam", f"edit {n}")
+    (temp_project / "src" / "project" / "utils.py").write_text("def util():\n    return 1\n")
+    (temp_project / "p.txt").write_text("Go.\n")
+    monkeypatch.setenv("CFOLD_NO_DAEMON", "1")
+    monkeypatch.chdir(temp_project)
+    out = tmp_path / "fold.json"
+    argv = ["cfold", "fold", "-o", str(out), "-d", "py", "-p", "p.txt", "-K"]
+    monkeypatch.setattr(sys, "argv", argv)
+    main()
+    text = out.read_text()
+    data = json.loads(text)
+    assert [f["path"] for f in data["files"]] == [
+        "src/project/main.py",
+        "src/project/importer.py",
+        "src/project/utils.py",
+    ]
+    assert list(data)[-1] == "prompt" and data["prompt"][0]["content"] == "Go.\n"
+    assert Codebase.model_validate(data).instructions[-1].content == "Go.\n"
+
+    (temp_project / "src" / "project" / "utils.py").write_text("def util():\n    return 2\n")
+    main()
+    changed = out.read_text()
+    assert text.index('"path": "src/project/utils.py"') == changed.index(
+        '"path": "src/project/utils.py"'
+    )
+    assert changed[: text.index("return 1")] == text[: text.index("return 1")]
+
+
+def test_fold_several_dialects_one_walk(temp_project, tmp_path, monkeypatch, capsys):
+    """Test folding several dialects at once matches folding each one on its own."""
+    from cfold.cli import fold as fold_module
+
+    monkeypatch.setenv("CFOLD_NO_DAEMON", "1")
+    monkeypatch.chdir(temp_project)
+    out = str(tmp_path / "out" / "{dialect}.json")
+    (tmp_path / "out").mkdir()
+    reads = []
+    real_read = fold_module.read_with_state
+    monkeypatch.setattr(
+        fold_module,
+        "read_with_state",
+        lambda path, cache=None: reads.append(path) or real_read(path, cache),
+    )
+    monkeypatch.setattr(sys, "argv", ["cfold", "fold", "-o", out, "-d", "py,doc,py"])
+    main()
+    assert len(reads) == len(set(reads)) == 4
+    assert "Dialect doc: 1 file(s)" in capsys.readouterr().out
+
+    for dialect in ("py", "doc"):
+        single = tmp_path / f"single-{dialect}.json"
+        monkeypatch.setattr(sys, "argv", ["cfold", "fold", "-o", str(single), "-d", dialect])
+        main()
+        multi = tmp_path / "out" / f"{dialect}.json"
+        assert multi.read_bytes() == single.read_bytes()
+
+    monkeypatch.setattr(sys, "argv", ["cfold", "fold", "-d", "py,doc"])
+    with pytest.raises(SystemExit):
+        main()
+    monkeypatch.setattr(sys, "argv", ["cfold", "fold", "-o", out, "-d", "py,doc", "-l"])
+    with pytest.raises(SystemExit):
+        main()
+    assert "do not apply to several dialects" in capsys.readouterr().out
@@ -43,3 +43,20 @@ def test_codebase():
     # Test validator for instructions as dict (though not typically used)
     codebase = Codebase.model_validate({"instructions": [], "files": []})
     assert isinstance(codebase.instructions, list)
+
+
+def test_fileentry_edits_and_patch():
+    """Test FileEntry accepts edits or patch instead of content, but not several."""
+    entry = FileEntry(path="file.py", edits=[{"search": "a", "replace": "b"}])
+    assert entry.edits[0].replace == "b"
+    assert "edits" in entry.model_dump()
+    entry = FileEntry(path="file.py", patch="@@ -1 +1 @@\n-a\n+b\n")
+    assert entry.content is None
+    with pytest.raises(ValidationError):
+        FileEntry(path="file.py", content="x", patch="@@ -1 +1 @@\n-a\n+b\n")
+    # Unset optional fields are left out of dumps
+    assert FileEntry(path="file.py", content="x").model_dump() == {
+        "path": "file.py",
+        "content": "x",
+        "delete": False,
+    }
@@ -90,3 +90,527 @@ def test_model_validation():
     FileEntry(path="test.py", delete=True)
     # Valid Codebase
     Codebase(instructions=[Instruction(type="system", content="test")], files=[])
+
+
+def test_compile_ignore_pattern():
+    """Test gitignore pattern compilation: comments, negation, anchoring and '**'."""
+    assert foldignore.compile_ignore_pattern("# comment") is None
+    assert foldignore.compile_ignore_pattern("   ") is None
+    rule = foldignore.compile_ignore_pattern("!keep.py")
+    assert rule.negate and not rule.anchored
+    rule = foldignore.compile_ignore_pattern("/build/")
+    assert rule.anchored and rule.dir_only
+    rule = foldignore.compile_ignore_pattern("a/**/b.py")
+    assert rule.regex.match("a/b.py")
+    assert rule.regex.match("a/x/y/b.py")
+    assert not rule.regex.match("c/a/b.py")
+    rule = foldignore.compile_ignore_pattern("*.gen.py")
+    assert rule.regex.match("x.gen.py")
+    assert not rule.regex.match("dir/x.gen.py")
+
+
+def test_ignore_matcher_hierarchy(tmp_path):
+    """Test nested .gitignore and .foldignore files with negation and anchoring."""
+    (tmp_path / ".gitignore").write_text("*.gen.py\n/secret.py\nout/\n")
+    sub = tmp_path / "pkg"
+    sub.mkdir()
+    (sub / ".foldignore").write_text("!keep.gen.py\nlocal.py\n")
+    matcher = foldignore.IgnoreMatcher(tmp_path)
+    assert matcher.is_ignored("a.gen.py")
+    assert matcher.is_ignored("pkg/b.gen.py")
+    assert not matcher.is_ignored("pkg/keep.gen.py")
+    assert matcher.is_ignored("secret.py")
+    assert not matcher.is_ignored("pkg/secret.py")
+    assert matcher.is_ignored("pkg/local.py")
+    assert not matcher.is_ignored("local.py")
+    assert matcher.is_ignored("out", is_dir=True)
+    assert matcher.is_ignored("pkg/out/x.py")
+    assert not matcher.is_ignored("out")  # dir-only rule does not match files
+
+
+def test_walk_files_prunes_ignored(tmp_path):
+    """Test the walker skips ignored subtrees and honours dialect patterns."""
+    (tmp_path / ".gitignore").write_text("generated/\n")
+    for rel in ["src/a.py", "src/generated/b.py", "src/c.md", "other/d.py"]:
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_text("x")
+    files = foldignore.walk_files(tmp_path, ["*.py"], [], ["src"])
+    rels = [p.relative_to(tmp_path).as_posix() for p in files]
+    assert rels == ["src/a.py"]
+
+
+def test_apply_edits():
+    """Test search/replace edits and their failure modes."""
+    from cfold.core.models import Edit
+    from cfold.utils.patching import PatchError, apply_edits
+
+    text = "def a():\n    return 1\n\ndef b():\n    return 1\n"
+    edits = [Edit(search="def a():\n    return 1", replace="def a():\n    return 2")]
+    assert apply_edits(text, edits).startswith("def a():\n    return 2\n")
+    with pytest.raises(PatchError, match="matches 2 times"):
+        apply_edits(text, [Edit(search="return 1", replace="return 3")])
+    with pytest.raises(PatchError, match="not found"):
+        apply_edits(text, [Edit(search="missing", replace="")])
+
+
+def test_apply_patch_with_offset():
+    """Test unified diffs apply even when the hunk moved a few lines."""
+    from cfold.utils.patching import PatchError, apply_patch
+
+    patch = "--- a/f.py\n+++ b/f.py\n@@ -2,3 +2,3 @@\n b\n-c\n+C\n d\n"
+    assert apply_patch("a\nb\nc\nd\ne\n", patch) == "a\nb\nC\nd\ne\n"
+    assert apply_patch("x\ny\na\nb\nc\nd\n", patch) == "x\ny\na\nb\nC\nd\n"
+    assert apply_patch("", "@@ -0,0 +1,2 @@\n+new\n+file\n") == "new\nfile\n"
+    with pytest.raises(PatchError):
+        apply_patch("a\nb\nX\nd\n", patch)
+
+
+def test_parse_file_spec_and_find_symbol():
+    """Test file spec parsing and symbol span lookup."""
+    from cfold.utils.regions import FileSpec, find_symbol, parse_file_spec
+
+    assert parse_file_spec("a/b.py") == FileSpec("a/b.py")
+    assert parse_file_spec("a/b.py:120-260") == FileSpec("a/b.py", 120, 260)
+    assert parse_file_spec("a/b.py:7") == FileSpec("a/b.py", 7, 7)
+    assert parse_file_spec("a/b.py::Klass.method").symbol == "Klass.method"
+    with pytest.raises(ValueError):
+        parse_file_spec("a/b.py:9-3")
+    source = "import os\n\n\nclass Klass:\n    @property\n    def method(self):\n        return 1\n"
+    assert find_symbol(source, "Klass") == (4, 7)
+    assert find_symbol(source, "Klass.method") == (5, 7)
+    with pytest.raises(ValueError):
+        find_symbol(source, "Klass.missing")
+
+
+def test_outline_source_and_cache(tmp_path):
+    """Test outlines keep the API surface and are cached by content."""
+    from cfold.utils.cache import ContentCache, map_cached
+    from cfold.utils.outline import OUTLINE_VERSION, outline_source
+
+    source = (
+        '"""Module doc."""\nimport os\n\nLIMIT = 3\n\n\n'
+        "class Klass(Base):\n"
+        '    """Klass doc."""\n\n    size: int = 1\n\n'
+        "    @property\n    def area(self) -> int:\n        return self.size**2\n\n\n"
+        "def helper(a, *, b=2):\n    x = a + b\n    return x\n"
+    )
+    outline = outline_source(source)
+    assert outline == (
+        '"""Module doc."""\nimport os\nLIMIT = 3\n\n'
+        "class Klass(Base):\n"
+        '    """Klass doc."""\n    size: int = 1\n\n'
+        "    @property\n    def area(self) -> int:\n        ...\n\n"
+        "def helper(a, *, b=2):\n    ...\n"
+    )
+    assert outline_source("def broken(:\n") == "def broken(:\n"
+
+    cache = ContentCache(tmp_path / "cache")
+    assert map_cached(outline_source, [source], cache, OUTLINE_VERSION) == [outline]
+    assert map_cached(str.upper, [source], cache, OUTLINE_VERSION) == [outline]
+
+
+def test_import_graph_resolution(tmp_path):
+    """Test import extraction, module naming and incremental graph refresh."""
+    from cfold.utils.imports import extract_imports, import_graph
+
+    assert extract_imports("import a.b as c\nfrom .x import y\nfrom .x import *\n") == [
+        ("a.b", None, 0),
+        ("x", "y", 1),
+        ("x", None, 1),
+    ]
+    pkg = tmp_path / "src" / "pkg"
+    pkg.mkdir(parents=True)
+    (pkg / "__init__.py").write_text("")
+    (pkg / "a.py").write_text("from . import b\nfrom pkg.c import thing\n")
+    (pkg / "b.py").write_text("import os\n")
+    (pkg / "c.py").write_text("thing = 1\n")
+    paths = ["src/pkg/__init__.py", "src/pkg/a.py", "src/pkg/b.py", "src/pkg/c.py"]
+    graph = import_graph(tmp_path, paths)
+    assert graph["src/pkg/a.py"] == [
+        "src/pkg/__init__.py",
+        "src/pkg/b.py",
+        "src/pkg/c.py",
+    ]
+    assert graph["src/pkg/b.py"] == []
+
+    subpkg = pkg / "sub"
+    subpkg.mkdir()
+    (subpkg / "__init__.py").write_text("")
+    (subpkg / "deep.py").write_text("")
+    (tmp_path / "main.py").write_text("import pkg.sub.deep\n")
+    paths += ["src/pkg/sub/__init__.py", "src/pkg/sub/deep.py", "main.py"]
+    assert import_graph(tmp_path, paths)["main.py"] == [
+        "src/pkg/__init__.py",
+        "src/pkg/sub/__init__.py",
+        "src/pkg/sub/deep.py",
+    ]
+
+    (pkg / "b.py").write_text("from .c import thing\n")
+    assert import_graph(tmp_path, paths)["src/pkg/b.py"] == [
+        "src/pkg/__init__.py",
+        "src/pkg/c.py",
+    ]
+
+
+def test_rank_files_bm25(tmp_path):
+    """Test BM25 ranking over identifier parts and incremental re-indexing."""
+    from cfold.utils.relevance import rank_files, terms
+
+    assert sorted(terms("loadInstructions fold_file")) == [
+        "file",
+        "fold",
+        "fold_file",
+        "instructions",
+        "load",
+        "loadinstructions",
+    ]
+    (tmp_path / "a.py").write_text("def load_instructions(dialect):\n    pass\n")
+    (tmp_path / "b.py").write_text("def unfold(foldfile):\n    pass\n")
+    (tmp_path / "c.md").write_text("Nothing relevant here.\n")
+    paths = ["a.py", "b.py", "c.md"]
+    ranked = rank_files(tmp_path, paths, "Fix the dialect instructions loader")
+    assert [p for p, _, _ in ranked] == ["a.py"]
+    assert ranked[0][2] == 11
+
+    (tmp_path / "b.py").write_text("DIALECT = 'py'\n")
+    assert [p for p, _, _ in rank_files(tmp_path, paths, "dialect")] == ["b.py", "a.py"]
+    assert [p for p, _, _ in rank_files(tmp_path, ["b.py"], "dialect")] == ["b.py"]
+
+
+def test_symbol_index(tmp_path):
+    """Test symbol extraction for Python and other languages, and lookups."""
+    from cfold.utils.symbols import extract_symbols, find_symbols
+
+    python = "X = 1\nclass A:\n    def f(self):\n        pass\n"
+    assert extract_symbols("m.py", python) == [
+        ("X", "X", "var", 1),
+        ("A", "A", "class", 2),
+        ("f", "A.f", "def", 3),
+    ]
+    go = "package m\n\nfunc (s *S) Run() {}\ntype S struct{}\n"
+    assert extract_symbols("m.go", go) == [
+        ("Run", "Run", "func", 3),
+        ("S", "S", "type", 4),
+    ]
+    (tmp_path / "a.py").write_text("class Codebase:\n    pass\n")
+    (tmp_path / "b.py").write_text("from a import Codebase\n")
+    (tmp_path / "c.js").write_text("export function load() {}\n")
+    paths = ["a.py", "b.py", "c.js"]
+    assert find_symbols(tmp_path, paths, ["Codebase", "load", "missing"]) == {
+        "Codebase": ["a.py"],
+        "load": ["c.js"],
+        "missing": [],
+    }
+    assert find_symbols(tmp_path, paths, ["Codebase"], references=True) == {
+        "Codebase": ["a.py", "b.py"]
+    }
+    # Another dialect's query filters the index instead of dropping other files
+    assert find_symbols(tmp_path, ["c.js"], ["Codebase", "load"]) == {
+        "Codebase": [],
+        "load": ["c.js"],
+    }
+    assert find_symbols(tmp_path, paths, ["Codebase"]) == {"Codebase": ["a.py"]}
+
+
+def test_covered_lines(tmp_path):
+    """Test reading per-context line coverage from a coverage.py sqlite file."""
+    import sqlite3
+    from cfold.utils.covdata import covered_lines, line_ranges, numbits_to_lines
+
+    assert numbits_to_lines(bytes([0b00000110, 0, 0b1])) == [1, 2, 16]
+    assert line_ranges([1, 2, 5, 10, 11]) == [(1, 5), (10, 11)]
+    datafile = tmp_path / ".coverage"
+    conn = sqlite3.connect(datafile)
+    conn.executescript(
+        "CREATE TABLE file (id INTEGER PRIMARY KEY, path TEXT);"
+        "CREATE TABLE context (id INTEGER PRIMARY KEY, context TEXT);"
+        "CREATE TABLE line_bits (file_id INTEGER, context_id INTEGER, numbits BLOB);"
+        "INSERT INTO file VALUES (1, '/src/a.py'), (2, '/src/b.py');"
+        "INSERT INTO context VALUES (1, ''), (2, 'tests/test_a.py::test_one|run');"
+    )
+    conn.executemany(
+        "INSERT INTO line_bits VALUES (?, ?, ?)",
+        [(1, 1, bytes([0b10])), (2, 1, bytes([0b100])), (1, 2, bytes([0b1000]))],
+    )
+    conn.commit()
+    conn.close()
+    assert covered_lines(datafile) == {"/src/a.py": {1, 3}, "/src/b.py": {2}}
+    assert covered_lines(datafile, "tests/test_a.py::test_one") == {"/src/a.py": {3}}
+    with pytest.raises(ValueError):
+        covered_lines(datafile, "tests/test_a.py::test_two")
+
+
+def test_builtin_transforms(tmp_path):
+    """Test the built-in content transforms and entry marking."""
+    from cfold.utils.transforms import TRANSFORMS, get_transform, transform_entries
+
+    shebang = "#!/usr/bin/env python\n"
+    header = shebang + "# Copyright 2024 ACME\n# MIT License\n\nx = 1  # one\n"
+    text = get_transform("strip-license-header")(header, "a.py")
+    assert text == shebang + "x = 1  # one\n"
+    assert get_transform("strip-comments")(text, "a.py") == shebang + "x = 1\n"
+    js = 'let a = "//x"; // c\n/* block\n */\nf();\n'
+    assert get_transform("strip-comments")(js, "a.js") == 'let a = "//x";\nf();\n'
+    assert TRANSFORMS["collapse-blank-lines"]("a\n\n\n\nb\n", "a") == "a\n\nb\n"
+    assert TRANSFORMS["strip-trailing-whitespace"]("a  \nb\t\n", "a") == "a\nb\n"
+    with pytest.raises(ValueError):
+        get_transform("no-such-transform")
+
+    entries = [
+        FileEntry(path="a.py", content="x = 1  # one\n"),
+        FileEntry(path="b.py", content="y = 2\n"),
+        FileEntry(path="c.py", content="z = 3  # c\n", start_line=4, end_line=4),
+    ]
+    out = transform_entries(entries, ["strip-comments"], tmp_path)
+    assert out[0].content == "x = 1\n" and out[0].transforms == ["strip-comments"]
+    assert out[1:] == entries[1:]  # regions splice back by line, left as folded
+
+
+def test_notebook_roundtrip():
+    """Test folding notebooks to cell sources and rebuilding them with metadata."""
+    import json
+    from cfold.utils.notebooks import notebook_to_text, text_to_notebook
+
+    nb = {
+        "cells": [
+            {
+                "cell_type": "markdown",
+                "id": "m1",
+                "metadata": {},
+                "source": ["# Title"],
+            },
+            {
+                "cell_type": "code",
+                "id": "c1",
+                "metadata": {"tags": ["keep"]},
+                "execution_count": 3,
+                "outputs": [
+                    {"output_type": "display_data", "data": {"image/png": "A" * 500}}
+                ],
+                "source": ["x = 1\n", "x"],
+            },
+        ],
+        "metadata": {"kernelspec": {"name": "python3"}},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+    original = json.dumps(nb)
+    text = notebook_to_text(original)
+    assert text == "# %% [markdown] id=m1\n# Title\n\n# %% [code] id=c1\nx = 1\nx\n"
+    assert json.loads(text_to_notebook(text, original)) == nb
+
+    edited = text.replace("x = 1", "x = 2") + "\n# %% [code]\nprint(x)\n"
+    rebuilt = json.loads(text_to_notebook(edited, original))
+    assert rebuilt["metadata"] == nb["metadata"]
+    changed, added = rebuilt["cells"][1], rebuilt["cells"][2]
+    assert changed["metadata"] == {"tags": ["keep"]} and changed["outputs"] == []
+    assert changed["source"] == ["x = 2\n", "x"]
+    assert added["source"] == ["print(x)"] and added["id"]
+
+
+def test_plan_unfold_in_place(tmp_path):
+    """Test in-place planning only looks at entry paths, rejecting escapes and symlinks out."""
+    from cfold.utils.plan import normalize_entry_path, plan_unfold
+
+    assert normalize_entry_path("src/./a.py") == "src/a.py"
+    assert normalize_entry_path("src\\b.py") == "src/b.py"
+    for bad in ("../x.py", "src/../../x.py", "/etc/passwd", "C:/x.py", "."):
+        assert normalize_entry_path(bad) is None
+
+    root = tmp_path / "tree"
+    root.mkdir()
+    (tmp_path / "outside").mkdir()
+    (root / "link").symlink_to(tmp_path / "outside")
+    (root / "keep.py").write_text("keep\n")
+    (root / "old.py").write_text("old\n")
+    entries = {
+        "old.py": FileEntry(path="old.py", content="new\n"),
+        "sub/new.py": FileEntry(path="sub/new.py", content="x\n"),
+        "gone.py": FileEntry(path="gone.py", delete=True),
+        "../out.py": FileEntry(path="../out.py", content="x\n"),
+        "link/pwned.txt": FileEntry(path="link/pwned.txt", content="x\n"),
+    }
+    operations, unsafe = plan_unfold(entries, str(root))
+    assert unsafe == ["../out.py", "link/pwned.txt"]
+    assert [(op.action, op.path, op.existed) for op in operations] == [
+        ("write", "old.py", True),
+        ("write", "sub/new.py", False),
+    ]
+
+
+def test_merge3():
+    """Test line-based 3-way merges and conflicts."""
+    from cfold.utils.patching import PatchError, merge3
+
+    base = "a\nb\nc\nd\ne\n"
+    assert merge3(base, "A\nb\nc\nd\ne\n", "a\nb\nc\nd\nE\n") == "A\nb\nc\nd\nE\n"
+    assert merge3(base, "a\nb\nd\ne\n", "a\nb\nd\ne\nf\n") == "a\nb\nd\ne\nf\n"
+    with pytest.raises(PatchError):
+        merge3(base, "X\nb\nc\nd\ne\n", "Y\nb\nc\nd\ne\n")
+
+
+def test_journal_resume_and_rollback(tmp_path):
+    """Test an interrupted journaled unfold can be rolled back or resumed."""
+    from cfold.utils.journal import (
+        Journal,
+        Step,
+        apply_steps,
+        rollback_steps,
+        stage_text,
+    )
+
+    (tmp_path / "a.py").write_text("old a\n")
+    (tmp_path / "gone.py").write_text("gone\n")
+
+    def interrupted():
+        steps = [
+            Step("replace", "a.py", stage_text(str(tmp_path), "a.py", "a\n"), "a.py"),
+            Step("delete", "gone.py", backup="gone.py"),
+            Step("replace", "b.py", stage_text(str(tmp_path), "b.py", "new b\n")),
+        ]
+        journal = Journal(str(tmp_path))
+        journal.begin(steps)
+        apply_steps(journal, steps[:2])  # dies before the last step
+        return journal
+
+    journal = interrupted()
+    assert journal.exists() and journal.load()[1] == 2
+    rollback_steps(journal, journal.load()[0])
+    journal.finish()
+    assert (tmp_path / "a.py").read_text() == "old a\n"
+    assert (tmp_path / "gone.py").exists() and not (tmp_path / "b.py").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.py", "gone.py"]
+
+    journal = interrupted()
+    steps, done = journal.load()
+    apply_steps(journal, steps, done)
+    journal.finish()
+    assert (tmp_path / "a.py").read_text() == "a\n"
+    assert (tmp_path / "b.py").read_text() == "new b\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.py", "b.py"]
+
+
+def test_fold_stream_yields_entries_early():
+    """Test streamed fold JSON yields each files entry once it is complete."""
+    from cfold.utils.streaming import FoldStream
+
+    text = (
+        'Note {braces} and {"other": 1}\n'
+        '{"files": [{"path": "a.py", "content": "s = \\"}\\"\\n"}, '
+        '{"path": "b.py", "delete": true}]}\ntrailing {"x"'
+    )
+    stream = FoldStream()
+    seen = [len(stream.feed(char)) for char in text]
+    assert sum(seen) == 2
+    assert text.index('"b.py"') > seen.index(1)  # a.py arrives before b.py is sent
+    assert stream.document()["files"][0]["content"] == 's = "}"\n'
+
+
+def test_history_snapshots_store_deltas(tmp_path):
+    """Test history snapshots dedupe files and store changed ones as deltas."""
+    from cfold.utils.history import (
+        connect,
+        list_snapshots,
+        load_snapshot,
+        record_snapshot,
+        storage_bytes,
+    )
+
+    big = "".join(f"line {n} of a rather long module body\n" for n in range(3000))
+    fold = Codebase(
+        instructions=[Instruction(type="user", content="Do it", name="prompt")],
+        files=[FileEntry(path="a.py", content=big), FileEntry(path="b.py", content="b\n")],
+    )
+    first = record_snapshot(tmp_path, fold, "codefold.json")
+    conn = connect(tmp_path)
+    after_first = storage_bytes(conn)
+    fold.files[0].content = big.replace("line 1500 ", "line fifteen hundred ")
+    second = record_snapshot(tmp_path, fold, "codefold.json")
+    assert storage_bytes(conn) - after_first < after_first / 10
+    assert [row[0] for row in list_snapshots(conn)] == [first, second]
+    assert load_snapshot(conn, first).files[0].content == big
+    assert load_snapshot(conn, second) == fold
+
+
+def test_serialize_backends(monkeypatch):
+    """Test fold encoding matches json.dumps with every backend and in compact form."""
+    import json
+    from cfold.core import serialize
+    from cfold.core.models import Edit, FileState
+
+    fold = Codebase(
+        instructions=[Instruction(type="user", content='Fix "é"\n', name="prompt")],
+        files=[
+            FileEntry(path="a.py", content="s = 'ü'\t\n"),
+            FileEntry(path="b.py", delete=True),
+            FileEntry(path="c.py", edits=[Edit(search="a", replace="b")]),
+        ],
+        manifest={"a.py": FileState(sha256="00", size=9, mtime_ns=None)},
+    )
+    expected = json.dumps(fold.model_dump(), indent=2)
+    for backend in {serialize.orjson, None}:
+        monkeypatch.setattr(serialize, "orjson", backend)
+        if backend is None:
+            assert serialize.dump_fold(fold).decode() == expected
+            one_line = serialize.single_line(serialize.dump_fold(fold))
+            assert one_line.decode() == json.dumps(fold.model_dump())
+        assert json.loads(serialize.dump_fold(fold)) == json.loads(expected)
+        compact = serialize.dump_fold(fold, compact=True)
+        assert b"\n" not in compact and json.loads(compact) == json.loads(expected)
+        assert json.loads(serialize.dump_fold(Codebase())) == {"instructions": [], "files": []}
+
+
+def test_root_index_freshness(tmp_path, monkeypatch):
+    """Test the daemon index re-reads changed files and polling sees new files."""
+    from cfold.utils import daemon, watch
+
+    (tmp_path / "a.py").write_text("a = 1\n")
+    index = daemon.RootIndex(tmp_path)
+    assert index.read("a.py") == "a = 1\n"
+    (tmp_path / "a.py").write_text("a = 22\n")  # no watcher event was applied
+    assert index.read("a.py") == "a = 22\n"
+
+    monkeypatch.setattr(watch, "_load_libc", lambda: None)
+    watcher = index.open_watcher()
+    assert isinstance(watcher, watch.PollingWatcher)
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "new.py").write_text("n = 1\n")
+    assert "pkg/new.py" in watcher.read(0)
+
+    fake = tmp_path / "fake.sock"
+    fake.write_text("")
+    assert not daemon.is_own_socket(fake)
+    monkeypatch.delenv("CFOLD_NO_DAEMON", raising=False)
+    assert daemon.request_daemon("ping", path=str(fake)) is None
+
+
+def test_manifest_reuses_reads_and_prunes_base(tmp_path, monkeypatch):
+    """Test manifest states come from the fold's own reads and old bases are pruned."""
+    import os
+    from cfold.utils import cache as cache_module
+    from cfold.utils import manifest
+
+    (tmp_path / "a.py").write_bytes(b"a = 1\r\n")  # hashed as bytes, read as text
+    base = cache_module.ContentCache.for_root(tmp_path, manifest.BASE_NAMESPACE)
+    text, state = manifest.read_with_state(tmp_path / "a.py", base)
+    assert text == "a = 1\n" and state.size == 7
+    assert manifest.base_content(tmp_path, state) == "a = 1\n"
+    (tmp_path / "crlf.py").write_bytes(b"a = 1\r\nb = 2\r\n")
+    crlf = manifest.file_state(tmp_path / "crlf.py", base)
+    # The base is stored as read in text mode, like the current file it merges with
+    stored = base.directory / crlf.sha256[:2] / crlf.sha256[2:]
+    assert stored.read_bytes() == b"a = 1\nb = 2\n"
+    monkeypatch.setattr(manifest, "file_state", lambda *a: pytest.fail("re-read"))
+    assert manifest.build_manifest(tmp_path, ["a.py"], known={"a.py": state}) == {
+        "a.py": state
+    }
+
+    stale = base.directory / "ff" / "old"
+    stale.parent.mkdir()
+    stale.write_text("old\n")
+    old = cache_module.time.time() - manifest.BASE_MAX_AGE - 1
+    os.utime(stale, (old, old))
+    os.utime(base.directory / ".pruned", (old, old))
+    manifest.build_manifest(tmp_path, ["a.py"], known={"a.py": state})
+    assert not stale.exists()
+    assert manifest.base_content(tmp_path, state) == "a = 1\n"